@@ -1,35 +1,610 @@
+import hashlib
+import hmac
+import json
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import combinations
+from typing import Callable, Optional
 
-import pandas as pd
-from config import CSV_FILE_STR, SHAPEFILE_DIR_STR, SHAPEFILE_PATTERN
+from artifacts import HOUSING_ATTRIBUTES, POPULATION, SENTENCES, artifact_key
+from cache import CacheEntry, ResponseCache, TileCache
+from compression import compress_chunks, encoded_etag, negotiate_encoding
+from config import (
+    COMPRESSED_CACHE_MAX_BYTES,
+    COMPRESSION_WORKERS,
+    DATASET_RELOAD_INTERVAL,
+    HOUSING_MAX_WAITING,
+    HOUSING_TIMEOUT,
+    HOUSING_WORKERS,
+    MERGE_POOL,
+    MERGE_WORKERS,
+    RELOAD_TOKEN,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_PREWARM_CITIES,
+    SERVER_TIMING,
+    TILE_CACHE_DIR_STR,
+    TILE_CACHE_MAX_BYTES,
+)
 from data_processing import (
+    BYTES_BUCKETS,
+    DEFAULT_AGE_BINS,
+    DETAIL_LEVELS,
+    REGISTRY,
+    SCOPES,
+    compare_cities,
     create_housing_demographic_sentences,
+    dumps,
+    format_server_timing,
     get_city_housing_data,
+    get_city_tile,
+    get_geometry_geojson,
+    get_housing_attributes,
+    get_housing_tile,
     get_population_data,
+    get_time_series,
     merge_geojson,
+    start_request_timings,
+    stop_request_timings,
+    tile_intersects,
 )
-from flask import Flask, Response, jsonify, request
-from validation import RequestValidator, ValidationError
+from executor import CoalescingExecutor, ExecutorBusyError
+from flask import Flask, Response, g, jsonify, request
+from registry import DatasetRegistry, DatasetSnapshot
+from validation import ValidationError
 
 app = Flask(__name__)
 
-# Load data once at startup (not per-request for performance)
-df = pd.read_csv(CSV_FILE_STR)
+# Serialized map payloads keyed by (version, year1, year2, city, format[, detail], scope)
+housing_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+# Bounded pool for building map payloads and tiles off the request threads; requests
+# beyond HOUSING_MAX_WAITING get 503 instead of waiting on it
+housing_executor = CoalescingExecutor(
+    HOUSING_WORKERS, thread_name_prefix="housing", max_waiting=HOUSING_MAX_WAITING
+)
+
+# Optional thread pool splitting each GeoJSON map payload by county (see MERGE_WORKERS);
+# process pools hold a copy of the data, so each dataset snapshot has its own
+merge_executor: Optional[ThreadPoolExecutor] = None
+if MERGE_POOL not in ("thread", "process"):
+    raise ValueError(f"MERGE_POOL must be 'thread' or 'process', got {MERGE_POOL!r}")
+if MERGE_WORKERS > 1 and MERGE_POOL == "thread":
+    merge_executor = ThreadPoolExecutor(MERGE_WORKERS, thread_name_prefix="merge")
+
+# /api/housing payload formats: full GeoJSON, or only the per-request attribute columns
+HOUSING_FORMATS = ["geojson", "attributes"]
+
+# Serialized block group shapes for /api/geometry are cached per snapshot. Browsers keep
+# them for a year at a URL naming the dataset version ("?v="), and briefly at any other URL
+GEOMETRY_MAX_AGE = 365 * 24 * 60 * 60
+GEOMETRY_UNVERSIONED_MAX_AGE = 5 * 60
+
+# Response header naming the dataset version a response was computed from
+DATASET_VERSION_HEADER = "X-Dataset-Version"
+# Request header opting a single request into the Server-Timing header ("1" or "true")
+SERVER_TIMING_REQUEST_HEADER = "X-Server-Timing"
+
+# Vector tile layers of the housing map, kept on disk until the dataset version changes:
+# the block group layer once per year pair, and each city's layer once per year pair and city
+tile_cache = TileCache(TILE_CACHE_DIR_STR, TILE_CACHE_MAX_BYTES)
+TILE_MIMETYPE = "application/vnd.mapbox-vector-tile"
+# Tiles outside the block groups' extent have no features and are served without building them
+EMPTY_TILE = CacheEntry(b"")
+TILE_MAX_AGE = 24 * 60 * 60
 
-# Initialize validator with available years
-# Valid years are hardcoded but could be derived from CSV columns
-VALID_YEARS = ["1990", "2000", "2010", "2020"]
-validator = RequestValidator(df, VALID_YEARS)
+# Compressed bodies of responses with an ETag, keyed by the ETag of each encoding
+compressed_cache = ResponseCache(COMPRESSED_CACHE_MAX_BYTES)
+# Compression has its own pool, so cached responses never wait behind map payload builds
+compression_executor = CoalescingExecutor(
+    COMPRESSION_WORKERS, thread_name_prefix="compress"
+)
+COMPRESSIBLE_MIMETYPES = {"application/json", TILE_MIMETYPE}
+
+# Request latency and response size per endpoint, exposed with the stage timings at /metrics
+REQUEST_SECONDS = REGISTRY.histogram(
+    "missing_middle_request_seconds",
+    "Time to handle each API request",
+    ("endpoint", "method", "status"),
+)
+RESPONSE_BYTES = REGISTRY.histogram(
+    "missing_middle_response_bytes",
+    "Size of each API response body",
+    ("endpoint",),
+    BYTES_BUCKETS,
+)
+REGISTRY.register_callback(
+    "missing_middle_response_cache_requests_total",
+    "Map payload cache lookups by result",
+    "counter",
+    lambda: {("hit",): housing_cache.hits, ("miss",): housing_cache.misses},
+    ("result",),
+)
+REGISTRY.register_callback(
+    "missing_middle_response_cache_bytes",
+    "Total size of the cached map payloads",
+    "gauge",
+    lambda: {(): housing_cache.current_bytes},
+)
+REGISTRY.register_callback(
+    "missing_middle_response_cache_entries",
+    "Number of cached map payloads",
+    "gauge",
+    lambda: {(): len(housing_cache)},
+)
+REGISTRY.register_callback(
+    "missing_middle_compressed_cache_requests_total",
+    "Compressed body cache lookups by result",
+    "counter",
+    lambda: {("hit",): compressed_cache.hits, ("miss",): compressed_cache.misses},
+    ("result",),
+)
+REGISTRY.register_callback(
+    "missing_middle_compressed_cache_bytes",
+    "Total size of the cached compressed bodies",
+    "gauge",
+    lambda: {(): compressed_cache.current_bytes},
+)
+REGISTRY.register_callback(
+    "missing_middle_housing_in_flight",
+    "Map payload and tile computations queued or running",
+    "gauge",
+    lambda: {(): len(housing_executor)},
+)
+REGISTRY.register_callback(
+    "missing_middle_housing_coalesced_total",
+    "Requests that joined an identical in-flight computation",
+    "counter",
+    lambda: {(): housing_executor.coalesced},
+)
+REGISTRY.register_callback(
+    "missing_middle_housing_waiting",
+    "Requests waiting for a map payload or tile",
+    "gauge",
+    lambda: {(): housing_executor.waiting},
+)
+REGISTRY.register_callback(
+    "missing_middle_housing_rejected_total",
+    "Requests answered 503 because too many requests were already waiting",
+    "counter",
+    lambda: {(): housing_executor.rejected},
+)
+REGISTRY.register_callback(
+    "missing_middle_dataset_info",
+    "Version of the dataset requests are served from",
+    "gauge",
+    lambda: {(registry.current.version,): 1},
+    ("version",),
+)
+REGISTRY.register_callback(
+    "missing_middle_dataset_reloads_total",
+    "Dataset versions swapped in since startup",
+    "counter",
+    lambda: {(): registry.reloads},
+)
 
 # Initialize logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def get_artifact(snapshot: DatasetSnapshot, kind: str, *parts) -> Optional[CacheEntry]:
+    """
+    Returns a precomputed response body, or None if it has to be computed live.
+    """
+    if snapshot.artifact_store is None:
+        return None
+    return snapshot.artifact_store.get(artifact_key(kind, *parts))
+
+
+def housing_cache_key(
+    snapshot: DatasetSnapshot,
+    year1: str,
+    year2: str,
+    city: str,
+    response_format: str = "geojson",
+    detail: str = "full",
+    scope: str = "state",
+) -> tuple:
+    """
+    Returns the housing cache key of a map payload. Keys include the snapshot's
+    version, so payloads of a replaced dataset are never served and simply age
+    out of the cache.
+    """
+    if response_format == "attributes":
+        # Attribute columns carry no geometry, so the detail level does not apply
+        return (snapshot.version, year1, year2, city, response_format, scope)
+    return (snapshot.version, year1, year2, city, response_format, detail, scope)
+
+
+def build_housing_payload(
+    snapshot: DatasetSnapshot,
+    year1: str,
+    year2: str,
+    city: str,
+    response_format: str = "geojson",
+    detail: str = "full",
+    scope: str = "state",
+    bbox: Optional[list[float]] = None,
+) -> bytes:
+    """
+    Builds the serialized map payload for the given years and city on the calling thread.
+    """
+    if response_format == "attributes":
+        if scope == "state" and bbox is None:
+            stored = get_artifact(snapshot, HOUSING_ATTRIBUTES, year1, year2, city)
+            if stored is not None:
+                return stored.body
+        return dumps(
+            get_housing_attributes(
+                snapshot.df,
+                year1,
+                year2,
+                city,
+                snapshot.geometry_store,
+                scope,
+                bbox,
+                snapshot.town_index,
+                snapshot.geoid_index,
+            )
+        )
+
+    if snapshot.county_pool is not None:
+        return snapshot.county_pool.merge_geojson(
+            year1, year2, city, detail, scope, bbox
+        )
+    return merge_geojson(
+        snapshot.df,
+        year1,
+        year2,
+        city,
+        snapshot.geometry_store,
+        detail,
+        scope,
+        bbox,
+        snapshot.town_index,
+        snapshot.geoid_index,
+        merge_executor,
+    )
+
+
+def get_housing_payload(
+    snapshot: DatasetSnapshot,
+    year1: str,
+    year2: str,
+    city: str,
+    response_format: str = "geojson",
+    detail: str = "full",
+    scope: str = "state",
+    bbox: Optional[list[float]] = None,
+) -> CacheEntry:
+    """
+    Returns the cache entry holding the serialized map payload for the given years and city.
+    Builds and caches the payload on a miss.
+
+    Payloads are built on the housing executor, so identical concurrent misses
+    share one computation. Viewport (bbox) requests are built fresh every time,
+    since arbitrary viewports would only evict reusable entries from the cache.
+
+    Raises:
+        ExecutorBusyError: If HOUSING_MAX_WAITING requests are already waiting
+        TimeoutError: If the payload is not ready within HOUSING_TIMEOUT seconds
+    """
+    key = housing_cache_key(
+        snapshot, year1, year2, city, response_format, detail, scope
+    )
+
+    def build_payload() -> bytes:
+        return build_housing_payload(
+            snapshot, year1, year2, city, response_format, detail, scope, bbox
+        )
+
+    if bbox is not None:
+        return housing_executor.run(
+            (*key, tuple(bbox)), lambda: CacheEntry(build_payload()), HOUSING_TIMEOUT
+        )
+
+    entry = housing_cache.get(key)
+    if entry is None:
+        entry = housing_executor.run(
+            key, lambda: housing_cache.put(key, build_payload()), HOUSING_TIMEOUT
+        )
+    return entry
+
+
+def precomputed_city_change(
+    snapshot: DatasetSnapshot, year1: str, year2: str, city: str
+) -> Optional[dict]:
+    """
+    Returns the city's population change from the precomputed population response,
+    or None if it was not precomputed.
+    """
+    stored = get_artifact(snapshot, POPULATION, year1, year2, city)
+    if stored is None:
+        return None
+    total_city_change = json.loads(stored.body)["total_city_change"]
+    if not total_city_change["change"] or total_city_change["percent"] is None:
+        return None
+    return {
+        "change": int(total_city_change["change"]),
+        "percent": float(total_city_change["percent"]),
+    }
+
+
+def get_sentences_body(
+    snapshot: DatasetSnapshot, year1: str, year2: str, city: str, city_change_dict: dict
+) -> bytes:
+    """
+    Returns the serialized housing insight sentences for a city's population change.
+
+    Precomputed sentences are written for the population change the server computes,
+    so they are only served when the change the client sends matches it.
+    """
+    stored = get_artifact(snapshot, SENTENCES, year1, year2, city)
+    if stored is not None and city_change_dict == precomputed_city_change(
+        snapshot, year1, year2, city
+    ):
+        return stored.body
+
+    city_housing_data = get_city_housing_data(
+        snapshot.df, year1, year2, city, snapshot.aggregate_cube, snapshot.town_index
+    )
+    return dumps(
+        create_housing_demographic_sentences(city, city_housing_data, city_change_dict)
+    )
+
+
+def get_geometry_payload(snapshot: DatasetSnapshot, detail: str = "full") -> CacheEntry:
+    """
+    Returns the cache entry holding the serialized block group shapes.
+    """
+    if detail not in snapshot.geometry_entries:
+        snapshot.geometry_entries[detail] = CacheEntry(
+            get_geometry_geojson(snapshot.df, snapshot.geometry_store, detail)
+        )
+    return snapshot.geometry_entries[detail]
+
+
+def get_stored_tile(key: tuple[str, ...], build: Callable[[], bytes]) -> CacheEntry:
+    """
+    Returns a tile layer from the tile cache, building it on the housing executor on a miss.
+
+    Raises:
+        ExecutorBusyError: If HOUSING_MAX_WAITING requests are already waiting
+        TimeoutError: If the layer is not ready within HOUSING_TIMEOUT seconds
+    """
+    return tile_cache.get_or_create(
+        key, lambda: housing_executor.run(("tile", *key), build, HOUSING_TIMEOUT)
+    )
+
+
+def busy_response() -> tuple[Response, int, dict[str, str]]:
+    """
+    Returns the 503 response for requests that timed out waiting on the housing
+    executor, or were turned away because too many requests were already waiting.
+    """
+    return (
+        jsonify(
+            {"error": "Housing data is still being computed, please retry shortly"}
+        ),
+        503,
+        {"Retry-After": "5"},
+    )
+
+
+def prewarm_housing_cache(snapshot: DatasetSnapshot, cities: list[str]) -> None:
+    """
+    Builds the map GeoJSON for every year pair of the given cities ahead of requests.
+
+    Payloads are built on the calling thread, without the request timeout, since
+    this runs at startup and while a reloaded snapshot is prepared. A pair that
+    fails is skipped so the snapshot still loads.
+    """
+    for city in cities:
+        for year1, year2 in combinations(snapshot.valid_years, 2):
+            try:
+                snapshot.validator.validate_request(year1, year2, city)
+                key = housing_cache_key(snapshot, year1, year2, city)
+                if key not in housing_cache:
+                    housing_cache.put(
+                        key, build_housing_payload(snapshot, year1, year2, city)
+                    )
+            except ValidationError as e:
+                logger.warning(f"Skipping housing cache prewarm: {str(e)}")
+                continue
+            except Exception as e:
+                logger.error(f"Failed to prewarm {city} {year1}-{year2}: {e}")
+                continue
+
+
+def prepare_snapshot(snapshot: DatasetSnapshot) -> None:
+    """
+    Starts the county workers and prewarms the map payload cache of a new snapshot,
+    before it serves any request.
+    """
+    if snapshot.county_pool is not None:
+        try:
+            snapshot.county_pool.start()
+        except BrokenProcessPool as e:
+            # Payloads are then built in the app process
+            logger.error(f"County workers failed to start: {e}")
+    prewarm_housing_cache(snapshot, RESPONSE_CACHE_PREWARM_CITIES)
+
+
+def retire_snapshot(previous: DatasetSnapshot, snapshot: DatasetSnapshot) -> None:
+    """
+    Drops the cached payloads, compressed bodies and stored tiles of the version a
+    reload replaced. Tiles of other versions are left alone, since other worker
+    processes may still be serving them.
+    """
+    if previous.version == snapshot.version:
+        return
+    housing_cache.discard(lambda key: key[0] == previous.version)
+    # Compressed bodies are keyed by ETag rather than version
+    compressed_cache.clear()
+    tile_cache.remove(previous.version)
+
+
+# Dataset, indexes and geometries of the active version. A changed version is loaded
+# and prepared in the background, then swapped in without restarting the process
+registry = DatasetRegistry(prepare=prepare_snapshot, on_swap=retire_snapshot)
+if DATASET_RELOAD_INTERVAL > 0:
+    registry.watch(DATASET_RELOAD_INTERVAL)
+
+
+@app.before_request
+def start_request_timer() -> None:
+    """
+    Records the request start time, pins the current dataset snapshot for the
+    whole request, and starts collecting stage timings if SERVER_TIMING is on or
+    the request asks for them with the X-Server-Timing header.
+    """
+    g.request_start = time.perf_counter()
+    g.snapshot = registry.current
+    g.stage_timings = None
+    opt_in = request.headers.get(SERVER_TIMING_REQUEST_HEADER, "").lower()
+    if SERVER_TIMING or opt_in in ("1", "true"):
+        g.stage_timings = start_request_timings()
+
+
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    """
+    Records the request latency and response size, adds the dataset version
+    header, and adds the Server-Timing header if stage timings were collected.
+    """
+    response.headers[DATASET_VERSION_HEADER] = g.snapshot.version
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_SECONDS.observe(
+        elapsed, endpoint, request.method, str(response.status_code)
+    )
+
+    size = response.content_length
+    if size is None and response.is_sequence:
+        # Streamed bodies are lists of byte chunks
+        size = sum(len(chunk) for chunk in response.response)
+    if size is not None:
+        RESPONSE_BYTES.observe(size, endpoint)
+
+    if g.stage_timings is not None:
+        response.headers["Server-Timing"] = format_server_timing(
+            g.stage_timings, elapsed
+        )
+    return response
+
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    """
+    Compresses JSON and tile bodies with the best encoding the client accepts.
+
+    Bodies with an ETag are compressed once per encoding and served from the
+    compressed cache afterwards; each encoding gets its own ETag, and a
+    request that already holds it gets 304. Other bodies are small and
+    compressed per response.
+    """
+    if (
+        response.status_code != 200
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "Content-Encoding" in response.headers
+        or not response.is_sequence
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    chunks = response.response
+    encoding = negotiate_encoding(
+        request.accept_encodings, sum(len(chunk) for chunk in chunks)
+    )
+    if encoding is None:
+        return response
+
+    etag, _ = response.get_etag()
+    if etag is None:
+        body = compress_chunks(chunks, encoding)
+    else:
+        etag = encoded_etag(etag, encoding)
+        if request.if_none_match.contains(etag):
+            # Checked here rather than with make_conditional, which only handles GET and HEAD
+            response.set_etag(etag)
+            response.status_code = 304
+            response.set_data(b"")
+            del response.headers["Content-Length"]
+            return response
+
+        entry = compressed_cache.get(etag)
+        if entry is None:
+            try:
+                entry = compression_executor.run(
+                    etag,
+                    lambda: compressed_cache.put(
+                        etag, compress_chunks(chunks, encoding)
+                    ),
+                    HOUSING_TIMEOUT,
+                )
+            except TimeoutError:
+                # Identity is always acceptable, so fall back to the uncompressed body
+                logger.warning("Timed out waiting for compression in compress_response")
+                return response
+        body = entry.body
+        response.set_etag(etag)
+
+    response.set_data(body)
+    response.content_encoding = encoding
+    return response
+
+
+@app.teardown_request
+def clear_request_timings(exception: Optional[BaseException]) -> None:
+    """
+    Stops collecting stage timings so pooled threads do not carry them into the next request.
+    """
+    stop_request_timings()
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics() -> Response:
+    """
+    Returns request, stage, cache and payload size metrics in the Prometheus text format.
+    Metrics are collected per process.
+    """
+    return Response(
+        REGISTRY.render(),
+        status=200,
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@app.route("/api/reload", methods=["POST"])
+def reload_dataset() -> Response:
+    """
+    Starts loading the source files again in the background and returns immediately.
+    Requires RELOAD_TOKEN as a bearer token. The new version is swapped in once
+    it is ready, and only if the files changed unless "force" is true.
+    """
+    if not RELOAD_TOKEN:
+        return jsonify({"error": "Dataset reload is disabled"}), 404
+    authorization = request.authorization
+    if (
+        authorization is None
+        or authorization.type != "bearer"
+        or not hmac.compare_digest(authorization.token or "", RELOAD_TOKEN)
+    ):
+        return jsonify({"error": "Invalid reload token"}), 401
+
+    request_data = request.get_json(silent=True) or {}
+    registry.reload_in_background(force=bool(request_data.get("force", False)))
+    return jsonify({"version": g.snapshot.version}), 202
+
+
 @app.route("/api/population", methods=["POST"])
 def population_data() -> Response:
     """
     Returns JSON of population data for the given years and city by age and race.
+    "age_bins" selects the age groups: "5-year" (default), "10-year", "life-stage",
+    or a list of the youngest age of each group, e.g. [0, 18, 65].
     """
     request_data = request.get_json()
     if not request_data:
@@ -38,13 +613,30 @@ def population_data() -> Response:
     year1 = request_data.get("year1")
     year2 = request_data.get("year2")
     city = request_data.get("city")
+    age_bins = request_data.get("age_bins")
 
+    snapshot = g.snapshot
     try:
         # Validate all parameters
-        validator.validate_request(year1, year2, city)
+        snapshot.validator.validate_request(year1, year2, city)
+        age_bins = snapshot.validator.validate_age_bins(age_bins)
+
+        # Serve the precomputed response when there is one (only for the default bins)
+        if age_bins == DEFAULT_AGE_BINS:
+            stored = get_artifact(snapshot, POPULATION, year1, year2, city)
+            if stored is not None:
+                return Response(stored.body, status=200, mimetype="application/json")
 
         # Process request
-        data = get_population_data(df, year1, year2, city)
+        data = get_population_data(
+            snapshot.df,
+            year1,
+            year2,
+            city,
+            snapshot.aggregate_cube,
+            snapshot.town_index,
+            age_bins,
+        )
         return jsonify(data), 200
 
     except ValidationError as e:
@@ -63,6 +655,11 @@ def housing_data() -> Response:
     """
     Returns JSON of tracts data for the given years.
     Includes all cities for drawing the map.
+
+    With "format": "attributes", returns only the changing values as GEOID-indexed
+    columns, to be joined onto the shapes from /api/geometry.
+    "detail" selects simplified geometries for zoomed-out maps, and "scope"
+    ("state", "neighbors" or "city") and "bbox" limit the block groups returned.
     """
     request_data = request.get_json()
     if not request_data:
@@ -73,35 +670,63 @@ def housing_data() -> Response:
     city = request_data.get("city")
     city_change_absolute = request_data.get("city_change_absolute")
     city_change_percent = request_data.get("city_change_percent")
+    response_format = request_data.get("format", "geojson")
+    detail = request_data.get("detail", "full")
+    scope = request_data.get("scope", "state")
+    bbox = request_data.get("bbox")
 
+    snapshot = g.snapshot
     try:
         # Validate all parameters
-        validator.validate_request(year1, year2, city)
+        snapshot.validator.validate_request(year1, year2, city)
+        snapshot.validator.validate_option(response_format, HOUSING_FORMATS, "format")
+        snapshot.validator.validate_option(detail, DETAIL_LEVELS, "detail")
+        snapshot.validator.validate_option(scope, SCOPES, "scope")
+        snapshot.validator.validate_bbox(bbox)
 
         # Process request
-        geojson_data = merge_geojson(
-            df, year1, year2, city, SHAPEFILE_DIR_STR, SHAPEFILE_PATTERN
+        payload_entry = get_housing_payload(
+            snapshot, year1, year2, city, response_format, detail, scope, bbox
         )
 
-        sentences = []
+        sentences_body = dumps([])
         # Only generate insights if population change data is provided
         # This allows the endpoint to work without insights if needed
-        if city_change_absolute:
+        if city_change_absolute and city_change_percent is not None:
             city_change_dict = {
                 "change": int(city_change_absolute),
                 "percent": float(city_change_percent),
             }
-            city_housing_data = get_city_housing_data(df, year1, year2, city)
-            sentences = create_housing_demographic_sentences(
-                city, city_housing_data, city_change_dict
+            sentences_body = get_sentences_body(
+                snapshot, year1, year2, city, city_change_dict
             )
 
-        response_data = {"geojson": geojson_data, "sentences": sentences}
-        return jsonify(response_data), 200
+        # The map payload is cached, so the ETag combines its hash with the sentences
+        etag = hashlib.sha256(payload_entry.etag.encode() + sentences_body).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        # Stream the cached payload as-is rather than copying it into a new body
+        body = [
+            b'{"' + response_format.encode() + b'":',
+            payload_entry.body,
+            b',"sentences":' + sentences_body + b"}",
+        ]
+        response = Response(body, status=200, mimetype="application/json")
+        response.set_etag(etag)
+        return response
 
     except ValidationError as e:
         logger.warning(f"Validation error in housing_data: {str(e)}")
         return jsonify({"error": str(e)}), 400
+    except ExecutorBusyError as e:
+        logger.warning(f"Housing executor busy in housing_data: {str(e)}")
+        return busy_response()
+    except TimeoutError:
+        logger.warning("Timed out waiting for housing data in housing_data")
+        return busy_response()
     except FileNotFoundError as e:
         logger.error(f"Required file not found: {str(e)}")
         return jsonify({"error": f"Required file not found: {str(e)}"}), 500
@@ -113,5 +738,295 @@ def housing_data() -> Response:
         return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route("/api/city-report", methods=["POST"])
+def city_report() -> Response:
+    """
+    Returns population data, housing map attributes and housing insights for the
+    given years and city in one response.
+
+    The housing insights use the population change computed here, so clients do
+    not need to send it back in a second request. Map attributes are
+    GEOID-indexed columns to be joined onto the shapes from /api/geometry.
+    "age_bins" selects the population age groups as in /api/population.
+    """
+    request_data = request.get_json()
+    if not request_data:
+        return jsonify({"error": "Request body must be JSON"}), 400
+
+    year1 = request_data.get("year1")
+    year2 = request_data.get("year2")
+    city = request_data.get("city")
+    age_bins = request_data.get("age_bins")
+
+    snapshot = g.snapshot
+    try:
+        # Validate all parameters
+        snapshot.validator.validate_request(year1, year2, city)
+        age_bins = snapshot.validator.validate_age_bins(age_bins)
+
+        # Population and housing sums are both read from the per-town cube
+        population = get_population_data(
+            snapshot.df,
+            year1,
+            year2,
+            city,
+            snapshot.aggregate_cube,
+            snapshot.town_index,
+            age_bins,
+        )
+        population_body = dumps(population)
+
+        sentences_body = dumps([])
+        total_city_change = population["total_city_change"]
+        # Insights need a percent change, which an empty year1 population lacks
+        if total_city_change["change"] and total_city_change["percent"] is not None:
+            city_change_dict = {
+                "change": int(total_city_change["change"]),
+                "percent": float(total_city_change["percent"]),
+            }
+            sentences_body = get_sentences_body(
+                snapshot, year1, year2, city, city_change_dict
+            )
+
+        attributes_entry = get_housing_payload(
+            snapshot, year1, year2, city, "attributes"
+        )
+
+        etag = hashlib.sha256(
+            population_body + attributes_entry.etag.encode() + sentences_body
+        ).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        # Stream the cached attribute payload as-is rather than copying it into a new body
+        body = [
+            b'{"population":' + population_body + b',"housing":{"attributes":',
+            attributes_entry.body,
+            b',"sentences":' + sentences_body + b"}}",
+        ]
+        response = Response(body, status=200, mimetype="application/json")
+        response.set_etag(etag)
+        return response
+
+    except ValidationError as e:
+        logger.warning(f"Validation error in city_report: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+    except ExecutorBusyError as e:
+        logger.warning(f"Housing executor busy in city_report: {str(e)}")
+        return busy_response()
+    except TimeoutError:
+        logger.warning("Timed out waiting for housing data in city_report")
+        return busy_response()
+    except FileNotFoundError as e:
+        logger.error(f"Required file not found: {str(e)}")
+        return jsonify({"error": f"Required file not found: {str(e)}"}), 500
+    except KeyError as e:
+        logger.error(f"Data column not found: {str(e)}")
+        return jsonify({"error": f"Data column not found: {str(e)}"}), 500
+    except Exception as e:
+        logger.error(f"Unexpected error in city_report: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route("/api/compare", methods=["POST"])
+def compare_data() -> Response:
+    """
+    Returns population and housing changes for many cities at once, as columns.
+    "cities" is a list of city names or "all".
+    "age_bins" selects the age groups as in /api/population.
+    """
+    request_data = request.get_json()
+    if not request_data:
+        return jsonify({"error": "Request body must be JSON"}), 400
+
+    year1 = request_data.get("year1")
+    year2 = request_data.get("year2")
+    cities = request_data.get("cities")
+    age_bins = request_data.get("age_bins")
+
+    snapshot = g.snapshot
+    try:
+        # Validate all parameters
+        snapshot.validator.validate_years(year1, year2)
+        cities = snapshot.validator.validate_cities(cities)
+        age_bins = snapshot.validator.validate_age_bins(age_bins)
+
+        # Process request
+        data = compare_cities(snapshot.aggregate_cube, year1, year2, cities, age_bins)
+        return Response(dumps(data), status=200, mimetype="application/json")
+
+    except ValidationError as e:
+        logger.warning(f"Validation error in compare_data: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+    except KeyError as e:
+        logger.error(f"Data column not found: {str(e)}")
+        return jsonify({"error": f"Data column not found: {str(e)}"}), 500
+    except Exception as e:
+        logger.error(f"Unexpected error in compare_data: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route("/api/time-series", methods=["POST"])
+def time_series_data() -> Response:
+    """
+    Returns population and housing unit counts for every year in the dataset, with
+    the changes between every pair of years, for a city or (without "city") the state.
+    "age_bins" selects the age groups as in /api/population.
+    """
+    request_data = request.get_json()
+    if not isinstance(request_data, dict):
+        return jsonify({"error": "Request body must be JSON"}), 400
+
+    city = request_data.get("city")
+    age_bins = request_data.get("age_bins")
+
+    snapshot = g.snapshot
+    try:
+        # Validate all parameters
+        if city is not None:
+            snapshot.validator.validate_city(city)
+        age_bins = snapshot.validator.validate_age_bins(age_bins)
+
+        # Process request
+        data = get_time_series(
+            snapshot.df,
+            snapshot.valid_years,
+            city,
+            snapshot.aggregate_cube,
+            snapshot.town_index,
+            age_bins,
+        )
+        return Response(dumps(data), status=200, mimetype="application/json")
+
+    except ValidationError as e:
+        logger.warning(f"Validation error in time_series_data: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+    except KeyError as e:
+        logger.error(f"Data column not found: {str(e)}")
+        return jsonify({"error": f"Data column not found: {str(e)}"}), 500
+    except Exception as e:
+        logger.error(f"Unexpected error in time_series_data: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route("/api/housing/tiles/<int:z>/<int:x>/<int:y>", methods=["GET"])
+def housing_tile(z: int, x: int, y: int) -> Response:
+    """
+    Returns a Mapbox Vector Tile of block groups with housing changes for the given years.
+    The years and city are given as query parameters, e.g. ?year1=2010&year2=2020&city=Boston.
+    """
+    year1 = request.args.get("year1")
+    year2 = request.args.get("year2")
+    city = request.args.get("city")
+
+    snapshot = g.snapshot
+    try:
+        # Validate all parameters
+        snapshot.validator.validate_request(year1, year2, city)
+        snapshot.validator.validate_tile(z, x, y)
+
+        # Read the tile's layers from disk, generating them on the housing executor on first
+        # request; tiles outside the data are empty and never built or stored
+        pair = f"{year1}-{year2}"
+        coords = (str(z), str(x), str(y))
+        if not tile_intersects(z, x, y, snapshot.data_bounds):
+            entry = EMPTY_TILE
+        else:
+            block_groups = get_stored_tile(
+                (snapshot.version, pair, "block_groups", *coords),
+                lambda: get_housing_tile(
+                    snapshot.df,
+                    year1,
+                    year2,
+                    snapshot.geometry_store,
+                    z,
+                    x,
+                    y,
+                    snapshot.town_index,
+                    snapshot.geoid_index,
+                ),
+            )
+            city_layer = get_stored_tile(
+                (snapshot.version, pair, "city", city, *coords),
+                lambda: get_city_tile(
+                    snapshot.df,
+                    year1,
+                    year2,
+                    city,
+                    snapshot.geometry_store,
+                    z,
+                    x,
+                    y,
+                    snapshot.town_index,
+                    snapshot.geoid_index,
+                ),
+            )
+            # A tile's layers are concatenated protobuf messages
+            entry = CacheEntry(block_groups.body + city_layer.body)
+        response = Response(entry.body, status=200, mimetype=TILE_MIMETYPE)
+        response.set_etag(entry.etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = TILE_MAX_AGE
+        return response.make_conditional(request)
+
+    except ValidationError as e:
+        logger.warning(f"Validation error in housing_tile: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+    except ExecutorBusyError as e:
+        logger.warning(f"Housing executor busy in housing_tile: {str(e)}")
+        return busy_response()
+    except TimeoutError:
+        logger.warning("Timed out waiting for housing data in housing_tile")
+        return busy_response()
+    except FileNotFoundError as e:
+        logger.error(f"Required file not found: {str(e)}")
+        return jsonify({"error": f"Required file not found: {str(e)}"}), 500
+    except KeyError as e:
+        logger.error(f"Data column not found: {str(e)}")
+        return jsonify({"error": f"Data column not found: {str(e)}"}), 500
+    except Exception as e:
+        logger.error(f"Unexpected error in housing_tile: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route("/api/geometry", methods=["GET"])
+def geometry_data() -> Response:
+    """
+    Returns GeoJSON of the block group shapes only, keyed by GEOID20.
+    The shapes only change with the dataset version, so a request whose "v" query
+    parameter names the version being served (the X-Dataset-Version header) may be
+    cached indefinitely; other requests are cached briefly and revalidated by ETag.
+    The "detail" query parameter selects simplified geometries for zoomed-out maps.
+    """
+    detail = request.args.get("detail", "full")
+    version = request.args.get("v")
+
+    snapshot = g.snapshot
+    try:
+        snapshot.validator.validate_option(detail, DETAIL_LEVELS, "detail")
+        entry = get_geometry_payload(snapshot, detail)
+        response = Response(entry.body, status=200, mimetype="application/json")
+        response.set_etag(entry.etag)
+        response.cache_control.public = True
+        if version == snapshot.version:
+            response.cache_control.max_age = GEOMETRY_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.max_age = GEOMETRY_UNVERSIONED_MAX_AGE
+        return response.make_conditional(request)
+
+    except ValidationError as e:
+        logger.warning(f"Validation error in geometry_data: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        logger.error(f"Required file not found: {str(e)}")
+        return jsonify({"error": f"Required file not found: {str(e)}"}), 500
+    except Exception as e:
+        logger.error(f"Unexpected error in geometry_data: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
 if __name__ == "__main__":
     app.run()
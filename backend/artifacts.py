@@ -0,0 +1,194 @@
+"""Content-addressed store of precomputed API response bodies."""
+
+import gzip
+import json
+import logging
+import os
+from typing import Any, Optional
+
+from cache import CacheEntry, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Artifact kinds, one per precomputed response body
+POPULATION = "population"
+HOUSING_ATTRIBUTES = "housing_attributes"
+SENTENCES = "sentences"
+
+MANIFEST_FILE = "manifest.json"
+
+
+def artifact_key(kind: str, *parts: Any) -> str:
+    """
+    Returns the manifest key of an artifact.
+
+    Args:
+        kind: Artifact kind, e.g. POPULATION
+        *parts: Request parameters identifying the artifact, e.g. year1, year2, city
+
+    Returns:
+        Key such as "population/2010/2020/Boston"
+    """
+    return "/".join([kind, *map(str, parts)])
+
+
+class ArtifactStore:
+    """
+    Directory of precomputed response bodies addressed by their content hash.
+
+    Bodies are stored gzip-compressed under objects/, named by the SHA-256 of
+    their uncompressed bytes, so identical results are stored once and each
+    body's hash doubles as its ETag. manifest.json maps artifact keys to hashes
+    and records the dataset version the bodies were computed from. Stores are
+    written by precompute.py and only read by the app.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        manifest: Optional[dict[str, str]] = None,
+        version: Optional[str] = None,
+    ):
+        """
+        Initialize a store rooted at a directory.
+
+        Args:
+            directory: Root directory of the store
+            manifest: Mapping of artifact keys to content hashes (empty if not given)
+            version: Dataset version the artifacts are computed from (see dataset.dataset_version)
+        """
+        self.directory = directory
+        self.manifest = manifest if manifest is not None else {}
+        self.version = version
+
+    @classmethod
+    def load(cls, directory: str) -> "ArtifactStore":
+        """
+        Open an existing store.
+
+        Args:
+            directory: Root directory of the store
+
+        Returns:
+            Store with the manifest read from disk; manifests written before
+            versions were recorded load with no version
+
+        Raises:
+            FileNotFoundError: If the directory has no manifest
+        """
+        with open(os.path.join(directory, MANIFEST_FILE), "rb") as f:
+            data = json.loads(f.read())
+        if "artifacts" not in data:
+            return cls(directory, data)
+        return cls(directory, data["artifacts"], data.get("version"))
+
+    def __len__(self) -> int:
+        return len(self.manifest)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.manifest
+
+    @property
+    def manifest_path(self) -> str:
+        """Path of the manifest file."""
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def object_path(self, digest: str) -> str:
+        """
+        Returns the path of a stored body.
+
+        Args:
+            digest: Content hash of the body
+
+        Returns:
+            Path under objects/, sharded by the first two hex digits
+        """
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Returns the stored body for an artifact key.
+
+        Args:
+            key: Artifact key (see artifact_key)
+
+        Returns:
+            Entry with the uncompressed body, or None if the key was not precomputed
+            or its stored body is missing or corrupt
+        """
+        digest = self.manifest.get(key)
+        if digest is None:
+            return None
+        try:
+            with open(self.object_path(digest), "rb") as f:
+                return CacheEntry(gzip.decompress(f.read()))
+        except (OSError, EOFError) as e:
+            # A missing object or a truncated or corrupt gzip stream (BadGzipFile
+            # is an OSError) falls back to computing the response live
+            logger.warning(f"Could not read artifact {key}: {e}")
+            return None
+
+    def put(self, key: str, body: bytes) -> str:
+        """
+        Store a body under an artifact key, writing it only if its content is new.
+
+        Args:
+            key: Artifact key (see artifact_key)
+            body: Serialized response body
+
+        Returns:
+            Content hash of the body
+        """
+        digest = content_hash(body)
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(gzip.compress(body, mtime=0))
+            os.replace(tmp_path, path)
+        self.manifest[key] = digest
+        return digest
+
+    def save(self) -> None:
+        """
+        Write the manifest and version, replacing any existing manifest atomically.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"version": self.version, "artifacts": self.manifest},
+                f,
+                separators=(",", ":"),
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.manifest_path)
+
+
+def open_artifact_store(directory: str, version: str) -> Optional[ArtifactStore]:
+    """
+    Open a store if it exists and was computed from the given dataset version.
+
+    Args:
+        directory: Root directory of the store
+        version: Dataset version being served (see dataset.dataset_version)
+
+    Returns:
+        The store, or None if it is missing or stale
+    """
+    try:
+        store = ArtifactStore.load(directory)
+    except FileNotFoundError:
+        return None
+
+    if store.version != version:
+        logger.warning(
+            f"{directory} was computed from dataset version {store.version}, "
+            f"not {version}; computing responses live. "
+            "Run `python precompute.py` to rebuild it."
+        )
+        return None
+
+    logger.info(f"Serving {len(store)} precomputed responses from {directory}")
+    return store
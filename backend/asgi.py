@@ -0,0 +1,21 @@
+"""
+ASGI entry point that serves the Flask app from an event loop.
+
+Connections are accepted and streamed asynchronously, and requests run on a
+bounded pool of ASGI_THREADS threads. Heavy map payloads are computed on the
+app's housing executor (HOUSING_WORKERS threads), where identical concurrent
+requests share one computation. A request thread waits for that computation,
+so at most HOUSING_MAX_WAITING requests wait at once and the rest get 503
+with Retry-After; with HOUSING_MAX_WAITING below ASGI_THREADS, cheap requests
+such as /api/population always find free threads instead of queueing behind
+them.
+
+Usage (from the backend directory):
+    uvicorn asgi:asgi_app --workers 4
+"""
+
+from a2wsgi import WSGIMiddleware
+from app import app
+from config import ASGI_THREADS
+
+asgi_app = WSGIMiddleware(app, workers=ASGI_THREADS)
@@ -0,0 +1 @@
+"""Performance benchmarks for the backend data processing."""
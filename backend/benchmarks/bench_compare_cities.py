@@ -0,0 +1,99 @@
+"""
+Micro-benchmark for compare_cities on a statewide-sized dataset.
+
+Compares one vectorized comparison of every town against calling
+get_population_data and get_city_housing_data once per town (the way
+scripted /api/population calls work), and checks that both agree.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_compare_cities [--rows 5116] [--towns 351] [--repeat 5]
+"""
+
+import argparse
+import timeit
+
+import pandas as pd
+
+from benchmarks.synthetic import (
+    STATEWIDE_BLOCK_GROUPS,
+    STATEWIDE_TOWNS,
+    make_synthetic_frame,
+)
+from data_processing import (
+    AggregateCube,
+    TownIndex,
+    compare_cities,
+    get_city_housing_data,
+    get_population_data,
+)
+
+YEARS = ["2010", "2020"]
+
+
+def compare_per_city(
+    df: pd.DataFrame, cube: AggregateCube, town_index: TownIndex, cities: list[str]
+) -> list[tuple[dict, dict]]:
+    """
+    Baseline: one population and housing computation per city.
+    """
+    return [
+        (
+            get_population_data(df, *YEARS, city, cube, town_index),
+            get_city_housing_data(df, *YEARS, city, cube, town_index),
+        )
+        for city in cities
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=STATEWIDE_BLOCK_GROUPS)
+    parser.add_argument("--towns", type=int, default=STATEWIDE_TOWNS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = make_synthetic_frame(args.rows, args.towns)
+    cube = AggregateCube(df, YEARS)
+    town_index = TownIndex(df)
+    cities = cube.towns
+
+    expected = compare_per_city(df, cube, town_index, cities)
+    actual = compare_cities(cube, *YEARS, cities)
+    for pos, (population, housing) in enumerate(expected):
+        assert (
+            population["total_city_change"]["change"]
+            == actual["total_city_change"]["change"][pos]
+        )
+        assert housing["change_percent"] == actual["housing"]["change_percent"][pos]
+
+    per_city = min(
+        timeit.repeat(
+            lambda: compare_per_city(df, cube, town_index, cities),
+            number=1,
+            repeat=args.repeat,
+        )
+    )
+    vectorized = min(
+        timeit.repeat(
+            lambda: compare_cities(cube, *YEARS, cities),
+            number=1,
+            repeat=args.repeat,
+        )
+    )
+    single = min(
+        timeit.repeat(
+            lambda: compare_cities(cube, *YEARS, cities[:1]),
+            number=1,
+            repeat=args.repeat,
+        )
+    )
+
+    print(f"rows: {args.rows}, towns: {len(cities)}")
+    print(f"per-city calls: {per_city * 1000:.2f} ms")
+    print(f"vectorized:     {vectorized * 1000:.2f} ms")
+    print(f"one town:       {single * 1000:.2f} ms")
+    print(f"speedup:        {per_city / vectorized:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark for serializing the statewide housing map GeoJSON.
+
+Compares the previous path (GeoDataFrame.to_json, json.loads, then re-encoding
+the dictionary as jsonify does) against the single-pass byte serializer, on
+every checked-in block group shapefile joined with synthetic attribute columns.
+Reports the best wall-clock time and the peak Python memory of each path.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_geojson_serialization [--repeat 3] [--columns 200]
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+import tracemalloc
+from typing import Callable
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from config import SHAPEFILE_DIR_STR, SHAPEFILE_PATTERN
+
+from data_processing import GeometryStore
+from data_processing.serialization import geodataframe_to_geojson, orjson
+
+
+def make_statewide_frame(columns: int, seed: int = 0) -> gpd.GeoDataFrame:
+    """
+    Load every county shapefile and add synthetic attribute columns.
+    """
+    prefix, suffix = SHAPEFILE_PATTERN.split("{fips}")
+    paths = glob.glob(os.path.join(SHAPEFILE_DIR_STR, f"{prefix}*{suffix}"))
+    fips_codes = sorted(
+        os.path.basename(path)[len(prefix) : -len(suffix)] for path in paths
+    )
+    # Skip files that do not match a 5-digit county FIPS code (e.g. statewide files)
+    fips_codes = [fips for fips in fips_codes if len(fips) == 5]
+    gdf = GeometryStore(SHAPEFILE_DIR_STR, SHAPEFILE_PATTERN).get(fips_codes)
+
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, 1000, (len(gdf), columns)).astype(float)
+    values[rng.random(values.shape) < 0.02] = np.nan
+    attributes = pd.DataFrame(
+        values, columns=[f"attribute_{i}" for i in range(columns)], index=gdf.index
+    )
+    return gpd.GeoDataFrame(pd.concat([gdf, attributes], axis=1))
+
+
+def serialize_via_dict(gdf: gpd.GeoDataFrame) -> bytes:
+    """
+    Previous path: to_json, parse back into dictionaries, then encode again.
+    """
+    geojson = json.loads(gdf.to_json())
+    return json.dumps(geojson, separators=(",", ":")).encode()
+
+
+def measure(func: Callable, gdf: gpd.GeoDataFrame, repeat: int) -> tuple[float, float]:
+    """
+    Returns the best time in seconds and the peak traced memory in MB of a serializer.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(gdf)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(gdf)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--columns", type=int, default=200)
+    args = parser.parse_args()
+
+    gdf = make_statewide_frame(args.columns)
+    old_body = serialize_via_dict(gdf)
+    new_body = geodataframe_to_geojson(gdf)
+    assert json.loads(old_body) == json.loads(new_body)
+
+    old_time, old_peak = measure(serialize_via_dict, gdf, args.repeat)
+    new_time, new_peak = measure(geodataframe_to_geojson, gdf, args.repeat)
+
+    print(f"features: {len(gdf)}, payload: {len(new_body) / 1024 / 1024:.1f} MB")
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}")
+    print(f"to_json/loads/dumps: {old_time:.2f} s, peak {old_peak:.0f} MB")
+    print(f"single pass:         {new_time:.2f} s, peak {new_peak:.0f} MB")
+    print(f"speedup:             {old_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+End-to-end benchmark suite for the backend on synthetic NHGIS-shaped data.
+
+Writes a seeded synthetic CSV for the checked-in shapefiles, starts the
+app on it, and times validation, get_population_data, merge_geojson and
+the /api/population and /api/housing endpoints through the Flask test
+client. Results are written as JSON so runs on different commits can be
+compared; with --compare, each benchmark's median is checked against an
+earlier result file and the exit status is 1 if any got slower than the
+threshold.
+
+Usage (from the backend directory):
+    python -m benchmarks.suite [--output results.json] [--compare baseline.json]
+        [--repeat 5] [--threshold 0.1] [--workdir DIR]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+YEAR1 = "2010"
+YEAR2 = "2020"
+# Calls per sample for benchmarks too fast to time one call at a time
+FAST_CALLS = 1000
+
+
+def measure(fn: Callable[[], Any], repeat: int, number: int = 1) -> dict[str, Any]:
+    """
+    Time a function after one warm-up call.
+
+    Args:
+        fn: Function to time
+        repeat: Number of samples
+        number: Calls per sample
+
+    Returns:
+        Dictionary of min, median and mean milliseconds per call
+    """
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1000)
+    return {
+        "min_ms": round(min(samples), 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.mean(samples), 4),
+        "samples": len(samples),
+        "calls_per_sample": number,
+    }
+
+
+def get_git_commit() -> Optional[str]:
+    """Returns the current git commit, if the backend is in a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure_environment(workdir: str) -> str:
+    """
+    Point the app's data paths at the work directory, before config is imported.
+
+    The artifact store and tile cache point at empty directories so every
+    benchmark measures live computation.
+
+    Args:
+        workdir: Directory for the synthetic CSV and derived files
+
+    Returns:
+        Path of the synthetic CSV
+    """
+    csv_path = os.path.join(workdir, "nhgis.csv")
+    os.environ["CSV_FILE"] = csv_path
+    os.environ["DATASET_FILE"] = os.path.join(workdir, "nhgis.feather")
+    os.environ["GEOMETRY_FILE"] = os.path.join(workdir, "block_groups.feather")
+    os.environ["ARTIFACT_DIR"] = os.path.join(workdir, "artifacts")
+    os.environ["TILE_CACHE_DIR"] = os.path.join(workdir, "tiles")
+    os.environ["RESPONSE_CACHE_PREWARM_CITIES"] = ""
+    return csv_path
+
+
+def run_suite(workdir: str, repeat: int, seed: int) -> dict[str, Any]:
+    """
+    Generate the synthetic data, start the app on it and run every benchmark.
+
+    Args:
+        workdir: Directory for the synthetic CSV and derived files
+        repeat: Samples per benchmark
+        seed: Random seed of the synthetic data
+
+    Returns:
+        Dictionary of run metadata and per-benchmark results
+    """
+    csv_path = configure_environment(workdir)
+
+    # Imported only now so config reads the environment set above
+    from benchmarks.synthetic import write_synthetic_csv
+
+    synthetic = write_synthetic_csv(csv_path, seed=seed)
+
+    start = time.perf_counter()
+    app_module = importlib.import_module("app")
+    startup_ms = (time.perf_counter() - start) * 1000
+
+    from data_processing import get_population_data, merge_geojson
+
+    # Benchmark the town with the most block groups, like a large city
+    city = synthetic["TOWN"].value_counts().idxmax()
+    snapshot = app_module.registry.current
+    df = snapshot.df
+    client = app_module.app.test_client()
+    body = {"year1": YEAR1, "year2": YEAR2, "city": city}
+
+    def post(path: str) -> bytes:
+        response = client.post(path, json=body)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return response.get_data()
+
+    def housing_uncached() -> bytes:
+        app_module.housing_cache.clear()
+        return post("/api/housing")
+
+    results = {
+        "startup": {"min_ms": round(startup_ms, 4), "samples": 1},
+        "validate_request": measure(
+            lambda: snapshot.validator.validate_request(YEAR1, YEAR2, city),
+            repeat,
+            FAST_CALLS,
+        ),
+        "get_population_data": measure(
+            lambda: get_population_data(
+                df, YEAR1, YEAR2, city, snapshot.aggregate_cube, snapshot.town_index
+            ),
+            repeat,
+        ),
+        "merge_geojson": measure(
+            lambda: merge_geojson(
+                df,
+                YEAR1,
+                YEAR2,
+                city,
+                snapshot.geometry_store,
+                town_index=snapshot.town_index,
+                geoid_index=snapshot.geoid_index,
+            ),
+            repeat,
+        ),
+        "api_population": measure(lambda: post("/api/population"), repeat),
+        "api_housing_uncached": measure(housing_uncached, repeat),
+        "api_housing_cached": measure(lambda: post("/api/housing"), repeat),
+    }
+    results["api_population"]["bytes"] = len(post("/api/population"))
+    results["api_housing_cached"]["bytes"] = len(post("/api/housing"))
+
+    import geopandas
+    import numpy
+    import pandas
+
+    return {
+        "metadata": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": get_git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": numpy.__version__,
+            "pandas": pandas.__version__,
+            "geopandas": geopandas.__version__,
+            "seed": seed,
+            "block_groups": len(synthetic),
+            "towns": int(synthetic["TOWN"].nunique()),
+            "city": city,
+            "years": [YEAR1, YEAR2],
+        },
+        "results": results,
+    }
+
+
+def compare_results(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """
+    Print each benchmark's median next to a baseline run's.
+
+    Args:
+        current: Results of this run
+        baseline: Results of an earlier run
+        threshold: Relative slowdown counted as a regression (0.1 is 10%)
+
+    Returns:
+        Names of the benchmarks that regressed
+    """
+    regressions = []
+    print(f"{'benchmark':<24}{'baseline ms':>14}{'current ms':>14}{'ratio':>9}")
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None or "median_ms" not in result or "median_ms" not in previous:
+            continue
+        ratio = result["median_ms"] / previous["median_ms"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  slower"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(
+            f"{name:<24}{previous['median_ms']:>14.3f}{result['median_ms']:>14.3f}"
+            f"{ratio:>9.2f}{flag}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument(
+        "--compare", help="JSON results of an earlier run to compare with"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--workdir", help="Directory for the synthetic data (default: temporary)"
+    )
+    args = parser.parse_args()
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        report = run_suite(args.workdir, args.repeat, args.seed)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            report = run_suite(workdir, args.repeat, args.seed)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.threshold)
+        if regressions:
+            print(f"regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
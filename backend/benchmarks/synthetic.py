@@ -0,0 +1,173 @@
+"""
+Synthetic NHGIS-shaped CSV for benchmarks.
+
+The real nhgis.csv is not checked in, so this writes a CSV with the same
+columns: geographic codes and a TOWN for every block group in the
+checked-in shapefiles, and male/female age, race and housing unit counts
+for each census year. Values are random but seeded, so every run measures
+the same data.
+
+Usage (from the backend directory):
+    python -m benchmarks.synthetic OUTPUT [--seed 0]
+"""
+
+import argparse
+import glob
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from config import SHAPEFILE_DIR_STR
+from data_processing.constants import get_age_groups, get_race_groups
+
+YEARS = ["1990", "2000", "2010", "2020"]
+# Consecutive tracts of a county grouped into one synthetic town
+TRACTS_PER_TOWN = 6
+# Share of block groups with no housing count, and with zero housing units
+MISSING_HOUSING_SHARE = 0.02
+ZERO_HOUSING_SHARE = 0.02
+# Number of 2020 census block groups in Massachusetts
+STATEWIDE_BLOCK_GROUPS = 5116
+# Number of cities and towns in Massachusetts
+STATEWIDE_TOWNS = 351
+
+
+def load_block_group_codes(shapefile_dir: str) -> pd.DataFrame:
+    """
+    Returns the state, county, tract and block group codes of every shapefile block group.
+
+    Args:
+        shapefile_dir: Directory containing the block group shapefiles
+
+    Returns:
+        DataFrame with STATEA, COUNTYA, TRACTA and BLCK_GRPA columns (as integers, like NHGIS)
+
+    Raises:
+        FileNotFoundError: If the directory has no block group shapefiles
+    """
+    paths = sorted(glob.glob(os.path.join(shapefile_dir, "tl_2020_*_bg20.shp")))
+    if not paths:
+        raise FileNotFoundError(f"No block group shapefiles in {shapefile_dir}")
+
+    codes = pd.concat(
+        [gpd.read_file(path, ignore_geometry=True) for path in paths], ignore_index=True
+    )
+    return pd.DataFrame(
+        {
+            "STATEA": codes["STATEFP20"].astype(int),
+            "COUNTYA": codes["COUNTYFP20"].astype(int),
+            "TRACTA": codes["TRACTCE20"].astype(int),
+            "BLCK_GRPA": codes["BLKGRPCE20"].astype(int),
+        }
+    )
+
+
+def make_synthetic_nhgis(codes: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """
+    Build an NHGIS-shaped frame for the given block groups.
+
+    Args:
+        codes: Block group codes from load_block_group_codes
+        seed: Random seed
+
+    Returns:
+        DataFrame with geographic codes, TOWN and every per-year count column
+    """
+    rng = np.random.default_rng(seed)
+    rows = len(codes)
+
+    tract_rank = codes.groupby("COUNTYA")["TRACTA"].rank(method="dense").astype(int) - 1
+    towns = (
+        "Town "
+        + codes["COUNTYA"].astype(str).str.zfill(3)
+        + "-"
+        + (tract_rank // TRACTS_PER_TOWN).astype(str)
+    )
+
+    columns = make_count_columns(rng, rows)
+    return pd.concat(
+        [codes, towns.rename("TOWN"), pd.DataFrame(columns, index=codes.index)], axis=1
+    )
+
+
+def make_count_columns(rng: np.random.Generator, rows: int) -> dict[str, np.ndarray]:
+    """
+    Returns random age, race and housing unit counts for every year.
+
+    Args:
+        rng: Random generator to draw the counts from
+        rows: Number of block groups
+
+    Returns:
+        Dictionary mapping each per-year count column to its values
+    """
+    columns = {}
+    for year in YEARS:
+        for csv_age in get_age_groups():
+            for sex in ["male", "female"]:
+                columns[f"{sex}_{csv_age}_{year}"] = rng.integers(0, 60, rows)
+        for race in get_race_groups():
+            columns[f"pop_{race}_{year}"] = rng.integers(0, 300, rows)
+        housing = rng.integers(0, 800, rows).astype(float)
+        housing[rng.random(rows) < MISSING_HOUSING_SHARE] = np.nan
+        housing[rng.random(rows) < ZERO_HOUSING_SHARE] = 0
+        columns[f"housing_units_{year}"] = housing
+    return columns
+
+
+def make_synthetic_frame(
+    rows: int = STATEWIDE_BLOCK_GROUPS, towns: int = STATEWIDE_TOWNS, seed: int = 0
+) -> pd.DataFrame:
+    """
+    Build an in-memory frame of TOWN and every per-year count column, without shapefiles.
+
+    Towns are assigned at random, so the frame suits micro-benchmarks that
+    need the statewide size but not real block group codes.
+
+    Args:
+        rows: Number of block groups
+        towns: Number of towns
+        seed: Random seed
+
+    Returns:
+        DataFrame with TOWN and every per-year count column
+    """
+    rng = np.random.default_rng(seed)
+    town_names = rng.choice([f"Town {i}" for i in range(towns)], rows)
+    return pd.DataFrame({"TOWN": town_names, **make_count_columns(rng, rows)})
+
+
+def write_synthetic_csv(
+    path: str, shapefile_dir: str = SHAPEFILE_DIR_STR, seed: int = 0
+) -> pd.DataFrame:
+    """
+    Write a synthetic NHGIS-shaped CSV covering the block groups in the shapefiles.
+
+    Args:
+        path: Output CSV path
+        shapefile_dir: Directory containing the block group shapefiles
+        seed: Random seed
+
+    Returns:
+        The frame that was written
+    """
+    df = make_synthetic_nhgis(load_block_group_codes(shapefile_dir), seed)
+    df.to_csv(path, index=False)
+    return df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--shapefile-dir", default=SHAPEFILE_DIR_STR)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = write_synthetic_csv(args.output, args.shapefile_dir, args.seed)
+    print(f"wrote {args.output}: {len(df)} block groups, {df['TOWN'].nunique()} towns")
+
+
+if __name__ == "__main__":
+    main()
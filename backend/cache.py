@@ -0,0 +1,289 @@
+"""In-memory and on-disk response caching for API endpoints."""
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+from urllib.parse import quote
+
+
+def content_hash(body: bytes) -> str:
+    """
+    Returns a stable hash of a response body, suitable for use as an ETag.
+
+    Args:
+        body: Serialized response body
+
+    Returns:
+        Hex digest of the body
+    """
+    return hashlib.sha256(body).hexdigest()
+
+
+class CacheEntry:
+    """A serialized response body and its content hash."""
+
+    def __init__(self, body: bytes):
+        """
+        Initialize a cache entry.
+
+        Args:
+            body: Serialized response body
+        """
+        self.body = body
+        self.etag = content_hash(body)
+
+    @property
+    def size(self) -> int:
+        """Number of bytes the entry holds."""
+        return len(self.body)
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of serialized response bodies with a memory cap.
+
+    Least recently used entries are evicted once the total size of all bodies
+    exceeds max_bytes. Bodies larger than the cap are returned but never stored.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_bytes: Maximum total size of cached bodies in bytes
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Returns the cached entry for a key and marks it as recently used.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached entry, or None if the key is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes) -> CacheEntry:
+        """
+        Store a response body, evicting least recently used entries as needed.
+
+        Args:
+            key: Cache key
+            body: Serialized response body
+
+        Returns:
+            The entry for the stored body
+        """
+        entry = CacheEntry(body)
+        if entry.size > self.max_bytes:
+            return entry
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous.size
+            self._entries[key] = entry
+            self.current_bytes += entry.size
+            # Evict from the least recently used end until back under the cap
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+
+        return entry
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], bytes]) -> CacheEntry:
+        """
+        Returns the cached entry for a key, building and storing it on a miss.
+
+        Args:
+            key: Cache key
+            factory: Function producing the serialized body on a cache miss
+
+        Returns:
+            Cached or newly created entry
+        """
+        entry = self.get(key)
+        if entry is None:
+            entry = self.put(key, factory())
+        return entry
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> None:
+        """
+        Remove every entry whose key matches a predicate.
+
+        Args:
+            predicate: Returns whether an entry's key should be removed
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self.current_bytes -= self._entries.pop(key).size
+
+    def clear(self) -> None:
+        """
+        Remove all entries from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+class TileCache:
+    """
+    Directory of generated tiles, so each tile is built once and then read from disk.
+
+    Tiles are stored at one file per key, e.g.
+    "{dir}/{version}/2010-2020/block_groups/12/1238/1515.mvt", and survive
+    restarts. Files are written atomically, so concurrent workers generating
+    the same tile never serve a partial file. Keys start with the dataset
+    version, so tiles of replaced data are never served; remove deletes them.
+
+    Empty tiles are cheap to generate and are never written. Once the stored
+    tiles reach max_bytes, new tiles are still generated and returned but no
+    longer written. The size is that of the whole directory, counted when the
+    cache is created and again every rescan_interval seconds, so tiles written
+    by other worker processes count toward the cap.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        suffix: str = ".mvt",
+        rescan_interval: float = 60.0,
+    ):
+        """
+        Initialize a tile cache rooted at a directory (created on first write).
+
+        Args:
+            directory: Root directory for tile files
+            max_bytes: Maximum total size of stored tiles in bytes
+            suffix: File name suffix of tiles
+            rescan_interval: Seconds after which the directory size is counted again
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        self._rescan()
+
+    def path(self, key: tuple[str, ...]) -> str:
+        """
+        Returns the file path of a tile.
+
+        Args:
+            key: Path components identifying the tile
+
+        Returns:
+            Path under the cache directory (components are URL-quoted)
+        """
+        parts = [quote(str(part), safe="") for part in key]
+        return os.path.join(self.directory, *parts) + self.suffix
+
+    def get_or_create(
+        self, key: tuple[str, ...], factory: Callable[[], bytes]
+    ) -> CacheEntry:
+        """
+        Returns the stored tile for a key, generating it on a miss and
+        writing it unless it is empty or the cache is full.
+
+        Args:
+            key: Path components identifying the tile
+            factory: Function producing the encoded tile on a miss
+
+        Returns:
+            Entry for the stored or newly created tile
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                return CacheEntry(f.read())
+        except FileNotFoundError:
+            pass
+
+        body = factory()
+        if not body:
+            return CacheEntry(body)
+        if time.monotonic() - self._scanned_at > self.rescan_interval:
+            self._rescan()
+        with self._lock:
+            if self.current_bytes + len(body) > self.max_bytes:
+                return CacheEntry(body)
+            self.current_bytes += len(body)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        return CacheEntry(body)
+
+    def remove(self, version: str) -> None:
+        """
+        Remove the tiles of one dataset version.
+
+        Args:
+            version: First key component (the dataset version) whose tiles are removed
+        """
+        shutil.rmtree(
+            os.path.join(self.directory, quote(str(version), safe="")),
+            ignore_errors=True,
+        )
+        self._rescan()
+
+    def clear(self) -> None:
+        """
+        Remove all stored tiles.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self._rescan()
+
+    def _rescan(self) -> None:
+        stored_bytes = self._stored_bytes(self.directory)
+        with self._lock:
+            self.current_bytes = stored_bytes
+            self._scanned_at = time.monotonic()
+
+    @classmethod
+    def _stored_bytes(cls, directory: str) -> int:
+        total = 0
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    total += cls._stored_bytes(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+            except FileNotFoundError:
+                # Removed by another process while counting
+                pass
+        return total
@@ -0,0 +1,90 @@
+"""Content-Encoding negotiation and compression of response bodies."""
+
+import zlib
+from typing import Iterable, Optional
+
+from data_processing.metrics import timed_stage
+from werkzeug.datastructures import Accept
+
+# Brotli is optional; without it responses are only gzip-compressed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Supported encodings in order of preference when the client accepts several equally
+ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+# Bodies smaller than this are sent as-is; compression would barely shrink them
+MIN_COMPRESS_BYTES = 1024
+# zlib level 6 and Brotli quality 5 compress GeoJSON nearly as well as the
+# maximum settings at a small fraction of the CPU time
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def negotiate_encoding(accept_encodings: Accept, size: int) -> Optional[str]:
+    """
+    Choose the content encoding for a response body.
+
+    Args:
+        accept_encodings: Parsed Accept-Encoding header of the request
+        size: Size of the uncompressed body in bytes
+
+    Returns:
+        "br" or "gzip", or None to send the body uncompressed
+    """
+    if size < MIN_COMPRESS_BYTES:
+        return None
+
+    best_encoding, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        # quality() also applies "*"; encodings listed with q=0 are refused
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+@timed_stage("compress")
+def compress_chunks(chunks: Iterable[bytes], encoding: str) -> bytes:
+    """
+    Compress a body given as chunks, without joining them first.
+
+    Args:
+        chunks: Parts of the uncompressed body, in order
+        encoding: "br" or "gzip"
+
+    Returns:
+        Compressed body
+
+    Raises:
+        ValueError: If the encoding is not supported
+    """
+    if encoding == "gzip":
+        # wbits 31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        parts = [compressor.compress(chunk) for chunk in chunks]
+        parts.append(compressor.flush())
+    elif encoding == "br" and brotli is not None:
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        parts = [compressor.process(chunk) for chunk in chunks]
+        parts.append(compressor.finish())
+    else:
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+    return b"".join(parts)
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """
+    Returns the ETag of one encoding of a body.
+
+    Each encoding is a different representation, so it needs its own strong ETag.
+
+    Args:
+        etag: ETag of the uncompressed body
+        encoding: Content encoding, or None for the uncompressed body
+
+    Returns:
+        The ETag, suffixed with the encoding if there is one
+    """
+    return etag if encoding is None else f"{etag}-{encoding}"
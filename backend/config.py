@@ -10,6 +10,22 @@ BASE_DIR = Path(__file__).parent
 DATA_DIR = Path(os.getenv("DATA_DIR", BASE_DIR / "data"))
 SHAPEFILE_DIR = Path(os.getenv("SHAPEFILE_DIR", DATA_DIR / "geojsons"))
 CSV_FILE = Path(os.getenv("CSV_FILE", DATA_DIR / "nhgis.csv"))
+# Typed columnar copy of CSV_FILE, created with `python dataset.py`
+DATASET_FILE = Path(os.getenv("DATASET_FILE", CSV_FILE.with_suffix(".feather")))
+# Preprocessed block group geometries, created with `python dataset.py`
+GEOMETRY_FILE = Path(os.getenv("GEOMETRY_FILE", DATA_DIR / "block_groups.feather"))
+# When true, the first worker writes missing or stale Feather files so every
+# worker maps the same files instead of holding private copies of the data
+SHARED_DATASET = os.getenv("SHARED_DATASET", "false").lower() == "true"
+
+# Generated vector tiles for /api/housing/tiles, written on first request
+TILE_CACHE_DIR = Path(os.getenv("TILE_CACHE_DIR", DATA_DIR / "tiles"))
+# Disk cap in bytes for the whole tile directory, shared by all worker processes; once
+# reached, new tiles are served without being stored
+TILE_CACHE_MAX_BYTES = int(os.getenv("TILE_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+
+# Precomputed API responses, created with `python precompute.py`
+ARTIFACT_DIR = Path(os.getenv("ARTIFACT_DIR", DATA_DIR / "artifacts"))
 
 # Shapefile pattern
 SHAPEFILE_PATTERN = os.getenv("SHAPEFILE_PATTERN", "tl_2020_{fips}_bg20.shp")
@@ -17,4 +33,48 @@ SHAPEFILE_PATTERN = os.getenv("SHAPEFILE_PATTERN", "tl_2020_{fips}_bg20.shp")
 # Convert Path objects to strings for compatibility with existing code
 # Some libraries (like geopandas) expect string paths
 SHAPEFILE_DIR_STR = str(SHAPEFILE_DIR)
-CSV_FILE_STR = str(CSV_FILE)
\ No newline at end of file
+CSV_FILE_STR = str(CSV_FILE)
+DATASET_FILE_STR = str(DATASET_FILE)
+GEOMETRY_FILE_STR = str(GEOMETRY_FILE)
+TILE_CACHE_DIR_STR = str(TILE_CACHE_DIR)
+ARTIFACT_DIR_STR = str(ARTIFACT_DIR)
+
+# Response cache for /api/housing map payloads, capped by total body size in bytes
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Comma-separated cities whose map payloads are built for every year pair at startup
+RESPONSE_CACHE_PREWARM_CITIES = [
+    city.strip()
+    for city in os.getenv("RESPONSE_CACHE_PREWARM_CITIES", "").split(",")
+    if city.strip()
+]
+
+# Cache of gzip/brotli-compressed response bodies, capped by total compressed size in bytes
+COMPRESSED_CACHE_MAX_BYTES = int(
+    os.getenv("COMPRESSED_CACHE_MAX_BYTES", 128 * 1024 * 1024)
+)
+# Threads compressing response bodies with an ETag, separate from the map payload threads
+COMPRESSION_WORKERS = int(os.getenv("COMPRESSION_WORKERS", 2))
+
+# When true, every response carries a Server-Timing header with per-stage durations;
+# otherwise only requests sending "X-Server-Timing: 1" get one
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() == "true"
+
+# Threads computing map payloads and tiles; identical concurrent requests share one computation
+HOUSING_WORKERS = int(os.getenv("HOUSING_WORKERS", 2))
+# Requests that may wait for map payloads and tiles at once; further requests get 503 right
+# away, so keep this below ASGI_THREADS to leave threads free for cheap requests
+HOUSING_MAX_WAITING = int(os.getenv("HOUSING_MAX_WAITING", 2 * HOUSING_WORKERS))
+# Seconds a request waits for a map payload before answering 503 (the computation continues)
+HOUSING_TIMEOUT = float(os.getenv("HOUSING_TIMEOUT", 60))
+# Seconds between checks for changed source files, which are then loaded and swapped
+# in without a restart; 0 turns checking off
+DATASET_RELOAD_INTERVAL = float(os.getenv("DATASET_RELOAD_INTERVAL", 0))
+# Bearer token for POST /api/reload; the endpoint is disabled when empty
+RELOAD_TOKEN = os.getenv("RELOAD_TOKEN", "")
+# Workers splitting each GeoJSON map payload by county; 0 or 1 builds payloads serially
+MERGE_WORKERS = int(os.getenv("MERGE_WORKERS", 0))
+# "thread" shares the loaded data; "process" workers each load their own copy
+# (map SHARED_DATASET files to share memory) and also run the GIL-bound steps in parallel
+MERGE_POOL = os.getenv("MERGE_POOL", "thread").lower()
+# Request-handling threads per process when serving through asgi.py
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", 16))
@@ -0,0 +1,299 @@
+"""
+Worker processes that build GeoJSON map payloads one county at a time.
+
+Each worker loads the dataset and block group geometries once, like the
+precompute workers, so tasks only carry request parameters and row positions.
+The app plans the county chunks and stitches the workers' features together.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+from data_processing import (
+    GeoidIndex,
+    GeometryStore,
+    TownIndex,
+    feature_collection,
+    get_county_fips_codes,
+    merge_county_features,
+    merge_geojson,
+    plan_county_chunks,
+)
+from dataset import dataset_version, load_dataset
+
+logger = logging.getLogger(__name__)
+
+# Dataset and lookups loaded once per worker process by init_worker
+_worker_state: dict[str, Any] = {}
+
+# Seconds each warm-up task holds its worker, so ready workers leave tasks for the others
+WARM_TASK_SECONDS = 0.05
+
+
+class DatasetVersionError(RuntimeError):
+    """Raised when a worker's files are not the dataset version the app is serving."""
+
+    pass
+
+
+def init_worker(
+    csv_path: str,
+    dataset_path: str,
+    shapefile_dir: str,
+    shapefile_pattern: str,
+    geometry_file: Optional[str],
+    version: str,
+    details: list[str],
+) -> None:
+    """
+    Load the dataset and block group geometries into a worker process.
+
+    The files are checked against the expected version before and after
+    loading, so a worker never holds data from a different version than the
+    app process it serves.
+
+    Args:
+        csv_path: Path to the source CSV
+        dataset_path: Path to the Feather file
+        shapefile_dir: Directory containing shapefiles
+        shapefile_pattern: Pattern for shapefile names
+        geometry_file: Preprocessed Feather file of block group geometries (optional)
+        version: Dataset version the app process loaded (see dataset.dataset_version)
+        details: Detail levels to precompute; others are built on first use
+
+    Raises:
+        DatasetVersionError: If the files on disk are a different version
+    """
+    check_version(csv_path, dataset_path, shapefile_dir, version)
+    df = load_dataset(csv_path, dataset_path)
+    geometry_store = GeometryStore(shapefile_dir, shapefile_pattern, geometry_file)
+    geometry_store.preload(get_county_fips_codes(df), details)
+    check_version(csv_path, dataset_path, shapefile_dir, version)
+
+    _worker_state["df"] = df
+    _worker_state["geoid_index"] = GeoidIndex(df)
+    _worker_state["geometry_store"] = geometry_store
+    _worker_state["version"] = version
+
+
+def check_version(
+    csv_path: str, dataset_path: str, shapefile_dir: str, version: str
+) -> None:
+    """
+    Raise DatasetVersionError if the files on disk are not the given version.
+    """
+    found = dataset_version(csv_path, dataset_path, shapefile_dir)
+    if found != version:
+        raise DatasetVersionError(
+            f"Dataset files are version {found}, expected version {version}"
+        )
+
+
+def warm_worker() -> int:
+    """
+    Task that runs once its worker process has been initialized.
+
+    Returns:
+        Process ID of the worker
+    """
+    time.sleep(WARM_TASK_SECONDS)
+    return os.getpid()
+
+
+def merge_county(
+    version: str,
+    year1: str,
+    year2: str,
+    city: str,
+    fips_codes: list[str],
+    detail: str,
+    positions: np.ndarray,
+    id_offset: int,
+    fill_missing: bool,
+) -> bytes:
+    """
+    Build the features of one county chunk in a worker process.
+
+    See data_processing.geospatial.merge_county_features for the arguments.
+
+    Raises:
+        DatasetVersionError: If the worker loaded a different version than requested
+    """
+    if _worker_state["version"] != version:
+        raise DatasetVersionError(
+            f"Worker holds dataset version {_worker_state['version']}, "
+            f"expected version {version}"
+        )
+    return merge_county_features(
+        _worker_state["df"],
+        year1,
+        year2,
+        city,
+        _worker_state["geometry_store"],
+        fips_codes,
+        detail,
+        positions,
+        id_offset,
+        fill_missing,
+        _worker_state["geoid_index"],
+    )
+
+
+class CountyProcessPool:
+    """
+    Builds GeoJSON map payloads across worker processes, one task per county.
+
+    Unlike a thread pool, the workers also run the pandas and JSON steps that
+    hold the GIL in parallel. Workers load the same files and version as the
+    app's snapshot, so block group positions planned in the app are valid in
+    every worker. If the workers cannot load that version (the files changed
+    since), payloads are built in the app process instead.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        geometry_store: GeometryStore,
+        max_workers: int,
+        version: str,
+        csv_path: str,
+        dataset_path: str,
+        town_index: Optional[TownIndex] = None,
+        geoid_index: Optional[GeoidIndex] = None,
+        details: Optional[list[str]] = None,
+    ):
+        """
+        Initialize the pool; worker processes start with start() or on the first request.
+
+        Args:
+            df: The app's dataset, used to plan the chunks
+            geometry_store: The app's block group geometries
+            max_workers: Number of worker processes
+            version: Dataset version df was loaded from (see dataset.dataset_version)
+            csv_path: Path to the source CSV df was loaded from
+            dataset_path: Path to the Feather file df was loaded from
+            town_index: Town index built from df (optional)
+            geoid_index: GEOID index built from df (optional)
+            details: Detail levels each worker precomputes (only "full" if not given)
+        """
+        self.df = df
+        self.geometry_store = geometry_store
+        self.max_workers = max_workers
+        self.version = version
+        self.town_index = town_index
+        self.geoid_index = GeoidIndex(df) if geoid_index is None else geoid_index
+        # Spawned rather than forked, since the app process runs request threads
+        self._pool = ProcessPoolExecutor(
+            max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(
+                csv_path,
+                dataset_path,
+                geometry_store.shapefile_dir,
+                geometry_store.shapefile_pattern,
+                geometry_store.geometry_file,
+                version,
+                details if details is not None else ["full"],
+            ),
+        )
+
+    def start(self) -> None:
+        """
+        Start every worker process and wait until all of them have loaded the data.
+
+        Call before the pool serves requests, so the first request does not
+        wait for the workers to load. The workers load in parallel.
+
+        Raises:
+            BrokenProcessPool: If a worker could not load the data (e.g. DatasetVersionError)
+        """
+        ready: set[int] = set()
+        while len(ready) < self.max_workers:
+            # Each submission starts another worker until max_workers are running
+            futures = [self._pool.submit(warm_worker) for _ in range(self.max_workers)]
+            ready.update(future.result() for future in futures)
+
+    def merge_geojson(
+        self,
+        year1: str,
+        year2: str,
+        city: str,
+        detail: str = "full",
+        scope: str = "state",
+        bbox: Optional[list[float]] = None,
+    ) -> bytes:
+        """
+        Same as data_processing.merge_geojson for the app's dataset.
+
+        Args:
+            year1: First year for comparison
+            year2: Second year for comparison
+            city: City name to analyze
+            detail: Geometry detail level; lower levels suit zoomed-out maps
+            scope: Map extent, one of SCOPES
+            bbox: [min_lon, min_lat, max_lon, max_lat] viewport to intersect (optional)
+
+        Returns:
+            Serialized GeoJSON FeatureCollection, ready to send as a response body
+        """
+        fips_codes = get_county_fips_codes(self.df)
+        chunks, fill_missing = plan_county_chunks(
+            self.df,
+            city,
+            self.geometry_store,
+            fips_codes,
+            scope,
+            bbox,
+            self.town_index,
+            self.geoid_index,
+        )
+        try:
+            futures = [
+                self._pool.submit(
+                    merge_county,
+                    self.version,
+                    year1,
+                    year2,
+                    city,
+                    fips_codes,
+                    detail,
+                    positions,
+                    id_offset,
+                    fill_missing,
+                )
+                for positions, id_offset in chunks
+            ]
+            return feature_collection([future.result() for future in futures])
+        except (BrokenProcessPool, DatasetVersionError) as e:
+            logger.warning(
+                f"County workers unavailable, merging in the app process: {e}"
+            )
+            return merge_geojson(
+                self.df,
+                year1,
+                year2,
+                city,
+                self.geometry_store,
+                detail,
+                scope,
+                bbox,
+                self.town_index,
+                self.geoid_index,
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the worker processes once queued tasks finish.
+
+        Args:
+            wait: Block until the workers have exited
+        """
+        self._pool.shutdown(wait=wait)
@@ -1,13 +1,68 @@
 """Data processing package for demographic analysis."""
 
+from .age_bins import DEFAULT_AGE_BINS, AgeBins, parse_age_bins
 from .aggregation import get_city_housing_data
-from .analysis import get_population_data
-from .geospatial import merge_geojson
+from .analysis import get_population_data, get_time_series
+from .comparison import compare_cities
+from .cube import AggregateCube
+from .geoid_index import GeoidIndex
+from .geometry_store import DETAIL_LEVELS, GeometryStore
+from .geospatial import (
+    SCOPES,
+    get_county_fips_codes,
+    get_geometry_geojson,
+    get_housing_attributes,
+    merge_county_features,
+    merge_geojson,
+    plan_county_chunks,
+)
 from .insights import create_housing_demographic_sentences
+from .metrics import (
+    BYTES_BUCKETS,
+    REGISTRY,
+    format_server_timing,
+    start_request_timings,
+    stop_request_timings,
+)
+from .serialization import dumps, feature_collection
+from .town_index import TownIndex
+from .vector_tiles import (
+    MAX_TILE_ZOOM,
+    get_city_tile,
+    get_housing_tile,
+    tile_intersects,
+)
 
 __all__ = [
+    "BYTES_BUCKETS",
+    "DEFAULT_AGE_BINS",
+    "DETAIL_LEVELS",
+    "MAX_TILE_ZOOM",
+    "REGISTRY",
+    "SCOPES",
+    "AgeBins",
+    "AggregateCube",
+    "GeoidIndex",
+    "GeometryStore",
+    "TownIndex",
+    "compare_cities",
     "get_city_housing_data",
+    "get_city_tile",
+    "get_county_fips_codes",
+    "get_geometry_geojson",
+    "get_housing_attributes",
+    "get_housing_tile",
     "get_population_data",
+    "get_time_series",
+    "merge_county_features",
     "merge_geojson",
+    "parse_age_bins",
+    "plan_county_chunks",
     "create_housing_demographic_sentences",
+    "dumps",
+    "feature_collection",
+    "format_server_timing",
+    "start_request_timings",
+    "stop_request_timings",
+    "tile_intersects",
 ]
@@ -0,0 +1,157 @@
+"""Age binnings compiled into aggregation matrices over the CSV age columns."""
+
+from functools import lru_cache
+from typing import Union
+
+import numpy as np
+
+from .constants import get_age_bin_presets, get_age_column_starts
+
+# A binning, as the youngest age of each bin in increasing order
+AgeBins = tuple[int, ...]
+
+DEFAULT_AGE_BINS: AgeBins = tuple(get_age_bin_presets()["5-year"])
+
+
+def parse_age_bins(age_bins: Union[str, list[int], None]) -> AgeBins:
+    """
+    Returns the binning described by a preset name or a list of bin starts.
+
+    Args:
+        age_bins: Name from get_age_bin_presets, list of the youngest age of
+            each bin (e.g. [0, 18, 65]), or None for the default 5-year bins
+
+    Returns:
+        The binning as a tuple of bin starts
+
+    Raises:
+        ValueError: If the preset is unknown or the bins do not start at 0,
+            increase strictly and fall on the ages where CSV columns start
+    """
+    if age_bins is None:
+        return DEFAULT_AGE_BINS
+
+    presets = get_age_bin_presets()
+    if isinstance(age_bins, str):
+        if age_bins not in presets:
+            raise ValueError(
+                f"Invalid age_bins: '{age_bins}'. Must be one of {list(presets)} "
+                "or a list of the youngest age of each bin"
+            )
+        return tuple(presets[age_bins])
+
+    if (
+        not isinstance(age_bins, list)
+        or not age_bins
+        or not all(
+            isinstance(age, int) and not isinstance(age, bool) for age in age_bins
+        )
+    ):
+        raise ValueError(
+            "age_bins must be a preset name or a non-empty list of integer ages"
+        )
+    if age_bins[0] != 0:
+        raise ValueError("age_bins must start at 0")
+    if any(younger >= older for younger, older in zip(age_bins, age_bins[1:])):
+        raise ValueError("age_bins must be strictly increasing")
+
+    column_starts = sorted(set(get_age_column_starts().values()))
+    invalid = [age for age in age_bins if age not in column_starts]
+    if invalid:
+        raise ValueError(
+            f"Invalid age_bins: {invalid}. Bins can only start at ages {column_starts}"
+        )
+    return tuple(age_bins)
+
+
+class AgeBinPlan:
+    """
+    A binning compiled into a 0/1 matrix from CSV age columns to bins.
+
+    Multiplying a town's sums of the male and female age columns (in the
+    order of features) by the matrix gives the male and female count of
+    every bin at once, in place of a lookup per column.
+    """
+
+    def __init__(self, age_bins: AgeBins):
+        """
+        Compile a binning.
+
+        Args:
+            age_bins: Validated binning (see parse_age_bins)
+        """
+        self.age_bins = age_bins
+        ends = [*age_bins[1:], None]
+        self.labels = [
+            f"{start:02d} - {end - 1:02d}" if end is not None else f"{start}+"
+            for start, end in zip(age_bins, ends)
+        ]
+
+        column_starts = get_age_column_starts()
+        # Column prefixes of every male age column, then every female one
+        self.features = [
+            f"{prefix}_{csv_age}"
+            for prefix in ["male", "female"]
+            for csv_age in column_starts
+        ]
+
+        # Bin of each age column: the last bin starting at or below its youngest age
+        bins = np.searchsorted(age_bins, list(column_starts.values()), side="right") - 1
+        ages, bin_count = len(column_starts), len(age_bins)
+        self.matrix = np.zeros((2 * ages, 2 * bin_count))
+        self.matrix[np.arange(ages), bins] = 1
+        self.matrix[ages + np.arange(ages), bin_count + bins] = 1
+
+    def columns(self, year: str) -> list[str]:
+        """
+        Returns the CSV columns of the features for a year, in matrix order.
+        """
+        return [f"{feature}_{year}" for feature in self.features]
+
+    def apply(self, sums: np.ndarray) -> dict[str, dict[str, int]]:
+        """
+        Bins the sums of the feature columns.
+
+        Args:
+            sums: Sum of each feature column, in the order of features
+
+        Returns:
+            Dictionary mapping bin labels to male, female and total counts
+        """
+        return self.counts(sums @ self.matrix)
+
+    def counts(self, binned: np.ndarray) -> dict[str, dict[str, int]]:
+        """
+        Formats one row of binned sums (sums @ matrix) as apply returns it.
+
+        Args:
+            binned: Male counts of every bin followed by female counts
+
+        Returns:
+            Dictionary mapping bin labels to male, female and total counts
+        """
+        bin_count = len(self.labels)
+        counts = {}
+        for label, male, female in zip(
+            self.labels, binned[:bin_count], binned[bin_count:]
+        ):
+            counts[label] = {
+                "male": int(male),
+                "total": int(male) + int(female),
+                "female": int(female),
+            }
+        return counts
+
+
+@lru_cache(maxsize=64)
+def get_age_bin_plan(age_bins: AgeBins) -> AgeBinPlan:
+    """
+    Returns the compiled plan of a binning, compiling each binning only once.
+
+    Args:
+        age_bins: Validated binning (see parse_age_bins)
+
+    Returns:
+        The shared, read-only plan
+    """
+    return AgeBinPlan(age_bins)
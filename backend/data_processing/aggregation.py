@@ -1,43 +1,122 @@
 """Data aggregation functions for demographic analysis."""
 
+from typing import Optional
+
+import numpy as np
 import pandas as pd
 
-from .constants import get_age_groups, get_race_groups
+from .age_bins import DEFAULT_AGE_BINS, AgeBins, get_age_bin_plan
+from .constants import get_race_groups
+from .cube import AggregateCube
+from .metrics import timed_stage
+from .town_index import TownIndex, select_town_rows
+
+
+def sum_town_column(
+    df: pd.DataFrame, city: str, col_name: str, cube: Optional[AggregateCube] = None
+) -> int:
+    """
+    Returns the sum of a column over a city's rows.
+
+    Args:
+        df: DataFrame already filtered to the city (ignored when a cube is given)
+        city: City name
+        col_name: Column to sum
+        cube: Precomputed per-town aggregates (optional)
+
+    Returns:
+        Column sum as an integer
+    """
+    if cube is not None:
+        return int(cube.get(city, col_name))
+    return int(df[col_name].sum())
+
+
+def get_race_label(race: str) -> str:
+    """
+    Returns the display label of a race group from get_race_groups.
+    """
+    # Normalize label: "two_plus" in CSV becomes "multiracial" in UI
+    return "multiracial" if race == "two_plus" else race
+
+
+def get_year_sums(
+    df: pd.DataFrame,
+    years: list[str],
+    features: list[str],
+    city: Optional[str] = None,
+    cube: Optional[AggregateCube] = None,
+    town_index: Optional[TownIndex] = None,
+) -> np.ndarray:
+    """
+    Returns the sums of several features for every year over a city's rows.
+
+    Args:
+        df: DataFrame containing demographic data
+        years: Years to sum (must be the cube's years when a cube is given)
+        features: Column prefixes; each is stored in the CSV as "{feature}_{year}"
+        city: City name (every town if not given)
+        cube: Precomputed per-town aggregates, used instead of filtering df (optional)
+        town_index: Town index built from df, used to select the city's rows (optional)
+
+    Returns:
+        years x features array of sums
+    """
+    if cube is not None:
+        return cube.select_years(features, city)
+
+    # Towns without rows are left out of the cube, so leave them out here too
+    if city is not None:
+        rows = select_town_rows(df, city, town_index)
+    else:
+        rows = df[df["TOWN"].notna()]
+    columns = [f"{feature}_{year}" for year in years for feature in features]
+    return rows[columns].sum().to_numpy(dtype=float).reshape(len(years), len(features))
 
 
 def get_age_group_counts(
-    df: pd.DataFrame, year: str, city: str
+    df: pd.DataFrame,
+    year: str,
+    city: str,
+    cube: Optional[AggregateCube] = None,
+    town_index: Optional[TownIndex] = None,
+    age_bins: Optional[AgeBins] = None,
 ) -> dict[str, dict[str, int]]:
     """
     Returns age group counts for the given year and city.
     Includes male and female counts and totals.
 
+    The town's sums of the age columns are binned with one product by the
+    binning's compiled matrix (see age_bins.AgeBinPlan).
+
     Args:
         df: DataFrame containing demographic data
         year: Year to aggregate data for
         city: City name to filter by
+        cube: Precomputed per-town aggregates, used instead of filtering df (optional)
+        town_index: Town index built from df, used to select the city's rows (optional)
+        age_bins: Validated binning from parse_age_bins (5-year groups if not given)
 
     Returns:
         Dictionary mapping age groups to gender counts and totals
     """
-    age_groups = get_age_groups()
-    df = df[df["TOWN"] == city]
-
-    age_group_counts = {}
-    # Accumulate counts for each plot age group
-    for csv_age, plot_age in age_groups.items():
-        age_group_data = age_group_counts.get(plot_age, {})
-        for prefix in ["male", "female"]:
-            col_name = f"{prefix}_{csv_age}_{year}"
-            col_count = int(df[col_name].sum())
-            age_group_data[prefix] = age_group_data.get(prefix, 0) + col_count
-            age_group_data["total"] = age_group_data.get("total", 0) + col_count
-        age_group_counts[plot_age] = age_group_data
-
-    return age_group_counts
-
-
-def get_race_group_counts(df: pd.DataFrame, year: str, city: str) -> dict[str, int]:
+    plan = get_age_bin_plan(age_bins if age_bins is not None else DEFAULT_AGE_BINS)
+    if cube is not None:
+        sums = cube.select(year, plan.features, [city])[0]
+    else:
+        city_df = select_town_rows(df, city, town_index)
+        sums = city_df[plan.columns(year)].sum().to_numpy(dtype=float)
+
+    return plan.apply(sums)
+
+
+def get_race_group_counts(
+    df: pd.DataFrame,
+    year: str,
+    city: str,
+    cube: Optional[AggregateCube] = None,
+    town_index: Optional[TownIndex] = None,
+) -> dict[str, int]:
     """
     Returns race group counts for the given year and city.
 
@@ -45,25 +124,37 @@ def get_race_group_counts(df: pd.DataFrame, year: str, city: str) -> dict[str, i
         df: DataFrame containing demographic data
         year: Year to aggregate data for
         city: City name to filter by
+        cube: Precomputed per-town aggregates, used instead of filtering df (optional)
+        town_index: Town index built from df, used to select the city's rows (optional)
 
     Returns:
         Dictionary mapping race groups to counts
     """
     race_groups = get_race_groups()
-    df = df[df["TOWN"] == city]
+    if cube is None:
+        df = select_town_rows(df, city, town_index)
 
     counts = {}
     for race in race_groups:
         col_name = f"pop_{race}_{year}"
-        # Normalize label: "two_plus" in CSV becomes "multiracial" in UI
-        race_label = "multiracial" if race == "two_plus" else race
-        race_group_count = counts.get(race_label, 0) + int(df[col_name].sum())
+        race_label = get_race_label(race)
+        race_group_count = counts.get(race_label, 0) + sum_town_column(
+            df, city, col_name, cube
+        )
         counts[race_label] = race_group_count
 
     return counts
 
 
-def get_city_housing_data(df: pd.DataFrame, year1: str, year2: str, city: str) -> dict:
+@timed_stage("city_housing")
+def get_city_housing_data(
+    df: pd.DataFrame,
+    year1: str,
+    year2: str,
+    city: str,
+    cube: Optional[AggregateCube] = None,
+    town_index: Optional[TownIndex] = None,
+) -> dict:
     """
     Calculate city-wide housing statistics in absolute and percent.
 
@@ -72,13 +163,29 @@ def get_city_housing_data(df: pd.DataFrame, year1: str, year2: str, city: str) -
         year1: First year for comparison
         year2: Second year for comparison
         city: City name to analyze
+        cube: Precomputed per-town aggregates, used instead of filtering df (optional)
+        town_index: Town index built from df, used to select the city's rows (optional)
+
+    Returns:
+        Dictionary with housing unit counts and changes.
+    """
+    city_df = select_town_rows(df, city, town_index) if cube is None else df
+    total_units_year1 = sum_town_column(city_df, city, f"housing_units_{year1}", cube)
+    total_units_year2 = sum_town_column(city_df, city, f"housing_units_{year2}", cube)
+    return calculate_housing_change(total_units_year1, total_units_year2)
+
+
+def calculate_housing_change(total_units_year1: int, total_units_year2: int) -> dict:
+    """
+    Calculate the change between two years' housing unit counts.
+
+    Args:
+        total_units_year1: Housing units in the first year
+        total_units_year2: Housing units in the second year
 
     Returns:
         Dictionary with housing unit counts and changes.
     """
-    city_df = df[df["TOWN"] == city]
-    total_units_year1 = int(city_df[f"housing_units_{year1}"].sum())
-    total_units_year2 = int(city_df[f"housing_units_{year2}"].sum())
     total_change_absolute = total_units_year2 - total_units_year1
     total_change_percent = (
         round((total_change_absolute / total_units_year1 * 100), 2)
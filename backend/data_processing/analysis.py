@@ -1,11 +1,23 @@
 """Analysis functions for demographic change calculations."""
 
-from typing import Any
+from itertools import combinations
+from typing import Any, Optional
 
 import pandas as pd
 
-from .aggregation import get_age_group_counts, get_race_group_counts
+from .age_bins import DEFAULT_AGE_BINS, AgeBins, get_age_bin_plan
+from .aggregation import (
+    calculate_housing_change,
+    get_age_group_counts,
+    get_race_group_counts,
+    get_race_label,
+    get_year_sums,
+)
+from .constants import get_race_groups
+from .cube import AggregateCube
 from .insights import create_demographic_sentences
+from .metrics import timed_stage
+from .town_index import TownIndex
 
 
 def calculate_age_group_changes(
@@ -179,7 +191,8 @@ def get_total_city_change(
         age_group_year1_data: Dictionary of year 1 age group data
 
     Returns:
-        Dictionary with total change statistics
+        Dictionary with total change statistics; the percent is None when
+        the city had no population in year 1
     """
     total_change = 0
     year1_total = 0
@@ -189,15 +202,22 @@ def get_total_city_change(
 
     city_change = {
         "change": total_change,
-        "percent": total_change / year1_total * 100,
+        "percent": total_change / year1_total * 100 if year1_total else None,
         "color": "darkred" if total_change < 0 else "#30664B",
     }
 
     return city_change
 
 
+@timed_stage("population")
 def get_population_data(
-    df: pd.DataFrame, year1: str, year2: str, city: str
+    df: pd.DataFrame,
+    year1: str,
+    year2: str,
+    city: str,
+    cube: Optional[AggregateCube] = None,
+    town_index: Optional[TownIndex] = None,
+    age_bins: Optional[AgeBins] = None,
 ) -> dict[str, Any]:
     """
     Returns JSON of population pyramid data, aggregating all population data and analysis.
@@ -207,15 +227,18 @@ def get_population_data(
         year1: First year for comparison
         year2: Second year for comparison
         city: City name to analyze
+        cube: Precomputed per-town aggregates (optional)
+        town_index: Town index built from df (optional)
+        age_bins: Validated binning of the age groups (5-year groups if not given)
 
     Returns:
         Dictionary containing age and race group data with changes
     """
     # Get counts
-    age_group_year1 = get_age_group_counts(df, year1, city)
-    race_group_year1 = get_race_group_counts(df, year1, city)
-    age_group_year2 = get_age_group_counts(df, year2, city)
-    race_group_year2 = get_race_group_counts(df, year2, city)
+    age_group_year1 = get_age_group_counts(df, year1, city, cube, town_index, age_bins)
+    race_group_year1 = get_race_group_counts(df, year1, city, cube, town_index)
+    age_group_year2 = get_age_group_counts(df, year2, city, cube, town_index, age_bins)
+    race_group_year2 = get_race_group_counts(df, year2, city, cube, town_index)
 
     # Calculate changes
     age_group_change_data = calculate_age_group_changes(
@@ -252,3 +275,81 @@ def get_population_data(
         },
         "total_city_change": total_city_change,
     }
+
+
+@timed_stage("time_series")
+def get_time_series(
+    df: pd.DataFrame,
+    years: list[str],
+    city: Optional[str] = None,
+    cube: Optional[AggregateCube] = None,
+    town_index: Optional[TownIndex] = None,
+    age_bins: Optional[AgeBins] = None,
+) -> dict[str, Any]:
+    """
+    Returns population and housing counts for every year, with the changes between every pair.
+
+    All years are aggregated in one pass (a single cube slice), and each
+    year's counts are then shared by every pair it appears in instead of
+    being aggregated again per pair. Changes have the same form as in
+    get_population_data and get_city_housing_data.
+
+    Args:
+        df: DataFrame containing demographic and housing data
+        years: Years to include, in increasing order (the cube's years when a cube is given)
+        city: City name to analyze (the whole state if not given)
+        cube: Precomputed per-town aggregates (optional)
+        town_index: Town index built from df (optional)
+        age_bins: Validated binning of the age groups (5-year groups if not given)
+
+    Returns:
+        Dictionary of per-year age group, race group and housing unit counts,
+        and the changes for each "year1-year2" pair
+    """
+    plan = get_age_bin_plan(age_bins if age_bins is not None else DEFAULT_AGE_BINS)
+    race_groups = get_race_groups()
+    race_features = [f"pop_{race}" for race in race_groups]
+    features = plan.features + race_features + ["housing_units"]
+
+    # years x features sums, then every year's age groups in one product
+    sums = get_year_sums(df, years, features, city, cube, town_index)
+    age_sums = sums[:, : len(plan.features)]
+    race_sums = sums[:, len(plan.features) : -1]
+    binned = age_sums @ plan.matrix
+
+    age_group_data = {}
+    race_group_data = {}
+    housing_units = {}
+    for year_pos, year in enumerate(years):
+        age_group_data[year] = plan.counts(binned[year_pos])
+        race_group_data[year] = {
+            get_race_label(race): int(count)
+            for race, count in zip(race_groups, race_sums[year_pos])
+        }
+        housing_units[year] = int(sums[year_pos, -1])
+
+    changes = {}
+    for year1, year2 in combinations(years, 2):
+        age_group_change_data = calculate_age_group_changes(
+            age_group_data[year1], age_group_data[year2]
+        )
+        changes[f"{year1}-{year2}"] = {
+            "age_group_changes": age_group_change_data,
+            "race_group_changes": calculate_race_group_changes(
+                race_group_data[year1], race_group_data[year2]
+            ),
+            "total_city_change": get_total_city_change(
+                age_group_change_data, age_group_data[year1]
+            ),
+            "housing": calculate_housing_change(
+                housing_units[year1], housing_units[year2]
+            ),
+        }
+
+    return {
+        "years": years,
+        "age_group_data": age_group_data,
+        "race_group_data": race_group_data,
+        "housing_units": housing_units,
+        "changes": changes,
+    }
@@ -0,0 +1,157 @@
+"""Vectorized comparison of demographic and housing changes across many towns."""
+
+from typing import Any, Optional
+
+import numpy as np
+
+from .age_bins import DEFAULT_AGE_BINS, AgeBinPlan, AgeBins, get_age_bin_plan
+from .constants import get_race_groups
+from .cube import AggregateCube
+from .metrics import timed_stage
+
+
+def _to_list(values: np.ndarray) -> list:
+    # Missing values (e.g. percent changes from an empty baseline) become JSON null
+    if np.issubdtype(values.dtype, np.floating) and np.isnan(values).any():
+        return [None if np.isnan(value) else value for value in values.tolist()]
+    return values.tolist()
+
+
+def _percent_change(
+    change: np.ndarray, baseline: np.ndarray, fallback: np.ndarray
+) -> np.ndarray:
+    # change / baseline * 100, with the fallback wherever the baseline is 0
+    ratio = np.divide(change, baseline, out=np.zeros(len(change)), where=baseline != 0)
+    return np.where(baseline != 0, ratio * 100, fallback)
+
+
+def get_age_group_count_arrays(
+    cube: AggregateCube, year: str, cities: list[str], plan: AgeBinPlan
+) -> np.ndarray:
+    """
+    Returns male and female counts of each age bin for many towns.
+
+    Args:
+        cube: Precomputed per-town aggregates
+        year: Year to aggregate data for
+        cities: City names, in output order
+        plan: Compiled age binning
+
+    Returns:
+        towns x age bins x (male, female) array of counts
+    """
+    # Truncate each column sum like the per-city functions do
+    counts = cube.select(year, plan.features, cities).astype(np.int64)
+    # Float matrix products are exact for whole-number counts below 2**53
+    binned = (counts.astype(np.float64) @ plan.matrix).astype(np.int64)
+    # The matrix puts every male bin before every female one
+    return binned.reshape(len(cities), 2, len(plan.labels)).transpose(0, 2, 1)
+
+
+@timed_stage("compare_cities")
+def compare_cities(
+    cube: AggregateCube,
+    year1: str,
+    year2: str,
+    cities: Optional[list[str]] = None,
+    age_bins: Optional[AgeBins] = None,
+) -> dict[str, Any]:
+    """
+    Compare age, race and housing changes between two years for many towns at once.
+
+    Every town is computed with the same array operations over the per-town
+    cube, so comparing all towns costs about as much as comparing one. Changes
+    and percents follow the per-city functions in analysis and aggregation.
+
+    Args:
+        cube: Precomputed per-town aggregates
+        year1: First year for comparison
+        year2: Second year for comparison
+        cities: City names, in output order (all towns if not given)
+        age_bins: Validated binning of the age groups (5-year groups if not given)
+
+    Returns:
+        Columnar dictionary: each leaf is a list with one value per city
+
+    Raises:
+        KeyError: If a required column is missing for either year
+    """
+    cities = cube.towns if cities is None else list(cities)
+    plan = get_age_bin_plan(age_bins if age_bins is not None else DEFAULT_AGE_BINS)
+
+    # Age groups: towns x age groups x (male, female, total)
+    age_year1 = get_age_group_count_arrays(cube, year1, cities, plan)
+    age_year2 = get_age_group_count_arrays(cube, year2, cities, plan)
+    age_year1 = np.concatenate(
+        [age_year1, age_year1.sum(axis=2, keepdims=True)], axis=2
+    )
+    age_year2 = np.concatenate(
+        [age_year2, age_year2.sum(axis=2, keepdims=True)], axis=2
+    )
+    age_change = age_year2 - age_year1
+
+    age_group_changes = {}
+    for age_pos, plot_age in enumerate(plan.labels):
+        group_changes = {}
+        for sex_pos, category in enumerate(["male", "female", "total"]):
+            change = age_change[:, age_pos, sex_pos]
+            baseline = age_year1[:, age_pos, sex_pos]
+            # An empty baseline counts as 100% growth, or 0% if nothing changed
+            percent = _percent_change(
+                change, baseline, np.where(change > 0, 100.0, 0.0)
+            )
+            group_changes[f"{category}_change_absolute"] = _to_list(change)
+            group_changes[f"{category}_change_percent"] = _to_list(percent)
+        age_group_changes[plot_age] = group_changes
+
+    # Race groups: "two_plus" in the CSV is "multiracial" in the UI
+    races = get_race_groups()
+    features = [f"pop_{race}" for race in races]
+    race_year1 = cube.select(year1, features, cities).astype(np.int64)
+    race_year2 = cube.select(year2, features, cities).astype(np.int64)
+    race_group_changes = {}
+    for race_pos, race in enumerate(races):
+        change = race_year2[:, race_pos] - race_year1[:, race_pos]
+        baseline = race_year1[:, race_pos]
+        race_label = "multiracial" if race == "two_plus" else race
+        race_group_changes[race_label] = {
+            "change_absolute": _to_list(change),
+            "change_percent": _to_list(
+                _percent_change(change, baseline, race_year2[:, race_pos])
+            ),
+        }
+
+    # Total population over all age groups; no percent for an empty baseline
+    total_year1 = age_year1[:, :, 2].sum(axis=1)
+    total_year2 = age_year2[:, :, 2].sum(axis=1)
+    total_change = total_year2 - total_year1
+    total_percent = _percent_change(
+        total_change, total_year1, np.full(len(cities), np.nan)
+    )
+
+    housing_year1 = cube.select(year1, ["housing_units"], cities)[:, 0].astype(np.int64)
+    housing_year2 = cube.select(year2, ["housing_units"], cities)[:, 0].astype(np.int64)
+    housing_change = housing_year2 - housing_year1
+    housing_percent = np.round(
+        _percent_change(housing_change, housing_year1, np.zeros(len(cities))), 2
+    )
+
+    return {
+        "year1": year1,
+        "year2": year2,
+        "cities": cities,
+        "total_city_change": {
+            "year1": _to_list(total_year1),
+            "year2": _to_list(total_year2),
+            "change": _to_list(total_change),
+            "percent": _to_list(total_percent),
+        },
+        "age_group_changes": age_group_changes,
+        "race_group_changes": race_group_changes,
+        "housing": {
+            "year1": _to_list(housing_year1),
+            "year2": _to_list(housing_year2),
+            "change_absolute": _to_list(housing_change),
+            "change_percent": _to_list(housing_percent),
+        },
+    }
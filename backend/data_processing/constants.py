@@ -1,11 +1,13 @@
 """Constants for demographic data processing."""
 
+import re
+
 
 def get_age_groups() -> dict[str, str]:
     """
     Returns a dictionary mapping CSV column age ranges to display age groups.
-    
-    Multiple CSV columns may map to the same display group (e.g., "15-17" and "18-19" 
+
+    Multiple CSV columns may map to the same display group (e.g., "15-17" and "18-19"
     both map to "15 - 19"). This allows aggregating finer-grained data into broader categories.
     """
     return {
@@ -34,6 +36,33 @@ def get_age_groups() -> dict[str, str]:
     }
 
 
+def get_age_column_starts() -> dict[str, int]:
+    """
+    Returns the youngest age covered by each CSV age column, in age order.
+
+    These are the only ages where a custom age bin can start, since each
+    column is counted in a single bin.
+    """
+    return {
+        csv_age: 0 if csv_age == "under_5" else int(re.split(r"[-_]", csv_age)[0])
+        for csv_age in get_age_groups()
+    }
+
+
+def get_age_bin_presets() -> dict[str, list[int]]:
+    """
+    Returns named age binnings as the youngest age of each bin.
+
+    Each bin runs up to the next bin's start; the last one is open-ended.
+    "5-year" reproduces the display groups of get_age_groups.
+    """
+    return {
+        "5-year": list(range(0, 90, 5)),
+        "10-year": list(range(0, 90, 10)),
+        "life-stage": [0, 18, 65],
+    }
+
+
 def get_race_groups() -> list[str]:
     """
     Returns a list of race groups for the population pyramid.
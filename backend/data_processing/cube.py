@@ -0,0 +1,196 @@
+"""Precomputed per-town aggregates of the demographic and housing columns."""
+
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .constants import get_age_groups, get_race_groups
+from .metrics import timed_stage
+
+
+def get_aggregate_features() -> list[str]:
+    """
+    Returns the column prefixes aggregated per town and year.
+
+    Each feature is stored in the CSV as "{feature}_{year}".
+    """
+    features = [
+        f"{prefix}_{csv_age}"
+        for csv_age in get_age_groups()
+        for prefix in ["male", "female"]
+    ]
+    features += [f"pop_{race}" for race in get_race_groups()]
+    features.append("housing_units")
+    return features
+
+
+class AggregateCube:
+    """
+    Dense towns x years x features array of column sums, built once per DataFrame.
+
+    Replaces per-request town filters and column sums with constant-time lookups.
+    The cube is built lazily on first use and can be rebuilt when the data is reloaded.
+    """
+
+    def __init__(self, df: pd.DataFrame, years: list[str]):
+        """
+        Initialize the cube for a dataset without building it yet.
+
+        Args:
+            df: DataFrame containing demographic and housing data
+            years: Years to aggregate
+        """
+        self.df = df
+        self.years = list(years)
+        self.features = get_aggregate_features()
+        self._lock = threading.Lock()
+        self._values: Optional[np.ndarray] = None
+        self._town_index: dict[str, int] = {}
+        # Maps a CSV column name to its (year, feature) position in the cube
+        self._column_index: dict[str, tuple[int, int]] = {}
+
+    @property
+    def values(self) -> np.ndarray:
+        """The towns x years x features array of sums, built on first access."""
+        self._ensure_built()
+        return self._values
+
+    @property
+    def towns(self) -> list[str]:
+        """Town names in cube order."""
+        self._ensure_built()
+        return list(self._town_index)
+
+    def rebuild(self, df: Optional[pd.DataFrame] = None) -> None:
+        """
+        Discard the aggregates so they are rebuilt on next use.
+
+        Args:
+            df: Reloaded DataFrame to aggregate instead of the current one (optional)
+        """
+        with self._lock:
+            if df is not None:
+                self.df = df
+            self._values = None
+
+    def get(self, city: str, col_name: str) -> float:
+        """
+        Returns the sum of a CSV column over a town's rows.
+
+        Args:
+            city: City name
+            col_name: CSV column name, e.g. "male_5-9_2010"
+
+        Returns:
+            Column sum for the town (0 for towns without rows)
+
+        Raises:
+            KeyError: If the column is not in the dataset
+        """
+        values = self.values
+        if col_name not in self._column_index:
+            raise KeyError(col_name)
+        town_pos = self._town_index.get(city)
+        if town_pos is None:
+            return 0
+        year_pos, feature_pos = self._column_index[col_name]
+        return values[town_pos, year_pos, feature_pos]
+
+    def select(
+        self, year: str, features: list[str], towns: Optional[list[str]] = None
+    ) -> np.ndarray:
+        """
+        Returns the sums of several features for one year across towns.
+
+        Args:
+            year: Year to select
+            features: Column prefixes from get_aggregate_features, e.g. "housing_units"
+            towns: Town names, in output order (all towns in cube order if not given)
+
+        Returns:
+            towns x features array of sums (rows of towns without data are 0)
+
+        Raises:
+            KeyError: If a feature has no column for the year in the dataset
+        """
+        values = self.values
+        positions = []
+        for feature in features:
+            col_name = f"{feature}_{year}"
+            if col_name not in self._column_index:
+                raise KeyError(col_name)
+            positions.append(self._column_index[col_name])
+        year_pos = positions[0][0] if positions else 0
+        feature_positions = [feature_pos for _, feature_pos in positions]
+
+        selected = values[:, year_pos, feature_positions]
+        if towns is None:
+            return selected
+
+        # Towns without rows get an all-zero row, matching get
+        result = np.zeros((len(towns), len(features)))
+        town_positions = [self._town_index.get(town, -1) for town in towns]
+        known = np.array([pos >= 0 for pos in town_positions], dtype=bool)
+        result[known] = selected[np.array(town_positions, dtype=np.intp)[known]]
+        return result
+
+    def select_years(
+        self, features: list[str], town: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Returns the sums of several features for every year of one town or all towns.
+
+        Args:
+            features: Column prefixes from get_aggregate_features, e.g. "housing_units"
+            town: Town name (the sum over all towns if not given)
+
+        Returns:
+            years x features array of sums, in the order of self.years (all 0
+            for a town without rows)
+
+        Raises:
+            KeyError: If a feature has no column for one of the years in the dataset
+        """
+        values = self.values
+        for year in self.years:
+            for feature in features:
+                col_name = f"{feature}_{year}"
+                if col_name not in self._column_index:
+                    raise KeyError(col_name)
+        feature_positions = [self.features.index(feature) for feature in features]
+
+        if town is None:
+            return values[:, :, feature_positions].sum(axis=0)
+        town_pos = self._town_index.get(town)
+        if town_pos is None:
+            return np.zeros((len(self.years), len(features)))
+        return values[town_pos][:, feature_positions]
+
+    def _ensure_built(self) -> None:
+        if self._values is None:
+            with self._lock:
+                if self._values is None:
+                    self._build()
+
+    @timed_stage("build_cube")
+    def _build(self) -> None:
+        # Callers must hold self._lock
+        columns = {}
+        for year_pos, year in enumerate(self.years):
+            for feature_pos, feature in enumerate(self.features):
+                col_name = f"{feature}_{year}"
+                if col_name in self.df.columns:
+                    columns[col_name] = (year_pos, feature_pos)
+
+        # One grouped pass over the table; NaN towns are dropped, NaN values sum to 0
+        sums = self.df.groupby("TOWN", sort=True, observed=True)[list(columns)].sum()
+
+        values = np.zeros((len(sums), len(self.years), len(self.features)))
+        for col_name, (year_pos, feature_pos) in columns.items():
+            values[:, year_pos, feature_pos] = sums[col_name].to_numpy()
+
+        self._town_index = {town: pos for pos, town in enumerate(sums.index)}
+        self._column_index = columns
+        self._values = values
@@ -0,0 +1,219 @@
+"""Integer GEOID keys and the alignment of block group geometries to dataset rows."""
+
+import threading
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from .geometry_store import GeometryStore
+
+
+def geoid_keys(df: pd.DataFrame) -> np.ndarray:
+    """
+    Returns each row's block group GEOID as an int64 key.
+
+    The key has the same digits as the GEOID string: 2-digit state + 3-digit
+    county + 6-digit tract + 1-digit block group.
+
+    Args:
+        df: DataFrame with STATEA, COUNTYA, TRACTA and BLCK_GRPA columns
+
+    Returns:
+        Array of int64 keys, one per row
+    """
+    return (
+        df["STATEA"].to_numpy(np.int64) * 10**10
+        + df["COUNTYA"].to_numpy(np.int64) * 10**7
+        + df["TRACTA"].to_numpy(np.int64) * 10
+        + df["BLCK_GRPA"].to_numpy(np.int64)
+    )
+
+
+def parse_geoids(geoids: pd.Series) -> np.ndarray:
+    """
+    Converts GEOID strings (such as the shapefile GEOID20 column) to int64 keys.
+
+    Args:
+        geoids: Series of 12-digit GEOID strings
+
+    Returns:
+        Array of int64 keys
+    """
+    return geoids.to_numpy().astype(np.int64)
+
+
+def group_columns_by_dtype(
+    df: pd.DataFrame,
+) -> list[tuple[Optional[np.dtype], list[str], list]]:
+    """
+    Groups a DataFrame's columns by NumPy dtype.
+
+    Args:
+        df: DataFrame to group
+
+    Returns:
+        List of (dtype, column names, column arrays); columns with extension
+        dtypes (e.g. categoricals) are grouped under None, with their arrays
+    """
+    groups: dict[Optional[np.dtype], tuple[list[str], list]] = {}
+    for name, values in df.items():
+        dtype = values.dtype if isinstance(values.dtype, np.dtype) else None
+        names, arrays = groups.setdefault(dtype, ([], []))
+        names.append(name)
+        arrays.append(values.to_numpy() if dtype is not None else values.array)
+    return [(dtype, names, arrays) for dtype, (names, arrays) in groups.items()]
+
+
+class GeoidIndex:
+    """
+    Maps block group GEOIDs to the positions of their rows, built once per DataFrame.
+
+    Joining data onto geometries then takes rows at positions looked up once
+    per geometry frame, instead of building GEOID strings and hash-joining
+    the whole table on every request. If a GEOID appears on several rows,
+    its first row is used.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Build the index from the geographic code columns of a dataset.
+
+        Args:
+            df: DataFrame with STATEA, COUNTYA, TRACTA and BLCK_GRPA columns
+        """
+        self.keys = geoid_keys(df)
+        # Stable sort, so searching finds the first row of a repeated GEOID
+        self._order = np.argsort(self.keys, kind="stable")
+        self._sorted_keys = self.keys[self._order]
+        # Column arrays grouped by dtype, as views of df's memory rather than copies
+        self._columns = df.columns
+        self._dtype_groups = group_columns_by_dtype(df)
+        # Key array and row positions per set of counties of a geometry store
+        self._aligned: dict[tuple[str, ...], tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, geoids: np.ndarray) -> np.ndarray:
+        """
+        Returns the row position of each GEOID.
+
+        Args:
+            geoids: int64 GEOID keys
+
+        Returns:
+            Array of row positions, -1 where the GEOID has no row
+        """
+        if not len(self._sorted_keys):
+            return np.full(len(geoids), -1, dtype=np.intp)
+        found = np.searchsorted(self._sorted_keys, geoids)
+        found = np.minimum(found, len(self._sorted_keys) - 1)
+        matched = self._sorted_keys[found] == geoids
+        return np.where(matched, self._order[found], -1)
+
+    def matched(
+        self,
+        geometry_store: "GeometryStore",
+        fips_codes: list[str],
+        positions: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Returns whether each block group of a geometry frame has a row.
+
+        Args:
+            geometry_store: Store holding the geometry frame
+            fips_codes: Counties of the geometry frame (see GeometryStore.get)
+            positions: Row positions of the block groups to check (all if not given)
+
+        Returns:
+            Boolean array, one entry per block group
+        """
+        rows = self._align(geometry_store, fips_codes)
+        return (rows if positions is None else rows[positions]) >= 0
+
+    def take(
+        self,
+        df: pd.DataFrame,
+        geometry_store: "GeometryStore",
+        fips_codes: list[str],
+        positions: Optional[np.ndarray] = None,
+        fill_missing: bool = False,
+    ) -> tuple[pd.DataFrame, np.ndarray]:
+        """
+        Returns the DataFrame's rows for the block groups of a geometry frame.
+
+        The result lines up with the geometry rows like the right side of a
+        left join: block groups without a row get missing values, with the
+        same dtype changes a left merge makes (e.g. integer columns become
+        float when any selected block group is unmatched).
+
+        The row position of each block group is looked up once per set of
+        counties and cached; rows are then taken from df itself, so a
+        memory-mapped dataset stays shared rather than copied into every
+        process. The cached positions are replaced when the store returns
+        new GEOID keys for the counties (e.g. after it was invalidated).
+
+        Args:
+            df: DataFrame the index was built from
+            geometry_store: Store holding the geometry frame
+            fips_codes: Counties of the geometry frame (see GeometryStore.get)
+            positions: Row positions of the block groups to take (all if not given)
+            fill_missing: Use the dtypes of a join with unmatched block groups even
+                if every selected one has a row, so that parts of a larger
+                selection all get the dtypes of the whole
+
+        Returns:
+            Tuple of (new DataFrame with a RangeIndex, whether each block group has a row)
+        """
+        rows = self._align(geometry_store, fips_codes)
+        if positions is not None:
+            rows = rows[positions]
+        matched = rows >= 0
+        if matched.all() and not fill_missing:
+            data = self._take_rows(rows)
+        else:
+            # Label row positions, without copying, so that reindexing to -1
+            # inserts all-missing rows for the unmatched block groups
+            if not df.index.equals(pd.RangeIndex(len(df))):
+                df = df.set_axis(pd.RangeIndex(len(df)), copy=False)
+            if not matched.all():
+                data = df.reindex(rows)
+            else:
+                # Reindex with one extra missing row for the dtypes, then drop it
+                data = df.reindex(np.append(rows, -1)).iloc[:-1].copy()
+        data.index = pd.RangeIndex(len(data))
+        return data, matched
+
+    def _take_rows(self, rows: np.ndarray) -> pd.DataFrame:
+        # Equivalent to df.take(rows), but builds one block per dtype; a memory-mapped
+        # frame has a block per column, which makes pandas take column by column
+        index = pd.RangeIndex(len(rows))
+        parts = []
+        for dtype, names, arrays in self._dtype_groups:
+            if dtype is None:
+                parts.extend(
+                    pd.Series(array.take(rows), index=index, name=name)
+                    for name, array in zip(names, arrays)
+                )
+                continue
+            block = np.empty((len(arrays), len(rows)), dtype=dtype)
+            for out, array in zip(block, arrays):
+                np.take(array, rows, out=out)
+            parts.append(pd.DataFrame(block.T, index=index, columns=names, copy=False))
+        return pd.concat(parts, axis=1, copy=False)[self._columns]
+
+    def _align(
+        self, geometry_store: "GeometryStore", fips_codes: list[str]
+    ) -> np.ndarray:
+        # Row position of each block group, -1 where it has no row
+        key = tuple(fips_codes)
+        geoids = geometry_store.get_geoid_keys(fips_codes)
+        with self._lock:
+            cached = self._aligned.get(key)
+            if cached is None or cached[0] is not geoids:
+                cached = (geoids, self.lookup(geoids))
+                self._aligned[key] = cached
+            return cached[1]
@@ -0,0 +1,270 @@
+"""In-memory store of block group geometries loaded from county shapefiles."""
+
+import glob
+import os
+import threading
+from typing import Optional
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import shapely
+
+from .geoid_index import parse_geoids
+from .geospatial import load_shapefile, simplify_geometries
+from .metrics import timed
+
+# Simplification tolerance and coordinate grid size, in degrees, for each detail
+# level. Lower levels suit zoomed-out views of the map; "full" is the raw TIGER data.
+DETAIL_LEVELS: dict[str, Optional[tuple[float, float]]] = {
+    "full": None,
+    "high": (0.0001, 0.00001),
+    "medium": (0.0005, 0.0001),
+    "low": (0.002, 0.0005),
+}
+
+
+class GeometryStore:
+    """
+    Caches block group geometries so each shapefile is read from disk once.
+
+    Counties are loaded on first use (or up front with preload) and kept in
+    memory until the store is invalidated. Combined statewide frames are cached
+    per set of counties and detail level so requests only need to join
+    attributes onto them.
+
+    If a preprocessed geometry file (see dataset.export_geometries) is given and
+    is newer than the shapefiles, counties are read from that memory-mapped file
+    instead of being parsed from the shapefiles. This only speeds up loading:
+    the shapes are still decoded into geometries private to each process.
+    """
+
+    def __init__(
+        self,
+        shapefile_dir: str,
+        shapefile_pattern: str,
+        geometry_file: Optional[str] = None,
+    ):
+        """
+        Initialize an empty geometry store.
+
+        Args:
+            shapefile_dir: Directory containing shapefiles
+            shapefile_pattern: Pattern for shapefile names
+            geometry_file: Preprocessed Feather file of block group geometries (optional)
+        """
+        self.shapefile_dir = shapefile_dir
+        self.shapefile_pattern = shapefile_pattern
+        self.geometry_file = geometry_file
+        self._lock = threading.Lock()
+        self._counties: dict[str, gpd.GeoDataFrame] = {}
+        self._combined: dict[tuple[tuple[str, ...], str], gpd.GeoDataFrame] = {}
+        self._preprocessed: Optional[dict[str, gpd.GeoDataFrame]] = None
+        self._spatial_indexes: dict[tuple[str, ...], shapely.STRtree] = {}
+        self._geoid_keys: dict[tuple[str, ...], np.ndarray] = {}
+        self._county_slices: dict[tuple[str, ...], list[slice]] = {}
+
+    def get_county(self, fips_code: str) -> gpd.GeoDataFrame:
+        """
+        Returns the block group geometries for a single county.
+
+        Args:
+            fips_code: 5-digit FIPS code (state + county)
+
+        Returns:
+            GeoDataFrame with shapefile data and GEOID column
+        """
+        with self._lock:
+            return self._load_county(fips_code)
+
+    def get(self, fips_codes: list[str], detail: str = "full") -> gpd.GeoDataFrame:
+        """
+        Returns the block group geometries for the given counties as one frame.
+
+        The returned frame is shared between callers and must not be modified.
+
+        Args:
+            fips_codes: 5-digit FIPS codes (state + county), in output order
+            detail: Detail level from DETAIL_LEVELS
+
+        Returns:
+            GeoDataFrame with one row per block group, in county order
+
+        Raises:
+            KeyError: If the detail level is unknown
+        """
+        with self._lock:
+            return self._get_combined(tuple(fips_codes), detail)
+
+    def get_spatial_index(self, fips_codes: list[str]) -> shapely.STRtree:
+        """
+        Returns an STRtree over the full-detail geometries of the given counties.
+
+        Query results are row positions, valid for the frames returned by get
+        at every detail level since simplification keeps the row order.
+
+        Args:
+            fips_codes: 5-digit FIPS codes (state + county), in output order
+
+        Returns:
+            Spatial index of the block group geometries
+        """
+        key = tuple(fips_codes)
+        with self._lock:
+            tree = self._spatial_indexes.get(key)
+            if tree is None:
+                full = self._get_combined(key, "full")
+                tree = shapely.STRtree(full.geometry.to_numpy())
+                self._spatial_indexes[key] = tree
+            return tree
+
+    def get_geoid_keys(self, fips_codes: list[str]) -> np.ndarray:
+        """
+        Returns the GEOID20 of every block group of the given counties as int64 keys.
+
+        Keys are in the row order of the frames returned by get at every detail
+        level. The array is shared between callers and must not be modified.
+
+        Args:
+            fips_codes: 5-digit FIPS codes (state + county), in output order
+
+        Returns:
+            Array of int64 GEOID keys
+        """
+        key = tuple(fips_codes)
+        with self._lock:
+            geoids = self._geoid_keys.get(key)
+            if geoids is None:
+                geoids = parse_geoids(self._get_combined(key, "full")["GEOID20"])
+                geoids.flags.writeable = False
+                self._geoid_keys[key] = geoids
+            return geoids
+
+    def get_county_slices(self, fips_codes: list[str]) -> list[slice]:
+        """
+        Returns the rows of each county in the frames returned by get.
+
+        Counties are concatenated in order, so each one is a contiguous slice
+        at every detail level.
+
+        Args:
+            fips_codes: 5-digit FIPS codes (state + county), in output order
+
+        Returns:
+            One slice of row positions per county, in the order of fips_codes
+        """
+        key = tuple(fips_codes)
+        with self._lock:
+            slices = self._county_slices.get(key)
+            if slices is None:
+                sizes = [len(self._load_county(fips)) for fips in key]
+                stops = np.cumsum(sizes)
+                starts = stops - sizes
+                slices = [
+                    slice(int(start), int(stop)) for start, stop in zip(starts, stops)
+                ]
+                self._county_slices[key] = slices
+            return slices
+
+    def preload(
+        self, fips_codes: list[str], details: Optional[list[str]] = None
+    ) -> None:
+        """
+        Load the given counties ahead of the first request.
+
+        Args:
+            fips_codes: 5-digit FIPS codes (state + county)
+            details: Detail levels to precompute (all levels if not given)
+        """
+        for detail in details if details is not None else DETAIL_LEVELS:
+            self.get(fips_codes, detail)
+
+    def invalidate(self) -> None:
+        """
+        Drop all cached geometries so the next request re-reads the shapefiles.
+        """
+        with self._lock:
+            self._counties.clear()
+            self._combined.clear()
+            self._spatial_indexes.clear()
+            self._geoid_keys.clear()
+            self._county_slices.clear()
+            self._preprocessed = None
+
+    def reload(
+        self,
+        shapefile_dir: Optional[str] = None,
+        shapefile_pattern: Optional[str] = None,
+    ) -> None:
+        """
+        Point the store at a new shapefile location and drop cached geometries.
+
+        Args:
+            shapefile_dir: New directory containing shapefiles (optional)
+            shapefile_pattern: New pattern for shapefile names (optional)
+        """
+        with self._lock:
+            if shapefile_dir is not None:
+                self.shapefile_dir = shapefile_dir
+            if shapefile_pattern is not None:
+                self.shapefile_pattern = shapefile_pattern
+            self._counties.clear()
+            self._combined.clear()
+            self._spatial_indexes.clear()
+            self._geoid_keys.clear()
+            self._county_slices.clear()
+            self._preprocessed = None
+
+    def has_fresh_geometry_file(self) -> bool:
+        """
+        Returns whether the preprocessed geometry file exists and is newer than
+        every shapefile in the shapefile directory.
+        """
+        if not self.geometry_file or not os.path.exists(self.geometry_file):
+            return False
+        shapefiles = glob.glob(os.path.join(self.shapefile_dir, "*.shp"))
+        newest_shapefile = max(map(os.path.getmtime, shapefiles), default=0)
+        return os.path.getmtime(self.geometry_file) >= newest_shapefile
+
+    def _get_combined(
+        self, fips_codes: tuple[str, ...], detail: str
+    ) -> gpd.GeoDataFrame:
+        # Callers must hold self._lock
+        simplification = DETAIL_LEVELS[detail]
+        combined = self._combined.get((fips_codes, detail))
+        if combined is None:
+            if simplification is None:
+                county_gdfs = [self._load_county(fips) for fips in fips_codes]
+                combined = pd.concat(county_gdfs, ignore_index=True)
+            else:
+                # Simplify the whole set at once so county borders stay shared
+                full = self._get_combined(fips_codes, "full")
+                combined = simplify_geometries(full, *simplification)
+            self._combined[(fips_codes, detail)] = combined
+        return combined
+
+    def _load_county(self, fips_code: str) -> gpd.GeoDataFrame:
+        # Callers must hold self._lock
+        gdf = self._counties.get(fips_code)
+        if gdf is None:
+            gdf = self._load_preprocessed().get(fips_code)
+        if gdf is None:
+            gdf = load_shapefile(fips_code, self.shapefile_dir, self.shapefile_pattern)
+        self._counties[fips_code] = gdf
+        return gdf
+
+    def _load_preprocessed(self) -> dict[str, gpd.GeoDataFrame]:
+        # Callers must hold self._lock
+        if self._preprocessed is None:
+            self._preprocessed = {}
+            if self.has_fresh_geometry_file():
+                with timed("load_geometry_file"):
+                    table = feather.read_table(self.geometry_file, memory_map=True)
+                    gdf = gpd.GeoDataFrame.from_arrow(table)
+                    fips = gdf["STATEFP20"] + gdf["COUNTYFP20"]
+                    for fips_code, county_gdf in gdf.groupby(fips, sort=False):
+                        self._preprocessed[fips_code] = county_gdf.reset_index(
+                            drop=True
+                        )
+        return self._preprocessed
@@ -1,33 +1,41 @@
 """GeoJSON and spatial data processing functions."""
 
-import json
+import contextvars
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Optional
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
-
-
-def construct_geoid(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Construct GEOID column from state, county, tract, and block group codes.
-
-    Args:
-        df: DataFrame with geographic identifiers
-
-    Returns:
-        DataFrame with GEOID column added
-    """
-    df = df.copy()
-    # Construct GEOID: 2-digit state + 3-digit county + 6-digit tract + block group
-    # zfill ensures proper zero-padding for FIPS codes
-    df["GEOID"] = (
-        df["STATEA"].astype(str).str.zfill(2)
-        + df["COUNTYA"].astype(str).str.zfill(3)
-        + df["TRACTA"].astype(str).str.zfill(6)
-        + df["BLCK_GRPA"].astype(str)
-    )
-    return df
-
-
+import shapely
+
+from .geoid_index import GeoidIndex
+from .metrics import timed, timed_stage
+from .serialization import (
+    feature_collection,
+    geodataframe_to_features,
+    geodataframe_to_geojson,
+)
+from .town_index import TownIndex
+
+if TYPE_CHECKING:
+    from .geometry_store import GeometryStore
+
+# Columns that change between housing requests, served by get_housing_attributes
+ATTRIBUTE_COLUMNS = [
+    "GEOID20",
+    "TOWN",
+    "housing_units_change",
+    "housing_units_change_percent",
+    "z",
+]
+
+# Map extents for housing requests: every block group, the city's block groups plus
+# those intersecting its bounding box, or only the city's block groups
+SCOPES = ["state", "neighbors", "city"]
+
+
+@timed_stage("load_shapefile")
 def load_shapefile(
     fips_code: str, shapefile_dir: str, shapefile_pattern: str
 ) -> gpd.GeoDataFrame:
@@ -54,12 +62,46 @@ def load_shapefile(
     return gdf
 
 
+@timed_stage("simplify")
+def simplify_geometries(
+    gdf: gpd.GeoDataFrame, tolerance: float, grid_size: float
+) -> gpd.GeoDataFrame:
+    """
+    Simplify block group geometries and snap their coordinates to a grid.
+
+    Adjacent block groups form a coverage, so they are simplified together to keep
+    shared edges identical (no gaps or overlaps between neighbors). Snapping to a
+    grid quantizes coordinates, which shortens them when serialized.
+
+    Args:
+        gdf: GeoDataFrame of block group geometries
+        tolerance: Maximum distance simplified edges may move, in degrees
+        grid_size: Coordinate grid size, in degrees
+
+    Returns:
+        Copy of the GeoDataFrame with simplified geometries
+    """
+    if shapely.geos_version >= (3, 12, 0):
+        simplified = gdf.geometry.simplify_coverage(tolerance)
+    else:
+        # Older GEOS lacks coverage simplification; simplify each shape independently
+        simplified = gdf.geometry.simplify(tolerance, preserve_topology=True)
+
+    gdf = gdf.copy()
+    gdf[gdf.geometry.name] = shapely.set_precision(simplified.to_numpy(), grid_size)
+    return gdf
+
+
+@timed_stage("housing_changes")
 def calculate_housing_changes(
     gdf: gpd.GeoDataFrame, year1: str, year2: str, city: str
 ) -> gpd.GeoDataFrame:
     """
     Calculate housing unit changes and add to GeoDataFrame.
 
+    Columns are added in place, so callers should pass a frame they own
+    (e.g. the fresh result of a merge).
+
     Args:
         gdf: GeoDataFrame with housing data
         year1: First year for comparison
@@ -69,86 +111,436 @@ def calculate_housing_changes(
     Returns:
         GeoDataFrame with housing change columns added
     """
-    gdf = gdf.copy()
+    units_year1 = gdf[f"housing_units_{year1}"]
+    units_year2 = gdf[f"housing_units_{year2}"]
 
     # Calculate changes
-    gdf["housing_units_change"] = round(
-        gdf[f"housing_units_{year2}"] - gdf[f"housing_units_{year1}"]
-    )
-    gdf["housing_units_change_percent"] = gdf.apply(
-        lambda row: round(
-            (
-                (row[f"housing_units_{year2}"] - row[f"housing_units_{year1}"])
-                / row[f"housing_units_{year1}"]
-                * 100
-            ),
-            2,
-        )
-        if pd.notna(row[f"housing_units_{year1}"])
-        and row[f"housing_units_{year1}"] != 0
-        else None,
-        axis=1,
-    )
+    change = units_year2 - units_year1
+    gdf["housing_units_change"] = change.round()
+
+    # Percent change is undefined (NaN, serialized as null) for missing or zero baselines
+    baseline = units_year1.where(units_year1.notna() & (units_year1 != 0))
+    gdf["housing_units_change_percent"] = (change / baseline * 100).round(2)
 
     # Only fill z-values for the specified city (for map visualization)
     # Other cities remain None/transparent on the map
-    gdf["z"] = gdf.apply(
-        lambda row: row["housing_units_change"] if row["TOWN"] == city else None,
-        axis=1,
-    )
+    gdf["z"] = gdf["housing_units_change"].where(gdf["TOWN"] == city)
 
     return gdf
 
 
+def get_county_fips_codes(df: pd.DataFrame) -> list[str]:
+    """
+    Returns the 5-digit county FIPS codes present in the data, in order of appearance.
+
+    Args:
+        df: DataFrame with STATEA and COUNTYA columns
+
+    Returns:
+        List of FIPS codes (state + county)
+    """
+    unique_combos = df[["STATEA", "COUNTYA"]].drop_duplicates()
+    return [
+        f"{str(state_code).zfill(2)}{str(county_code).zfill(3)}"
+        for state_code, county_code in unique_combos.itertuples(index=False, name=None)
+    ]
+
+
+@timed_stage("spatial_filter")
+def find_block_groups(
+    df: pd.DataFrame,
+    city: str,
+    geometry_store: "GeometryStore",
+    fips_codes: list[str],
+    scope: str = "state",
+    bbox: Optional[list[float]] = None,
+    town_index: Optional[TownIndex] = None,
+    geoid_index: Optional[GeoidIndex] = None,
+) -> Optional[np.ndarray]:
+    """
+    Find the block groups within a map scope and/or bounding box using the spatial index.
+
+    Args:
+        df: DataFrame with demographic data
+        city: City the scope is centered on
+        geometry_store: Cached block group geometries
+        fips_codes: Counties of the geometry frame, in output order
+        scope: One of SCOPES
+        bbox: [min_lon, min_lat, max_lon, max_lat] viewport to intersect (optional)
+        town_index: Town index built from df (optional)
+        geoid_index: GEOID index built from df (optional)
+
+    Returns:
+        Sorted row positions in the geometry frame, or None for every block group
+    """
+    if scope == "state" and bbox is None:
+        return None
+
+    full = geometry_store.get(fips_codes)
+    tree = geometry_store.get_spatial_index(fips_codes)
+    positions = np.arange(len(full))
+
+    if scope != "state":
+        geoid_index = GeoidIndex(df) if geoid_index is None else geoid_index
+        if town_index is not None:
+            city_rows = town_index.positions(city)
+        else:
+            city_rows = np.flatnonzero((df["TOWN"] == city).to_numpy())
+        city_geoids = geoid_index.keys[city_rows]
+        positions = np.flatnonzero(
+            np.isin(geometry_store.get_geoid_keys(fips_codes), city_geoids)
+        )
+        if scope == "neighbors" and len(positions):
+            city_bounds = shapely.total_bounds(full.geometry.to_numpy()[positions])
+            positions = tree.query(shapely.box(*city_bounds), predicate="intersects")
+
+    if bbox is not None:
+        in_bbox = tree.query(shapely.box(*bbox), predicate="intersects")
+        positions = np.intersect1d(positions, in_bbox)
+
+    return np.sort(positions)
+
+
+def join_rows(
+    gdf: gpd.GeoDataFrame, data: pd.DataFrame, matched: np.ndarray
+) -> gpd.GeoDataFrame:
+    """
+    Joins dataset rows, already aligned with the block groups, onto their geometries.
+
+    Produces the same frame as gdf.merge(df, left_on="GEOID20", right_on="GEOID",
+    how="left") with the dataset's string GEOID column: that column is appended
+    (missing where a block group has no row), columns present on both sides get
+    _x/_y suffixes, and the index is reset.
+
+    Args:
+        gdf: Block group geometries
+        data: Dataset rows in the order of gdf (from GeoidIndex.take); a GEOID
+            column, if it has one, is replaced in place
+        matched: Whether each block group has a dataset row
+
+    Returns:
+        GeoDataFrame with the geometry columns followed by the dataset columns
+    """
+    # Shallow copy: the concat below copies the data once
+    left = gdf.copy(deep=False)
+    left.index = pd.RangeIndex(len(left))
+    # Matched rows have the block group's GEOID, so the string form needs no formatting
+    geoid = left["GEOID20"].where(matched).rename("GEOID")
+    if "GEOID" in data.columns:
+        data["GEOID"] = geoid
+        right = [data]
+    else:
+        # Appended in the concat rather than inserted into data, which may
+        # hold one block per column when taken from a memory-mapped dataset
+        right = [data, geoid.to_frame()]
+
+    right_columns = data.columns.union(["GEOID"], sort=False)
+    overlap = left.columns.intersection(right_columns)
+    if len(overlap):
+        left = left.rename(columns={col: f"{col}_x" for col in overlap})
+        right = [
+            part.rename(columns={col: f"{col}_y" for col in overlap}) for part in right
+        ]
+    return pd.concat([left, *right], axis=1)
+
+
+def join_housing_data(
+    df: pd.DataFrame,
+    year1: str,
+    year2: str,
+    city: str,
+    geometry_store: "GeometryStore",
+    detail: str = "full",
+    scope: str = "state",
+    bbox: Optional[list[float]] = None,
+    town_index: Optional[TownIndex] = None,
+    geoid_index: Optional[GeoidIndex] = None,
+) -> gpd.GeoDataFrame:
+    """
+    Joins the population/housing data onto the cached block group geometries
+    and calculates housing changes for a specific city.
+
+    Only block groups within the scope and bounding box are joined and computed.
+    The result matches a left merge of the geometries with the data on GEOID
+    (block groups without data get missing values), but rows are taken at
+    positions precomputed by the GEOID index instead of hash-joining strings.
+
+    Args:
+        df: DataFrame with demographic and housing data
+        year1: First year for comparison
+        year2: Second year for comparison
+        city: City name to analyze
+        geometry_store: Cached block group geometries
+        detail: Geometry detail level (see geometry_store.DETAIL_LEVELS)
+        scope: Map extent, one of SCOPES
+        bbox: [min_lon, min_lat, max_lon, max_lat] viewport to intersect (optional)
+        town_index: Town index built from df (optional)
+        geoid_index: GEOID index built from df (optional)
+
+    Returns:
+        GeoDataFrame with one row per block group and housing change columns
+    """
+    geoid_index = GeoidIndex(df) if geoid_index is None else geoid_index
+
+    # Block group geometries for every county in the data, read from disk only once
+    fips_codes = get_county_fips_codes(df)
+    gdf = geometry_store.get(fips_codes, detail)
+    positions = find_block_groups(
+        df, city, geometry_store, fips_codes, scope, bbox, town_index, geoid_index
+    )
+    if positions is not None:
+        gdf = gdf.iloc[positions]
+
+    # Dataset rows in block group order, at positions looked up once per geometry frame
+    with timed("merge"):
+        data, matched = geoid_index.take(df, geometry_store, fips_codes, positions)
+        gdf = join_rows(gdf, data, matched)
+
+    # Calculate housing changes
+    return calculate_housing_changes(gdf, year1, year2, city)
+
+
+def plan_county_chunks(
+    df: pd.DataFrame,
+    city: str,
+    geometry_store: "GeometryStore",
+    fips_codes: list[str],
+    scope: str = "state",
+    bbox: Optional[list[float]] = None,
+    town_index: Optional[TownIndex] = None,
+    geoid_index: Optional[GeoidIndex] = None,
+) -> tuple[list[tuple[np.ndarray, int]], bool]:
+    """
+    Split the block groups of a map request into one chunk per county.
+
+    Counties are contiguous in the geometry frame, so each chunk is a run of
+    the sorted positions and the chunks' features, concatenated in order, are
+    the features of the whole request.
+
+    Args:
+        df: DataFrame with demographic and housing data
+        city: City the scope is centered on
+        geometry_store: Cached block group geometries
+        fips_codes: Counties of the geometry frame, in output order
+        scope: Map extent, one of SCOPES
+        bbox: [min_lon, min_lat, max_lon, max_lat] viewport to intersect (optional)
+        town_index: Town index built from df (optional)
+        geoid_index: GEOID index built from df (optional)
+
+    Returns:
+        Tuple of ((geometry row positions, feature id of the first row) per county
+        with selected block groups, whether any selected block group lacks data)
+    """
+    geoid_index = GeoidIndex(df) if geoid_index is None else geoid_index
+    positions = find_block_groups(
+        df, city, geometry_store, fips_codes, scope, bbox, town_index, geoid_index
+    )
+    if positions is None:
+        positions = np.arange(len(geometry_store.get(fips_codes)))
+    fill_missing = not geoid_index.matched(geometry_store, fips_codes, positions).all()
+
+    chunks = []
+    for county in geometry_store.get_county_slices(fips_codes):
+        start, stop = np.searchsorted(positions, [county.start, county.stop])
+        if stop > start:
+            chunks.append((positions[start:stop], int(start)))
+    return chunks, fill_missing
+
+
+def merge_county_features(
+    df: pd.DataFrame,
+    year1: str,
+    year2: str,
+    city: str,
+    geometry_store: "GeometryStore",
+    fips_codes: list[str],
+    detail: str,
+    positions: np.ndarray,
+    id_offset: int,
+    fill_missing: bool,
+    geoid_index: GeoidIndex,
+) -> bytes:
+    """
+    Joins, computes and serializes the block groups of one chunk from plan_county_chunks.
+
+    Args:
+        df: DataFrame with demographic and housing data
+        year1: First year for comparison
+        year2: Second year for comparison
+        city: City name to analyze
+        geometry_store: Cached block group geometries
+        fips_codes: Counties of the geometry frame, in output order
+        detail: Geometry detail level (see geometry_store.DETAIL_LEVELS)
+        positions: Geometry row positions of the chunk
+        id_offset: Feature id of the chunk's first block group
+        fill_missing: Whether any block group of the whole request lacks data,
+            so every chunk gets the column dtypes of the whole
+        geoid_index: GEOID index built from df
+
+    Returns:
+        Comma-separated GeoJSON Features (see serialization.feature_collection)
+    """
+    gdf = geometry_store.get(fips_codes, detail).iloc[positions]
+    with timed("merge"):
+        data, matched = geoid_index.take(
+            df, geometry_store, fips_codes, positions, fill_missing
+        )
+        gdf = join_rows(gdf, data, matched)
+    gdf = calculate_housing_changes(gdf, year1, year2, city)
+    # Number features as if the chunks had been joined as one frame
+    gdf.index = pd.RangeIndex(id_offset, id_offset + len(gdf))
+    return geodataframe_to_features(gdf)
+
+
 def merge_geojson(
     df: pd.DataFrame,
     year1: str,
     year2: str,
     city: str,
-    shapefile_dir: str,
-    shapefile_pattern: str,
-) -> dict:
+    geometry_store: "GeometryStore",
+    detail: str = "full",
+    scope: str = "state",
+    bbox: Optional[list[float]] = None,
+    town_index: Optional[TownIndex] = None,
+    geoid_index: Optional[GeoidIndex] = None,
+    executor: Optional[Executor] = None,
+) -> bytes:
     """
     Merges the GeoJSON block group data with the population/housing data for a specific city.
 
+    With an executor, each county is joined, computed and serialized as a
+    separate task and the results are stitched together in county order. The
+    output is the same bytes as without one.
+
     Args:
         df: DataFrame with demographic and housing data
         year1: First year for comparison
         year2: Second year for comparison
         city: City name to analyze
-        shapefile_dir: Directory containing shapefiles
-        shapefile_pattern: Pattern for shapefile names
+        geometry_store: Cached block group geometries
+        detail: Geometry detail level; lower levels suit zoomed-out maps
+        scope: Map extent, one of SCOPES
+        bbox: [min_lon, min_lat, max_lon, max_lat] viewport to intersect (optional)
+        town_index: Town index built from df (optional)
+        geoid_index: GEOID index built from df (optional)
+        executor: Thread pool to process counties concurrently (optional)
 
     Returns:
-        GeoJSON dictionary
+        Serialized GeoJSON FeatureCollection, ready to send as a response body
     """
-    # Construct GEOID in df
-    df = construct_geoid(df)
+    if executor is not None:
+        geoid_index = GeoidIndex(df) if geoid_index is None else geoid_index
+        fips_codes = get_county_fips_codes(df)
+        chunks, fill_missing = plan_county_chunks(
+            df, city, geometry_store, fips_codes, scope, bbox, town_index, geoid_index
+        )
+        futures = [
+            # Each task runs in its own copy of the caller's context, so stage
+            # timings still reach the request
+            executor.submit(
+                contextvars.copy_context().run,
+                merge_county_features,
+                df,
+                year1,
+                year2,
+                city,
+                geometry_store,
+                fips_codes,
+                detail,
+                positions,
+                id_offset,
+                fill_missing,
+                geoid_index,
+            )
+            for positions, id_offset in chunks
+        ]
+        return feature_collection([future.result() for future in futures])
+
+    gdf = join_housing_data(
+        df,
+        year1,
+        year2,
+        city,
+        geometry_store,
+        detail,
+        scope,
+        bbox,
+        town_index,
+        geoid_index,
+    )
 
-    # Get unique state/county combinations
-    unique_combos = df[["STATEA", "COUNTYA"]].drop_duplicates()
+    # Convert to GeoJSON bytes in one pass (no intermediate dictionaries)
+    return geodataframe_to_geojson(gdf)
+
+
+def get_housing_attributes(
+    df: pd.DataFrame,
+    year1: str,
+    year2: str,
+    city: str,
+    geometry_store: "GeometryStore",
+    scope: str = "state",
+    bbox: Optional[list[float]] = None,
+    town_index: Optional[TownIndex] = None,
+    geoid_index: Optional[GeoidIndex] = None,
+) -> dict[str, list]:
+    """
+    Returns only the per-request map values as GEOID-indexed columns.
 
-    all_gdfs = []
-    for state_code, county_code in unique_combos.itertuples(index=False, name=None):
-        # Construct 5-digit FIPS code (state + county)
-        fips = f"{str(state_code).zfill(2)}{str(county_code).zfill(3)}"
+    Positions line up across all columns, so the client can join them onto the
+    static geometries from get_geometry_geojson by GEOID20.
 
-        # Load shapefile for this county
-        gdf = load_shapefile(fips, shapefile_dir, shapefile_pattern)
+    Args:
+        df: DataFrame with demographic and housing data
+        year1: First year for comparison
+        year2: Second year for comparison
+        city: City name to analyze
+        geometry_store: Cached block group geometries
+        scope: Map extent, one of SCOPES
+        bbox: [min_lon, min_lat, max_lon, max_lat] viewport to intersect (optional)
+        town_index: Town index built from df (optional)
+        geoid_index: GEOID index built from df (optional)
 
-        # Merge housing data into GeoDataFrame using GEOID as the key
-        # left join preserves all block groups even if they lack housing data
-        gdf = gdf.merge(df, left_on="GEOID20", right_on="GEOID", how="left")
+    Returns:
+        Dictionary mapping column names to lists of values (None for missing)
+    """
+    gdf = join_housing_data(
+        df,
+        year1,
+        year2,
+        city,
+        geometry_store,
+        "full",
+        scope,
+        bbox,
+        town_index,
+        geoid_index,
+    )
+
+    attributes = {}
+    with timed("attribute_columns"):
+        for col in ATTRIBUTE_COLUMNS:
+            # Replace NaN with None so the lists serialize to JSON null
+            values = gdf[col].astype(object)
+            attributes[col] = values.where(values.notna(), None).tolist()
 
-        # Calculate housing changes
-        gdf = calculate_housing_changes(gdf, year1, year2, city)
+    return attributes
 
-        all_gdfs.append(gdf)
 
-    # Combine into a single GeoDataFrame
-    combined_gdf = pd.concat(all_gdfs, ignore_index=True)
+def get_geometry_geojson(
+    df: pd.DataFrame, geometry_store: "GeometryStore", detail: str = "full"
+) -> bytes:
+    """
+    Returns the static block group shapes as GeoJSON, without any data attributes.
 
-    # Convert to GeoJSON
-    geojson = json.loads(combined_gdf.to_json())
+    Args:
+        df: DataFrame used to determine which counties to include
+        geometry_store: Cached block group geometries
+        detail: Geometry detail level; lower levels suit zoomed-out maps
 
-    return geojson
+    Returns:
+        Serialized GeoJSON with GEOID20 as each feature's id and only property
+    """
+    gdf = geometry_store.get(get_county_fips_codes(df), detail)
+    gdf = gdf[["GEOID20", gdf.geometry.name]]
+    return geodataframe_to_geojson(gdf.set_index("GEOID20", drop=False))
@@ -0,0 +1,306 @@
+"""Lightweight timing instrumentation with Prometheus text-format export."""
+
+import bisect
+import contextvars
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# Latency buckets in seconds (the Prometheus client defaults)
+SECONDS_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1,
+    2.5,
+    5,
+    7.5,
+    10,
+)
+# Payload size buckets in bytes, 1 KB to 64 MB in steps of 4x
+BYTES_BUCKETS = tuple(1024 * 4**power for power in range(9))
+
+# Stage timings of the current request, when Server-Timing collection is on
+_request_timings: contextvars.ContextVar[Optional[dict[str, float]]] = (
+    contextvars.ContextVar("request_timings", default=None)
+)
+# Stages of one request can run on several merge threads at once
+_request_timings_lock = threading.Lock()
+
+
+def _format_labels(labelnames: tuple[str, ...], labelvalues: tuple[str, ...]) -> str:
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, labelvalues):
+        escaped = (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Cumulative histogram of observed values, split by label values."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = SECONDS_BUCKETS,
+    ):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels each observation is recorded under
+            buckets: Upper bounds of the buckets, in increasing order
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """
+        Record an observation.
+
+        Args:
+            value: Observed value
+            *labelvalues: Label values, in labelnames order
+        """
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = [0] * (len(self.buckets) + 1) + [0.0]
+                self._series[labelvalues] = series
+            series[bucket] += 1
+            series[-1] += value
+
+    def collect(self) -> list[str]:
+        """Returns the histogram in Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series_items = [
+                (labels, list(series)) for labels, series in self._series.items()
+            ]
+        for labelvalues, series in sorted(series_items):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), series[:-1]):
+                cumulative += count
+                labels = _format_labels(
+                    (*self.labelnames, "le"), (*labelvalues, _format_value(bound))
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Counter or gauge whose current values are read from a callback at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        callback: Callable[[], dict[tuple[str, ...], float]],
+        labelnames: tuple[str, ...] = (),
+    ):
+        """
+        Initialize the metric.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            metric_type: "counter" or "gauge"
+            callback: Returns a mapping of label values to current values
+            labelnames: Names of the labels
+        """
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def collect(self) -> list[str]:
+        """Returns the metric in Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for labelvalues, value in sorted(self.callback().items()):
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for a /metrics endpoint."""
+
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = SECONDS_BUCKETS,
+    ) -> Histogram:
+        """
+        Returns the histogram registered under a name, creating it if needed.
+        """
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(
+                    name, documentation, labelnames, buckets
+                )
+            return self._metrics[name]
+
+    def register_callback(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        callback: Callable[[], dict[tuple[str, ...], float]],
+        labelnames: tuple[str, ...] = (),
+    ) -> CallbackMetric:
+        """
+        Register (or replace) a counter or gauge read from a callback at scrape time.
+        """
+        metric = CallbackMetric(name, documentation, metric_type, callback, labelnames)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Returns every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry for the data processing stages and the API endpoints
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "missing_middle_stage_seconds",
+    "Time spent in each data processing stage",
+    ("stage",),
+)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Time a block as a data processing stage.
+
+    The duration is recorded in STAGE_SECONDS and, while Server-Timing
+    collection is on for the current request, added to its timings.
+
+    Args:
+        stage: Stage name, e.g. "merge"
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            with _request_timings_lock:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def timed_stage(stage: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator form of timed, for functions that make up a whole stage.
+
+    Args:
+        stage: Stage name, e.g. "load_shapefile"
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def start_request_timings() -> dict[str, float]:
+    """
+    Start collecting stage timings for the current request (context).
+
+    Returns:
+        Mapping of stage names to total seconds, filled in as stages run
+    """
+    timings: dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def stop_request_timings() -> None:
+    """
+    Stop collecting stage timings for the current request (context).
+    """
+    _request_timings.set(None)
+
+
+def format_server_timing(
+    timings: dict[str, float], total: Optional[float] = None
+) -> str:
+    """
+    Format stage timings as a Server-Timing header value.
+
+    Args:
+        timings: Mapping of stage names to seconds
+        total: Total request time in seconds (optional)
+
+    Returns:
+        Header value such as "merge;dur=12.5, serialize_geojson;dur=40.1, total;dur=60.2"
+    """
+    entries = [
+        f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()
+    ]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
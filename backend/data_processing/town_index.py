@@ -0,0 +1,104 @@
+"""Index from town names to the positions of their rows in the dataset."""
+
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# Rows of a town: a slice when they are contiguous, otherwise integer positions
+TownRows = Union[slice, np.ndarray]
+
+
+class TownIndex:
+    """
+    Maps each town to the positions of its block group rows, built once per DataFrame.
+
+    Selecting a town's rows through the index costs time proportional to the
+    town's block groups instead of a boolean mask over the whole table. When
+    the frame is sorted by town every town maps to a contiguous slice.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Build the index from the TOWN column of a dataset.
+
+        Args:
+            df: DataFrame containing a TOWN column
+        """
+        self._rows: dict[str, TownRows] = {}
+        # One grouped pass; rows with a missing town are left out of the index
+        groups = df.groupby("TOWN", sort=False, observed=True).indices
+        for town, positions in groups.items():
+            if positions[-1] - positions[0] + 1 == len(positions):
+                self._rows[town] = slice(int(positions[0]), int(positions[-1]) + 1)
+            else:
+                self._rows[town] = positions
+
+    def __contains__(self, city: str) -> bool:
+        return city in self._rows
+
+    @property
+    def towns(self) -> list[str]:
+        """Town names in order of first appearance."""
+        return list(self._rows)
+
+    def positions(self, city: str) -> TownRows:
+        """
+        Returns the positions of a town's rows.
+
+        Args:
+            city: City name
+
+        Returns:
+            Slice or integer array of row positions (empty for unknown towns)
+        """
+        return self._rows.get(city, np.empty(0, dtype=np.intp))
+
+    def row_count(self, city: str) -> int:
+        """
+        Returns the number of rows for a town.
+
+        Args:
+            city: City name
+
+        Returns:
+            Number of rows (0 for unknown towns)
+        """
+        rows = self._rows.get(city)
+        if rows is None:
+            return 0
+        if isinstance(rows, slice):
+            return rows.stop - rows.start
+        return len(rows)
+
+    def rows(self, df: pd.DataFrame, city: str) -> pd.DataFrame:
+        """
+        Returns a town's rows of the DataFrame the index was built from.
+
+        Args:
+            df: DataFrame the index was built from
+            city: City name
+
+        Returns:
+            DataFrame with only the town's rows
+        """
+        return df.iloc[self.positions(city)]
+
+
+def select_town_rows(
+    df: pd.DataFrame, city: str, town_index: Optional[TownIndex] = None
+) -> pd.DataFrame:
+    """
+    Returns the rows of a town, using the index when one is given.
+
+    Args:
+        df: DataFrame containing demographic data
+        city: City name to filter by
+        town_index: Town index built from df (optional)
+
+    Returns:
+        DataFrame with only the town's rows
+    """
+    if town_index is not None:
+        return town_index.rows(df, city)
+    return df[df["TOWN"] == city]
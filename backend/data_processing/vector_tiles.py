@@ -0,0 +1,433 @@
+"""Mapbox Vector Tile (MVT) encoding of the housing change map."""
+
+import math
+import struct
+from typing import TYPE_CHECKING, Any, Optional
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from .geoid_index import GeoidIndex
+from .geospatial import join_housing_data
+from .metrics import timed_stage
+from .town_index import TownIndex
+
+if TYPE_CHECKING:
+    from .geometry_store import GeometryStore
+
+# Tile coordinate space and the margin kept around it so shapes that cross
+# tile edges are not drawn with seams, both in tile units
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+MAX_TILE_ZOOM = 16
+
+# Layer of every block group, the same for all cities of a year pair, and the
+# layer of the selected city's block groups drawn over it
+TILE_LAYER = "block_groups"
+CITY_TILE_LAYER = "city"
+
+# Feature properties written to each layer
+TILE_PROPERTIES = [
+    "GEOID20",
+    "TOWN",
+    "housing_units_change",
+    "housing_units_change_percent",
+]
+CITY_TILE_PROPERTIES = ["GEOID20", "z"]
+
+# Coarsest geometry detail level that still looks exact at each zoom, as
+# (minimum zoom, detail) pairs from the highest zoom down
+TILE_DETAIL_BY_ZOOM = [(13, "full"), (10, "high"), (8, "medium"), (0, "low")]
+
+# MVT geometry commands
+MOVE_TO = 1
+LINE_TO = 2
+CLOSE_PATH = 7
+POLYGON = 3
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """
+    Returns the longitude/latitude bounds of a web mercator tile.
+
+    Args:
+        z: Zoom level
+        x: Tile column
+        y: Tile row (0 at the top)
+
+    Returns:
+        (min_lon, min_lat, max_lon, max_lat)
+    """
+    n = 2**z
+
+    def tile_lat(tile_y: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return (x / n * 360 - 180, tile_lat(y + 1), (x + 1) / n * 360 - 180, tile_lat(y))
+
+
+def buffered_tile_bounds(z: int, x: int, y: int) -> list[float]:
+    """
+    Returns the bounds of a tile widened by TILE_BUFFER, the area its features come from.
+
+    Args:
+        z: Zoom level
+        x: Tile column
+        y: Tile row (0 at the top)
+
+    Returns:
+        [min_lon, min_lat, max_lon, max_lat]
+    """
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+    margin_lon = (max_lon - min_lon) * TILE_BUFFER / TILE_EXTENT
+    margin_lat = (max_lat - min_lat) * TILE_BUFFER / TILE_EXTENT
+    return [
+        min_lon - margin_lon,
+        min_lat - margin_lat,
+        max_lon + margin_lon,
+        max_lat + margin_lat,
+    ]
+
+
+def tile_intersects(z: int, x: int, y: int, bounds: tuple[float, ...]) -> bool:
+    """
+    Returns whether a tile can contain features within the given bounds.
+
+    Args:
+        z: Zoom level
+        x: Tile column
+        y: Tile row (0 at the top)
+        bounds: (min_lon, min_lat, max_lon, max_lat) of the data
+
+    Returns:
+        False if the buffered tile lies entirely outside the bounds
+    """
+    min_lon, min_lat, max_lon, max_lat = buffered_tile_bounds(z, x, y)
+    return not (
+        max_lon < bounds[0]
+        or min_lon > bounds[2]
+        or max_lat < bounds[1]
+        or min_lat > bounds[3]
+    )
+
+
+def detail_for_zoom(z: int) -> str:
+    """
+    Returns the geometry detail level used for tiles at a zoom level.
+
+    Args:
+        z: Zoom level
+
+    Returns:
+        Detail level from geometry_store.DETAIL_LEVELS
+    """
+    for min_zoom, detail in TILE_DETAIL_BY_ZOOM:
+        if z >= min_zoom:
+            return detail
+    return TILE_DETAIL_BY_ZOOM[-1][1]
+
+
+def project_to_tile(geometries: np.ndarray, z: int, x: int, y: int) -> np.ndarray:
+    """
+    Project longitude/latitude geometries to the integer coordinates of a tile.
+
+    Shapes are clipped to the buffered tile and snapped to the integer grid;
+    shapes that collapse at this zoom come back empty.
+
+    Args:
+        geometries: Array of shapely geometries in longitude/latitude
+        z: Zoom level
+        x: Tile column
+        y: Tile row
+
+    Returns:
+        Array of geometries in tile coordinates (y pointing down)
+    """
+    n = 2**z
+
+    def to_tile(coords: np.ndarray) -> np.ndarray:
+        lon, lat = coords[:, 0], np.radians(coords[:, 1])
+        tile_x = ((lon + 180) / 360 * n - x) * TILE_EXTENT
+        mercator_y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2
+        tile_y = (mercator_y * n - y) * TILE_EXTENT
+        return np.column_stack([tile_x, tile_y])
+
+    projected = shapely.transform(geometries, to_tile)
+    clipped = shapely.clip_by_rect(
+        projected,
+        -TILE_BUFFER,
+        -TILE_BUFFER,
+        TILE_EXTENT + TILE_BUFFER,
+        TILE_EXTENT + TILE_BUFFER,
+    )
+    return shapely.set_precision(clipped, 1.0)
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    return (values << 1) ^ (values >> 63)
+
+
+def _command(command_id: int, count: int) -> int:
+    return (command_id & 0x7) | (count << 3)
+
+
+def _encode_ring(
+    coords: np.ndarray, cursor: np.ndarray, exterior: bool
+) -> Optional[list[int]]:
+    # Drop the closing point and any repeated points left by snapping
+    ring = coords[:-1].astype(np.int64)
+    ring = ring[np.r_[True, np.any(ring[1:] != ring[:-1], axis=1)]]
+    if len(ring) < 3:
+        return None
+
+    # Exterior rings have positive area in tile coordinates, holes negative
+    area = np.sum(
+        ring[:, 0] * np.roll(ring[:, 1], -1) - np.roll(ring[:, 0], -1) * ring[:, 1]
+    )
+    if area == 0:
+        return None
+    if (area > 0) != exterior:
+        ring = ring[::-1]
+
+    deltas = _zigzag(np.diff(ring, axis=0, prepend=cursor[np.newaxis])).tolist()
+    cursor[:] = ring[-1]
+    commands = [_command(MOVE_TO, 1), *deltas[0], _command(LINE_TO, len(ring) - 1)]
+    for delta in deltas[1:]:
+        commands.extend(delta)
+    commands.append(_command(CLOSE_PATH, 1))
+    return commands
+
+
+def encode_polygon_geometry(geometry: shapely.Geometry) -> list[int]:
+    """
+    Encode a polygonal geometry in tile coordinates as MVT geometry commands.
+
+    Args:
+        geometry: Polygon or MultiPolygon with integer tile coordinates
+
+    Returns:
+        Command and parameter integers (empty if nothing is left to draw)
+    """
+    commands = []
+    cursor = np.zeros(2, dtype=np.int64)
+    for polygon in shapely.get_parts(geometry):
+        if not isinstance(polygon, shapely.Polygon):
+            continue
+        exterior = _encode_ring(
+            shapely.get_coordinates(polygon.exterior), cursor, exterior=True
+        )
+        if exterior is None:
+            continue
+        commands.extend(exterior)
+        for interior in polygon.interiors:
+            ring = _encode_ring(
+                shapely.get_coordinates(interior), cursor, exterior=False
+            )
+            if ring is not None:
+                commands.extend(ring)
+    return commands
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _key(field_number: int, wire_type: int) -> bytes:
+    return _varint((field_number << 3) | wire_type)
+
+
+def _length_delimited(field_number: int, payload: bytes) -> bytes:
+    return _key(field_number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field_number: int, values: list[int]) -> bytes:
+    return _length_delimited(field_number, b"".join(map(_varint, values)))
+
+
+def _encode_value(value: Any) -> bytes:
+    # Tile Value message: strings, signed integers and doubles are all we need
+    if isinstance(value, str):
+        return _length_delimited(1, value.encode())
+    if isinstance(value, (int, np.integer)):
+        value = int(value)
+        return _key(6, 0) + _varint((value << 1) ^ (value >> 63))
+    return _key(3, 1) + struct.pack("<d", float(value))
+
+
+@timed_stage("encode_tile")
+def encode_vector_tile(
+    gdf: gpd.GeoDataFrame,
+    z: int,
+    x: int,
+    y: int,
+    properties: Optional[list[str]] = None,
+    layer_name: str = TILE_LAYER,
+) -> bytes:
+    """
+    Encode block group polygons and their properties as a single-layer vector tile.
+
+    Missing property values are left off the feature. Features whose GEOID20
+    is numeric use it as the feature id.
+
+    Args:
+        gdf: GeoDataFrame in longitude/latitude
+        z: Zoom level
+        x: Tile column
+        y: Tile row
+        properties: Columns to write as feature properties (default TILE_PROPERTIES)
+        layer_name: Name of the tile layer
+
+    Returns:
+        Protobuf-encoded Mapbox Vector Tile (version 2); empty (a tile
+        without layers) if no polygon falls within the tile
+    """
+    properties = TILE_PROPERTIES if properties is None else properties
+    geometries = project_to_tile(gdf.geometry.to_numpy(), z, x, y)
+
+    keys: dict[str, int] = {}
+    values: dict[tuple[type, Any], int] = {}
+    features = []
+    records = pd.DataFrame(gdf[properties]).astype(object).to_dict("records")
+    for record, geometry in zip(records, geometries):
+        if geometry is None or shapely.is_empty(geometry):
+            continue
+        commands = encode_polygon_geometry(geometry)
+        if not commands:
+            continue
+
+        tags = []
+        for key, value in record.items():
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+
+        feature = b""
+        geoid = record.get("GEOID20")
+        if isinstance(geoid, str) and geoid.isdigit():
+            feature += _key(1, 0) + _varint(int(geoid))
+        feature += (
+            _packed(2, tags) + _key(3, 0) + _varint(POLYGON) + _packed(4, commands)
+        )
+        features.append(_length_delimited(2, feature))
+
+    if not features:
+        return b""
+
+    layer = (
+        _key(15, 0)
+        + _varint(2)
+        + _length_delimited(1, layer_name.encode())
+        + b"".join(features)
+        + b"".join(_length_delimited(3, key.encode()) for key in keys)
+        + b"".join(_length_delimited(4, _encode_value(value)) for _, value in values)
+        + _key(5, 0)
+        + _varint(TILE_EXTENT)
+    )
+    return _length_delimited(3, layer)
+
+
+def get_housing_tile(
+    df: pd.DataFrame,
+    year1: str,
+    year2: str,
+    geometry_store: "GeometryStore",
+    z: int,
+    x: int,
+    y: int,
+    town_index: Optional[TownIndex] = None,
+    geoid_index: Optional[GeoidIndex] = None,
+) -> bytes:
+    """
+    Returns the block group layer of one vector tile of the housing change map.
+
+    The layer does not depend on the city, so one tile serves every city of a
+    year pair; get_city_tile adds the city's layer. Only block groups
+    intersecting the buffered tile are joined and encoded, using the simplified
+    geometries suited to the zoom level. Tiles without any block group are empty.
+
+    Args:
+        df: DataFrame with demographic and housing data
+        year1: First year for comparison
+        year2: Second year for comparison
+        geometry_store: Cached block group geometries
+        z: Zoom level
+        x: Tile column
+        y: Tile row
+        town_index: Town index built from df (optional)
+        geoid_index: GEOID index built from df (optional)
+
+    Returns:
+        Protobuf-encoded Mapbox Vector Tile with a TILE_LAYER layer
+    """
+    # Without a city the z column is empty; it is not written to this layer
+    gdf = join_housing_data(
+        df,
+        year1,
+        year2,
+        None,
+        geometry_store,
+        detail_for_zoom(z),
+        "state",
+        buffered_tile_bounds(z, x, y),
+        town_index,
+        geoid_index,
+    )
+    return encode_vector_tile(gdf, z, x, y)
+
+
+def get_city_tile(
+    df: pd.DataFrame,
+    year1: str,
+    year2: str,
+    city: str,
+    geometry_store: "GeometryStore",
+    z: int,
+    x: int,
+    y: int,
+    town_index: Optional[TownIndex] = None,
+    geoid_index: Optional[GeoidIndex] = None,
+) -> bytes:
+    """
+    Returns the city layer of one vector tile of the housing change map.
+
+    The layer holds only the city's block groups with their z values, and is
+    drawn over the block group layer from get_housing_tile. Encoded tiles are
+    concatenations of layers, so the two bodies joined form one tile.
+
+    Args:
+        df: DataFrame with demographic and housing data
+        year1: First year for comparison
+        year2: Second year for comparison
+        city: City name to analyze
+        geometry_store: Cached block group geometries
+        z: Zoom level
+        x: Tile column
+        y: Tile row
+        town_index: Town index built from df (optional)
+        geoid_index: GEOID index built from df (optional)
+
+    Returns:
+        Protobuf-encoded Mapbox Vector Tile with a CITY_TILE_LAYER layer, empty
+        if none of the city's block groups fall within the tile
+    """
+    gdf = join_housing_data(
+        df,
+        year1,
+        year2,
+        city,
+        geometry_store,
+        detail_for_zoom(z),
+        "city",
+        buffered_tile_bounds(z, x, y),
+        town_index,
+        geoid_index,
+    )
+    return encode_vector_tile(gdf, z, x, y, CITY_TILE_PROPERTIES, CITY_TILE_LAYER)
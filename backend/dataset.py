@@ -0,0 +1,239 @@
+"""
+Loading the NHGIS dataset from a typed columnar file, with a CSV fallback.
+
+The CSV stores hundreds of wide count columns as text, which is slow to parse on
+every worker boot. Converting it once to an uncompressed Feather (Arrow IPC) file
+with compact dtypes lets workers memory-map it instead. Numeric columns are
+read as zero-copy views of the mapped file, so every worker process mapping the
+same file shares one copy of those pages through the OS page cache.
+
+Usage (from the backend directory):
+    python dataset.py [--csv data/nhgis.csv] [--output data/nhgis.feather]
+                      [--geometry-output data/block_groups.feather]
+"""
+
+import argparse
+import glob
+import hashlib
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from config import (
+    CSV_FILE_STR,
+    DATASET_FILE_STR,
+    GEOMETRY_FILE_STR,
+    SHAPEFILE_DIR_STR,
+    SHAPEFILE_PATTERN,
+)
+from data_processing import GeometryStore, get_county_fips_codes
+
+logger = logging.getLogger(__name__)
+
+# Columns stored as categoricals rather than repeated strings
+CATEGORICAL_COLUMNS = ["TOWN"]
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast columns to compact dtypes.
+
+    Integer-valued numeric columns without missing values become int32 and
+    town names become categoricals. Columns with missing values keep float64.
+
+    Args:
+        df: DataFrame as read from the CSV
+
+    Returns:
+        DataFrame with compact dtypes
+    """
+    int32 = np.iinfo(np.int32)
+    converted = {}
+    for col in df.columns:
+        values = df[col]
+        if col in CATEGORICAL_COLUMNS:
+            converted[col] = values.astype("category")
+        elif pd.api.types.is_numeric_dtype(values) and not values.isna().any():
+            # Counts are whole numbers; only downcast when nothing would be lost
+            if (
+                (values % 1 == 0).all()
+                and values.min() >= int32.min
+                and values.max() <= int32.max
+            ):
+                converted[col] = values.astype(np.int32)
+    return df.assign(**converted)
+
+
+def to_arrow_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Convert a DataFrame to an Arrow table that can be read back without copies.
+
+    Float NaNs are stored as values rather than Arrow nulls, since columns with
+    nulls have to be copied when converted back to pandas.
+
+    Args:
+        df: DataFrame to convert
+
+    Returns:
+        Arrow table with one column per DataFrame column
+    """
+    arrays = {}
+    for col in df.columns:
+        values = df[col]
+        if pd.api.types.is_float_dtype(values):
+            arrays[col] = pa.array(values.to_numpy(), from_pandas=False)
+        else:
+            arrays[col] = pa.array(values)
+    return pa.table(arrays)
+
+
+def write_feather_atomic(table: pa.Table, path: str) -> None:
+    """
+    Write an uncompressed Feather file, replacing any existing file atomically.
+
+    Workers that already mapped the old file keep reading it, and concurrent
+    writers never leave a partially written file behind.
+
+    Args:
+        table: Arrow table to write
+        path: Destination path
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    # Uncompressed so readers can memory-map the file instead of decoding it
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+
+
+def convert_csv(csv_path: str, dataset_path: str) -> None:
+    """
+    Convert the CSV dataset to an uncompressed Feather file with compact dtypes.
+
+    Args:
+        csv_path: Path to the source CSV
+        dataset_path: Path of the Feather file to write
+    """
+    df = optimize_dtypes(pd.read_csv(csv_path))
+    write_feather_atomic(to_arrow_table(df), dataset_path)
+
+
+def is_stale(dataset_path: str, csv_path: str) -> bool:
+    """
+    Returns whether the Feather file is missing or older than the CSV it was built from.
+
+    Args:
+        dataset_path: Path to the Feather file
+        csv_path: Path to the source CSV
+
+    Returns:
+        True if the Feather file should not be used
+    """
+    if not os.path.exists(dataset_path):
+        return True
+    if not os.path.exists(csv_path):
+        return False
+    return os.path.getmtime(dataset_path) < os.path.getmtime(csv_path)
+
+
+def dataset_version(csv_path: str, dataset_path: str, shapefile_dir: str) -> str:
+    """
+    Returns an identifier of the current source files.
+
+    The identifier is derived from the size and modification time of the CSV
+    (or the Feather file when there is no CSV) and of every shapefile, so every
+    process reading the same files agrees on it without coordinating.
+
+    Args:
+        csv_path: Path to the source CSV
+        dataset_path: Path to the Feather file
+        shapefile_dir: Directory containing shapefiles
+
+    Returns:
+        12-character hex digest
+    """
+    paths = [csv_path if os.path.exists(csv_path) else dataset_path]
+    paths += sorted(glob.glob(os.path.join(shapefile_dir, "*.shp")))
+    digest = hashlib.sha256()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:12]
+
+
+def load_dataset(
+    csv_path: str, dataset_path: str, convert_if_stale: bool = False
+) -> pd.DataFrame:
+    """
+    Load the dataset from the Feather file, falling back to the CSV.
+
+    The CSV is only parsed when the Feather file is missing or stale. Numeric
+    columns of the returned frame are read-only views of the mapped file.
+
+    Args:
+        csv_path: Path to the source CSV
+        dataset_path: Path to the Feather file
+        convert_if_stale: Write a fresh Feather file from the CSV and map it,
+            rather than keeping a private copy of the CSV data in this process
+
+    Returns:
+        DataFrame containing the demographic and housing data
+    """
+    if is_stale(dataset_path, csv_path):
+        if not convert_if_stale:
+            logger.warning(
+                f"{dataset_path} is missing or older than {csv_path}; reading the CSV. "
+                "Run `python dataset.py` to convert it."
+            )
+            return optimize_dtypes(pd.read_csv(csv_path))
+        logger.info(f"Converting {csv_path} to {dataset_path}")
+        convert_csv(csv_path, dataset_path)
+
+    table = feather.read_table(dataset_path, memory_map=True)
+    # split_blocks keeps one block per column so numeric columns stay zero-copy
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def export_geometries(
+    geometry_store: GeometryStore, fips_codes: list[str], geometry_path: str
+) -> None:
+    """
+    Write the preprocessed block group geometries to a Feather file.
+
+    Geometries are stored as WKB alongside the shapefile attributes and GEOID,
+    so GeometryStore can map the file instead of parsing every shapefile.
+
+    Args:
+        geometry_store: Store to read the shapefile geometries from
+        fips_codes: 5-digit FIPS codes (state + county) to include
+        geometry_path: Destination path
+    """
+    gdf = geometry_store.get(fips_codes)
+    table = pa.table(gdf.to_arrow(geometry_encoding="WKB"))
+    write_feather_atomic(table, geometry_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert the NHGIS CSV and shapefiles to Feather files for fast loading."
+    )
+    parser.add_argument("--csv", default=CSV_FILE_STR, help="Source CSV path")
+    parser.add_argument("--output", default=DATASET_FILE_STR, help="Feather path")
+    parser.add_argument(
+        "--geometry-output",
+        default=GEOMETRY_FILE_STR,
+        help="Feather path for the preprocessed block group geometries",
+    )
+    args = parser.parse_args()
+
+    convert_csv(args.csv, args.output)
+    print(f"Wrote {args.output}")
+
+    geometry_store = GeometryStore(SHAPEFILE_DIR_STR, SHAPEFILE_PATTERN)
+    fips_codes = get_county_fips_codes(load_dataset(args.csv, args.output))
+    export_geometries(geometry_store, fips_codes, args.geometry_output)
+    print(f"Wrote {args.geometry_output}")
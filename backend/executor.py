@@ -0,0 +1,127 @@
+"""Bounded worker pool that coalesces identical concurrent computations."""
+
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+
+
+class ExecutorBusyError(TimeoutError):
+    """Raised instead of waiting when too many callers already wait on the pool."""
+
+    pass
+
+
+class CoalescingExecutor:
+    """
+    Runs heavy computations on a fixed number of threads, one per distinct key.
+
+    Concurrent submissions with the same key share a single in-flight future
+    instead of each redoing the work, and at most max_workers computations
+    run at once. Callers of run block until the result is ready, so at most
+    max_waiting of them may wait at a time and the rest are turned away with
+    ExecutorBusyError; heavy requests then cannot occupy every
+    request-handling thread as long as max_waiting is below the number of
+    those threads. Once a computation finishes its key is released, so later
+    submissions run again (callers cache results themselves).
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        thread_name_prefix: str = "compute",
+        max_waiting: Optional[int] = None,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers: Maximum number of computations running at once
+            thread_name_prefix: Name prefix of the worker threads
+            max_waiting: Maximum number of callers blocked in run at once
+                (unlimited if not given)
+        """
+        self.max_workers = max_workers
+        self.max_waiting = max_waiting
+        self._pool = ThreadPoolExecutor(
+            max_workers, thread_name_prefix=thread_name_prefix
+        )
+        self._in_flight: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        """Number of distinct computations queued or running."""
+        return len(self._in_flight)
+
+    def submit(self, key: Hashable, fn: Callable[[], Any]) -> Future:
+        """
+        Schedule a computation, or join the in-flight one with the same key.
+
+        Args:
+            key: Identifies computations whose results are interchangeable
+            fn: Function to run on a worker thread
+
+        Returns:
+            Future of the computation's result
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            # Run in a copy of the caller's context so per-request state
+            # (such as stage timings) follows the computation to the worker
+            future = self._pool.submit(contextvars.copy_context().run, fn)
+            self._in_flight[key] = future
+
+        future.add_done_callback(lambda _: self._release(key, future))
+        return future
+
+    def run(
+        self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Run a computation on the pool and wait for its result.
+
+        Args:
+            key: Identifies computations whose results are interchangeable
+            fn: Function to run on a worker thread
+            timeout: Seconds to wait before giving up (None waits indefinitely)
+
+        Returns:
+            The computation's result
+
+        Raises:
+            ExecutorBusyError: If max_waiting callers are already waiting; the
+                computation is not started
+            TimeoutError: If the result is not ready within the timeout; the
+                computation keeps running and later callers can still join it
+        """
+        with self._lock:
+            if self.max_waiting is not None and self.waiting >= self.max_waiting:
+                self.rejected += 1
+                raise ExecutorBusyError(
+                    f"{self.waiting} requests are already waiting for computations"
+                )
+            self.waiting += 1
+
+        try:
+            return self.submit(key, fn).result(timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def shutdown(self) -> None:
+        """
+        Stop accepting work and wait for running computations to finish.
+        """
+        self._pool.shutdown(wait=True)
+
+    def _release(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            # Only drop the entry if it still refers to this computation
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
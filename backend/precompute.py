@@ -0,0 +1,199 @@
+"""
+Offline batch job that precomputes every /api/population and /api/housing result.
+
+The inputs are static, so each (year1, year2, city) combination is computed once
+across a pool of worker processes and written to a content-addressed
+ArtifactStore. The app serves stored results and computes anything missing live.
+
+Usage (from the backend directory):
+    python precompute.py [--output data/artifacts] [--workers 8] [--cities Boston Cambridge]
+"""
+
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+from typing import Any, Optional
+
+from artifacts import (
+    HOUSING_ATTRIBUTES,
+    POPULATION,
+    SENTENCES,
+    ArtifactStore,
+    artifact_key,
+)
+from config import (
+    ARTIFACT_DIR_STR,
+    CSV_FILE_STR,
+    DATASET_FILE_STR,
+    GEOMETRY_FILE_STR,
+    SHAPEFILE_DIR_STR,
+    SHAPEFILE_PATTERN,
+)
+from data_processing import (
+    AggregateCube,
+    GeoidIndex,
+    GeometryStore,
+    TownIndex,
+    create_housing_demographic_sentences,
+    dumps,
+    get_city_housing_data,
+    get_housing_attributes,
+    get_population_data,
+)
+from dataset import dataset_version, load_dataset
+from validation import RequestValidator, ValidationError, get_available_years
+
+logger = logging.getLogger(__name__)
+
+# Dataset and lookups loaded once per worker process by init_worker
+_worker_state: dict[str, Any] = {}
+
+
+def init_worker() -> None:
+    """
+    Load the dataset and block group geometries into a worker process.
+    """
+    df = load_dataset(CSV_FILE_STR, DATASET_FILE_STR)
+    _worker_state["df"] = df
+    _worker_state["town_index"] = TownIndex(df)
+    _worker_state["geoid_index"] = GeoidIndex(df)
+    _worker_state["cube"] = AggregateCube(df, get_available_years(df.columns))
+    _worker_state["geometry_store"] = GeometryStore(
+        SHAPEFILE_DIR_STR, SHAPEFILE_PATTERN, GEOMETRY_FILE_STR
+    )
+
+
+def compute_city(
+    city: str, year_pairs: list[tuple[str, str]]
+) -> list[tuple[str, bytes]]:
+    """
+    Compute every artifact of one city in a worker process.
+
+    Combinations that fail are logged and left out, so the app computes them live.
+
+    Args:
+        city: City name
+        year_pairs: (year1, year2) pairs to compute
+
+    Returns:
+        List of (artifact key, serialized body) pairs
+    """
+    df = _worker_state["df"]
+    town_index = _worker_state["town_index"]
+    geoid_index = _worker_state["geoid_index"]
+    cube = _worker_state["cube"]
+    geometry_store = _worker_state["geometry_store"]
+
+    artifacts = []
+    for year1, year2 in year_pairs:
+        try:
+            population = get_population_data(df, year1, year2, city, cube, town_index)
+            attributes = get_housing_attributes(
+                df,
+                year1,
+                year2,
+                city,
+                geometry_store,
+                town_index=town_index,
+                geoid_index=geoid_index,
+            )
+        except Exception as e:
+            logger.warning(f"Skipping {city} {year1}-{year2}: {e}")
+            continue
+
+        artifacts.append(
+            (artifact_key(POPULATION, year1, year2, city), dumps(population))
+        )
+        artifacts.append(
+            (artifact_key(HOUSING_ATTRIBUTES, year1, year2, city), dumps(attributes))
+        )
+
+        # Sentences depend on the population change the client sends back; the
+        # app only serves them when that change matches this population response
+        total_city_change = population["total_city_change"]
+        if total_city_change["change"] and total_city_change["percent"] is not None:
+            city_change_dict = {
+                "change": int(total_city_change["change"]),
+                "percent": float(total_city_change["percent"]),
+            }
+            city_housing_data = get_city_housing_data(
+                df, year1, year2, city, cube, town_index
+            )
+            sentences = create_housing_demographic_sentences(
+                city, city_housing_data, city_change_dict
+            )
+            key = artifact_key(SENTENCES, year1, year2, city)
+            artifacts.append((key, dumps(sentences)))
+
+    return artifacts
+
+
+def precompute(
+    output_dir: str, workers: Optional[int] = None, cities: Optional[list[str]] = None
+) -> ArtifactStore:
+    """
+    Compute every valid (year1, year2, city) combination into an artifact store.
+
+    Args:
+        output_dir: Root directory of the artifact store
+        workers: Number of worker processes (default: number of CPUs)
+        cities: Cities to compute (default: every city in the dataset)
+
+    Returns:
+        The written store
+    """
+    # Taken before loading, so files changed during the run leave the store stale
+    version = dataset_version(CSV_FILE_STR, DATASET_FILE_STR, SHAPEFILE_DIR_STR)
+    df = load_dataset(CSV_FILE_STR, DATASET_FILE_STR)
+    valid_years = get_available_years(df.columns)
+    validator = RequestValidator(df, valid_years)
+    cities = validator.valid_cities if cities is None else cities
+
+    tasks = {}
+    for city in cities:
+        year_pairs = []
+        for year1, year2 in combinations(valid_years, 2):
+            try:
+                validator.validate_request(year1, year2, city)
+                year_pairs.append((year1, year2))
+            except ValidationError as e:
+                logger.warning(f"Skipping {city} {year1}-{year2}: {e}")
+        if year_pairs:
+            tasks[city] = year_pairs
+
+    store = ArtifactStore(output_dir, version=version)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        futures = [
+            executor.submit(compute_city, city, year_pairs)
+            for city, year_pairs in tasks.items()
+        ]
+        # Only this process writes to the store, so no locking is needed
+        for future in as_completed(futures):
+            for key, body in future.result():
+                store.put(key, body)
+
+    store.save()
+    return store
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Precompute every population and housing response into an artifact store."
+    )
+    parser.add_argument(
+        "--output", default=ARTIFACT_DIR_STR, help="Artifact store directory"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes",
+    )
+    parser.add_argument("--cities", nargs="+", help="Cities to compute (default: all)")
+    args = parser.parse_args()
+
+    store = precompute(args.output, args.workers, args.cities)
+    print(f"Wrote {len(store)} artifacts to {args.output}")
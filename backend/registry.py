@@ -0,0 +1,256 @@
+"""
+Versioned snapshots of the dataset and everything derived from it.
+
+A snapshot holds one loaded version of the NHGIS table together with its
+indexes, validator, aggregates and block group geometries. The registry builds
+a new snapshot in the background when the source files change and then swaps
+it in with a single reference assignment. Requests pick up the current
+snapshot once and use it throughout, so a request in flight during a reload
+finishes on the version it started with.
+"""
+
+import logging
+import threading
+import time
+import weakref
+from typing import Callable, Optional
+
+from artifacts import open_artifact_store
+from cache import CacheEntry
+from config import (
+    ARTIFACT_DIR_STR,
+    CSV_FILE_STR,
+    DATASET_FILE_STR,
+    GEOMETRY_FILE_STR,
+    MERGE_POOL,
+    MERGE_WORKERS,
+    SHARED_DATASET,
+    SHAPEFILE_DIR_STR,
+    SHAPEFILE_PATTERN,
+)
+from county_pool import CountyProcessPool
+from data_processing import (
+    AggregateCube,
+    GeoidIndex,
+    GeometryStore,
+    TownIndex,
+    get_county_fips_codes,
+)
+from dataset import dataset_version, export_geometries, load_dataset
+from validation import RequestValidator, get_available_years
+
+logger = logging.getLogger(__name__)
+
+
+def current_version() -> str:
+    """
+    Returns the version of the configured source files (see dataset_version).
+    """
+    return dataset_version(CSV_FILE_STR, DATASET_FILE_STR, SHAPEFILE_DIR_STR)
+
+
+class DatasetSnapshot:
+    """
+    One loaded version of the dataset and the lookups and caches built from it.
+
+    Everything here is read-only once built, except the per-detail geometry
+    payloads, which are filled on first request.
+    """
+
+    def __init__(self, version: str):
+        """
+        Load the dataset and block group geometries and build their indexes.
+
+        Args:
+            version: Version of the source files being loaded (see dataset_version)
+        """
+        self.version = version
+
+        # Reads the memory-mapped Feather copy when it is up to date, otherwise the CSV
+        self.df = load_dataset(
+            CSV_FILE_STR, DATASET_FILE_STR, convert_if_stale=SHARED_DATASET
+        )
+
+        # Row positions of each town, shared by validation and the data_processing functions
+        self.town_index = TownIndex(self.df)
+
+        # Integer GEOID keys of the rows, for joining the data onto block group geometries
+        self.geoid_index = GeoidIndex(self.df)
+
+        # Validator with the years found in the column suffixes
+        self.valid_years = get_available_years(self.df.columns)
+        self.validator = RequestValidator(self.df, self.valid_years, self.town_index)
+
+        # Per-town sums of every count column, built on first request
+        self.aggregate_cube = AggregateCube(self.df, self.valid_years)
+
+        # Block group shapes read once, with simplified geometries for every detail level
+        self.fips_codes = get_county_fips_codes(self.df)
+        self.geometry_store = GeometryStore(
+            SHAPEFILE_DIR_STR, SHAPEFILE_PATTERN, GEOMETRY_FILE_STR
+        )
+        if SHARED_DATASET and not self.geometry_store.has_fresh_geometry_file():
+            export_geometries(self.geometry_store, self.fips_codes, GEOMETRY_FILE_STR)
+            self.geometry_store.invalidate()
+        self.geometry_store.preload(self.fips_codes)
+        # Extent of all block groups; tiles outside it are empty
+        self.data_bounds = tuple(self.geometry_store.get(self.fips_codes).total_bounds)
+
+        # Responses precomputed by `python precompute.py`, if present and from this version
+        self.artifact_store = open_artifact_store(ARTIFACT_DIR_STR, version)
+
+        # Serialized block group shapes for /api/geometry by detail level
+        self.geometry_entries: dict[str, CacheEntry] = {}
+
+        # Worker processes load the files themselves, so each version needs its own pool
+        self.county_pool: Optional[CountyProcessPool] = None
+        if MERGE_WORKERS > 1 and MERGE_POOL == "process":
+            self.county_pool = CountyProcessPool(
+                self.df,
+                self.geometry_store,
+                MERGE_WORKERS,
+                version,
+                CSV_FILE_STR,
+                DATASET_FILE_STR,
+                self.town_index,
+                self.geoid_index,
+            )
+            # Stop the workers once the last request using this version lets go of it,
+            # without making that request wait for the processes to exit
+            weakref.finalize(self, self.county_pool.shutdown, False)
+
+
+class DatasetRegistry:
+    """
+    Holds the active DatasetSnapshot and replaces it when the source files change.
+
+    A new version is built completely, and prepared if a prepare function is
+    given, before it becomes visible; until then requests keep being served
+    from the previous one. The previous snapshot is freed once the last
+    request holding it finishes, so memory briefly holds both versions.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], DatasetSnapshot] = DatasetSnapshot,
+        version_fn: Callable[[], str] = current_version,
+        prepare: Optional[Callable[[DatasetSnapshot], None]] = None,
+        on_swap: Optional[Callable[[DatasetSnapshot, DatasetSnapshot], None]] = None,
+    ):
+        """
+        Load the current version of the dataset.
+
+        Args:
+            loader: Builds a snapshot of a version
+            version_fn: Returns the version of the source files
+            prepare: Called on each new snapshot before it is swapped in, e.g.
+                to warm caches (optional)
+            on_swap: Called with the replaced and the new snapshot once a reload
+                has swapped in a new one, e.g. to remove cached data of the
+                replaced version (optional)
+        """
+        self.loader = loader
+        self.version_fn = version_fn
+        self.prepare = prepare
+        self.on_swap = on_swap
+        self.reloads = 0
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._current = self._build(version_fn())
+
+    @property
+    def current(self) -> DatasetSnapshot:
+        """
+        The active snapshot. Read it once per request and keep the reference.
+        """
+        return self._current
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Load the source files again if they changed, then swap in the new version.
+
+        Concurrent calls are serialized, so a version is only built once.
+
+        Args:
+            force: Reload even if the version is unchanged
+
+        Returns:
+            Whether a new snapshot was swapped in
+        """
+        with self._reload_lock:
+            version = self.version_fn()
+            if not force and version == self._current.version:
+                return False
+
+            logger.info(f"Loading dataset version {version}")
+            snapshot = self._build(version)
+            previous, self._current = self._current, snapshot
+            self.reloads += 1
+            logger.info(f"Switched dataset version {previous.version} -> {version}")
+            self._swapped(previous, snapshot)
+            return True
+
+    def reload_in_background(self, force: bool = False) -> threading.Thread:
+        """
+        Start a reload on a daemon thread and return immediately.
+
+        Errors are logged; the current version stays active.
+
+        Args:
+            force: Reload even if the version is unchanged
+
+        Returns:
+            The thread running the reload
+        """
+        thread = threading.Thread(
+            target=self._reload_logged,
+            args=(force,),
+            name="dataset-reload",
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    def watch(self, interval: float) -> None:
+        """
+        Check the source files for changes every interval seconds and reload them.
+
+        Args:
+            interval: Seconds between checks
+        """
+        if self._watcher is not None:
+            return
+
+        def poll() -> None:
+            while True:
+                time.sleep(interval)
+                self._reload_logged(False)
+
+        self._watcher = threading.Thread(
+            target=poll, name="dataset-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _build(self, version: str) -> DatasetSnapshot:
+        snapshot = self.loader(version)
+        if self.prepare is not None:
+            self.prepare(snapshot)
+        return snapshot
+
+    def _swapped(self, previous: DatasetSnapshot, snapshot: DatasetSnapshot) -> None:
+        if self.on_swap is None:
+            return
+        try:
+            self.on_swap(previous, snapshot)
+        except Exception as e:
+            logger.error(
+                f"Cleanup after switching to version {snapshot.version} failed: {e}"
+            )
+
+    def _reload_logged(self, force: bool) -> None:
+        try:
+            self.reload(force)
+        except Exception as e:
+            logger.error(
+                f"Dataset reload failed, keeping version {self._current.version}: {e}"
+            )
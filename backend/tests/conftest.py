@@ -0,0 +1,69 @@
+"""
+Shared fixtures: a small synthetic dataset and the app serving it.
+
+The configuration is read from environment variables when config is first
+imported, so the data paths are pointed at a temporary directory before any
+app module is imported. The dataset covers the block groups of the two
+smallest counties, which keeps loading the app fast.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Counties whose block groups the test dataset covers
+TEST_COUNTIES = ["25007", "25019"]
+SOURCE_SHAPEFILE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "geojsons")
+
+DATA_DIR = tempfile.mkdtemp(prefix="missing-middle-tests-")
+os.environ["DATA_DIR"] = DATA_DIR
+os.environ["SHAPEFILE_DIR"] = os.path.join(DATA_DIR, "geojsons")
+os.environ["CSV_FILE"] = os.path.join(DATA_DIR, "nhgis.csv")
+
+
+def write_test_dataset() -> None:
+    """
+    Copy the test counties' shapefiles and write a synthetic CSV for them.
+    """
+    from benchmarks.synthetic import write_synthetic_csv
+
+    shapefile_dir = os.environ["SHAPEFILE_DIR"]
+    os.makedirs(shapefile_dir, exist_ok=True)
+    for fips in TEST_COUNTIES:
+        for extension in ["shp", "shx", "dbf"]:
+            name = f"tl_2020_{fips}_bg20.{extension}"
+            shutil.copy(os.path.join(SOURCE_SHAPEFILE_DIR, name), shapefile_dir)
+    write_synthetic_csv(os.environ["CSV_FILE"], shapefile_dir)
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    """
+    The app module, loaded with the synthetic dataset.
+    """
+    write_test_dataset()
+    import app
+
+    yield app
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def client(app_module):
+    """
+    Flask test client of the app.
+    """
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def snapshot(app_module):
+    """
+    The dataset snapshot the app is serving.
+    """
+    return app_module.registry.current
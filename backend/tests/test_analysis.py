@@ -0,0 +1,64 @@
+"""Tests of the population change calculations."""
+
+import pandas as pd
+import pytest
+from benchmarks.synthetic import YEARS, make_synthetic_nhgis
+from data_processing import get_population_data, get_time_series
+
+CITY = "Town 001-0"
+
+
+@pytest.fixture
+def empty_first_year_df():
+    """
+    Synthetic block groups of one town with no population in the first year.
+    """
+    codes = pd.DataFrame(
+        {"STATEA": 25, "COUNTYA": 1, "TRACTA": range(1, 4), "BLCK_GRPA": 1}
+    )
+    df = make_synthetic_nhgis(codes)
+    first_year = [
+        col
+        for col in df.columns
+        if col.endswith(f"_{YEARS[0]}") and not col.startswith("housing_units")
+    ]
+    df[first_year] = 0
+    return df
+
+
+def test_time_series_has_no_percent_from_an_empty_year(empty_first_year_df):
+    series = get_time_series(empty_first_year_df, YEARS, CITY)
+
+    from_empty = series["changes"][f"{YEARS[0]}-{YEARS[1]}"]["total_city_change"]
+    assert from_empty["change"] > 0
+    assert from_empty["percent"] is None
+
+    later = series["changes"][f"{YEARS[1]}-{YEARS[2]}"]["total_city_change"]
+    assert later["percent"] is not None
+
+
+def test_population_change_from_an_empty_year(empty_first_year_df):
+    data = get_population_data(empty_first_year_df, YEARS[0], YEARS[1], CITY)
+
+    assert data["total_city_change"]["percent"] is None
+
+
+def test_city_report_skips_insights_without_a_percent(
+    app_module, client, snapshot, monkeypatch
+):
+    def empty_baseline(*args, **kwargs):
+        return {"change": 10, "percent": None, "color": "#30664B"}
+
+    monkeypatch.setattr(
+        "data_processing.analysis.get_total_city_change", empty_baseline
+    )
+    year1, year2 = snapshot.valid_years[:2]
+    city = snapshot.validator.valid_cities[0]
+    response = client.post(
+        "/api/city-report", json={"year1": year1, "year2": year2, "city": city}
+    )
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["population"]["total_city_change"]["percent"] is None
+    assert body["housing"]["sentences"] == []
@@ -0,0 +1,94 @@
+"""Tests of opening precomputed artifact stores."""
+
+import json
+import os
+
+from artifacts import (
+    MANIFEST_FILE,
+    POPULATION,
+    SENTENCES,
+    ArtifactStore,
+    artifact_key,
+    open_artifact_store,
+)
+from data_processing import dumps
+
+KEY = artifact_key(POPULATION, "2010", "2020", "Boston")
+
+
+def write_store(directory, version):
+    store = ArtifactStore(str(directory), version=version)
+    store.put(KEY, b'{"total": 1}')
+    store.save()
+
+
+def test_store_from_the_served_version_opens(tmp_path):
+    write_store(tmp_path, "abc123")
+
+    store = open_artifact_store(str(tmp_path), "abc123")
+
+    assert store is not None
+    assert store.version == "abc123"
+    assert store.get(KEY).body == b'{"total": 1}'
+
+
+def test_store_from_another_version_is_stale(tmp_path):
+    write_store(tmp_path, "abc123")
+
+    assert open_artifact_store(str(tmp_path), "def456") is None
+
+
+def test_manifest_without_a_version_is_stale(tmp_path):
+    write_store(tmp_path, "abc123")
+    # Manifests written before versions were recorded only map keys to hashes
+    store = ArtifactStore.load(str(tmp_path))
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w") as f:
+        json.dump(store.manifest, f)
+
+    assert ArtifactStore.load(str(tmp_path)).version is None
+    assert open_artifact_store(str(tmp_path), "abc123") is None
+
+
+def test_missing_store(tmp_path):
+    assert open_artifact_store(str(tmp_path / "missing"), "abc123") is None
+
+
+def test_missing_object_is_computed_live(tmp_path):
+    write_store(tmp_path, "abc123")
+    store = ArtifactStore.load(str(tmp_path))
+    os.remove(store.object_path(store.manifest[KEY]))
+
+    assert store.get(KEY) is None
+
+
+def test_corrupt_object_is_computed_live(tmp_path):
+    write_store(tmp_path, "abc123")
+    store = ArtifactStore.load(str(tmp_path))
+    with open(store.object_path(store.manifest[KEY]), "wb") as f:
+        f.write(b"not gzip")
+
+    assert store.get(KEY) is None
+
+
+def test_sentences_are_served_only_for_the_stored_population_change(
+    app_module, snapshot, tmp_path, monkeypatch
+):
+    year1, year2 = snapshot.valid_years[:2]
+    city = snapshot.validator.valid_cities[0]
+    store = ArtifactStore(str(tmp_path), version=snapshot.version)
+    store.put(
+        artifact_key(POPULATION, year1, year2, city),
+        dumps({"total_city_change": {"change": 10, "percent": 5.0}}),
+    )
+    store.put(artifact_key(SENTENCES, year1, year2, city), b'["stored"]')
+    monkeypatch.setattr(snapshot, "artifact_store", store)
+
+    stored = app_module.get_sentences_body(
+        snapshot, year1, year2, city, {"change": 10, "percent": 5.0}
+    )
+    live = app_module.get_sentences_body(
+        snapshot, year1, year2, city, {"change": 10, "percent": 5.5}
+    )
+
+    assert stored == b'["stored"]'
+    assert live != b'["stored"]'
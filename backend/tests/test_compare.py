@@ -0,0 +1,40 @@
+"""Tests of the /api/compare endpoint."""
+
+from data_processing import get_population_data, parse_age_bins
+
+
+def test_compare_matches_population_for_custom_age_bins(client, snapshot):
+    year1, year2 = snapshot.valid_years[:2]
+    cities = snapshot.validator.valid_cities[:3]
+    response = client.post(
+        "/api/compare",
+        json={
+            "year1": year1,
+            "year2": year2,
+            "cities": cities,
+            "age_bins": [0, 18, 65],
+        },
+    )
+
+    assert response.status_code == 200
+    compared = response.get_json()["age_group_changes"]
+    assert list(compared) == ["00 - 17", "18 - 64", "65+"]
+    for pos, city in enumerate(cities):
+        population = get_population_data(
+            snapshot.df, year1, year2, city, age_bins=parse_age_bins([0, 18, 65])
+        )
+        for label, changes in population["age_group_data"]["changes"].items():
+            assert (
+                compared[label]["total_change_absolute"][pos]
+                == changes["total_change_absolute"]
+            )
+
+
+def test_compare_rejects_invalid_age_bins(client, snapshot):
+    year1, year2 = snapshot.valid_years[:2]
+    response = client.post(
+        "/api/compare",
+        json={"year1": year1, "year2": year2, "cities": "all", "age_bins": [0, 7]},
+    )
+
+    assert response.status_code == 400
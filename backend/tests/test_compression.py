@@ -0,0 +1,19 @@
+"""Tests of response compression."""
+
+import gzip
+
+
+def test_etagged_responses_are_compressed_off_the_housing_executor(
+    app_module, client, monkeypatch
+):
+    def fail(*args, **kwargs):
+        raise AssertionError("compression must not run on the housing executor")
+
+    # The geometry payload is built inline, so only compression could use an executor
+    monkeypatch.setattr(app_module.housing_executor, "run", fail)
+    response = client.get("/api/geometry", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"].endswith('-gzip"')
+    assert gzip.decompress(response.data).startswith(b'{"type":"FeatureCollection"')
@@ -0,0 +1,50 @@
+"""Tests of the coalescing executor."""
+
+import threading
+
+import pytest
+from executor import CoalescingExecutor, ExecutorBusyError
+
+
+def test_identical_keys_share_one_computation():
+    executor = CoalescingExecutor(1)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait()
+        return "result"
+
+    first = executor.submit("key", compute)
+    second = executor.submit("key", compute)
+    release.set()
+
+    assert first is second
+    assert first.result() == "result"
+    assert len(calls) == 1
+    assert executor.coalesced == 1
+
+
+def test_callers_beyond_max_waiting_are_rejected():
+    executor = CoalescingExecutor(1, max_waiting=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        started.set()
+        release.wait()
+        return "slow"
+
+    waiter = threading.Thread(target=executor.run, args=("slow", compute))
+    waiter.start()
+    started.wait()
+
+    with pytest.raises(ExecutorBusyError):
+        executor.run("other", lambda: "fast")
+    assert executor.rejected == 1
+
+    release.set()
+    waiter.join()
+    assert executor.waiting == 0
+    assert executor.run("other", lambda: "fast") == "fast"
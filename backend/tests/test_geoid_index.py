@@ -0,0 +1,74 @@
+"""Tests that joining by GEOID positions matches a left merge on GEOID strings."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from data_processing import GeoidIndex, get_county_fips_codes
+from data_processing.geospatial import join_rows
+
+
+def reference_join(gdf, df) -> pd.DataFrame:
+    """
+    The original join: a left merge of the geometries with GEOID strings built from the codes.
+    """
+    df = df.copy()
+    df["GEOID"] = (
+        df["STATEA"].astype(str).str.zfill(2)
+        + df["COUNTYA"].astype(str).str.zfill(3)
+        + df["TRACTA"].astype(str).str.zfill(6)
+        + df["BLCK_GRPA"].astype(str)
+    )
+    return gdf.merge(df, left_on="GEOID20", right_on="GEOID", how="left")
+
+
+def join(df, geometry_store, positions=None, fill_missing=False) -> pd.DataFrame:
+    fips_codes = get_county_fips_codes(df)
+    gdf = geometry_store.get(fips_codes)
+    if positions is not None:
+        gdf = gdf.iloc[positions]
+    data, matched = GeoidIndex(df).take(
+        df, geometry_store, fips_codes, positions, fill_missing
+    )
+    return join_rows(gdf, data, matched)
+
+
+@pytest.mark.parametrize("dropped_rows", [[], [1, 5, 20]])
+def test_join_matches_merge(snapshot, dropped_rows):
+    # Dropped rows leave block groups unmatched, which turns integer columns into floats
+    df = snapshot.df.drop(snapshot.df.index[dropped_rows])
+    gdf = snapshot.geometry_store.get(get_county_fips_codes(df))
+
+    result = join(df, snapshot.geometry_store)
+
+    expected = reference_join(gdf, df)
+    pd.testing.assert_frame_equal(result, expected)
+    assert isinstance(result.index, pd.RangeIndex)
+    # Columns on both sides get the merge's suffixes
+    assert {"GEOID_x", "GEOID_y"} <= set(result.columns)
+
+
+def test_join_of_selected_block_groups_matches_merge(snapshot):
+    df = snapshot.df
+    gdf = snapshot.geometry_store.get(snapshot.fips_codes)
+    positions = np.array([0, 3, 4, 10])
+
+    result = join(df, snapshot.geometry_store, positions)
+
+    expected = reference_join(gdf.iloc[positions], df)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_fill_missing_gives_the_dtypes_of_an_unmatched_join(snapshot):
+    # Every selected block group has a row, but the whole selection has unmatched ones
+    df = snapshot.df.drop(snapshot.df.index[[20]])
+    positions = np.array([0, 3, 4])
+
+    result = join(df, snapshot.geometry_store, positions, fill_missing=True)
+
+    unmatched = join(df, snapshot.geometry_store)
+    assert (result.dtypes == unmatched.dtypes).all()
+    int_columns = df.select_dtypes("integer").columns
+    assert len(int_columns) and (result[int_columns].dtypes == np.float64).all()
+    pd.testing.assert_frame_equal(
+        result, unmatched.iloc[positions].reset_index(drop=True), check_dtype=False
+    )
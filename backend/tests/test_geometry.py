@@ -0,0 +1,20 @@
+"""Tests of the /api/geometry endpoint."""
+
+
+def test_versioned_geometry_is_immutable(client, snapshot):
+    response = client.get(f"/api/geometry?v={snapshot.version}")
+
+    assert response.status_code == 200
+    assert response.headers["X-Dataset-Version"] == snapshot.version
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+
+
+def test_unversioned_or_outdated_geometry_is_revalidated(app_module, client):
+    for url in ["/api/geometry", "/api/geometry?v=outdated"]:
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert not response.cache_control.immutable
+        assert response.cache_control.max_age == app_module.GEOMETRY_UNVERSIONED_MAX_AGE
+        assert response.headers["ETag"]
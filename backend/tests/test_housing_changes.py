@@ -0,0 +1,67 @@
+"""Tests of the per-block-group housing change columns."""
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from data_processing.geospatial import calculate_housing_changes
+
+
+def make_frame() -> gpd.GeoDataFrame:
+    """
+    Block groups of two towns, with zero and missing baselines and one row without a town.
+    """
+    return gpd.GeoDataFrame(
+        {
+            "TOWN": ["Boston", "Boston", "Boston", "Cambridge", np.nan],
+            "housing_units_2010": [100.0, 0.0, np.nan, 40.0, np.nan],
+            "housing_units_2020": [150.0, 25.0, 30.0, 30.0, np.nan],
+        }
+    )
+
+
+def test_change_and_percent_change():
+    gdf = calculate_housing_changes(make_frame(), "2010", "2020", "Boston")
+
+    pd.testing.assert_series_equal(
+        gdf["housing_units_change"],
+        pd.Series([50.0, 25.0, np.nan, -10.0, np.nan], name="housing_units_change"),
+    )
+    assert gdf["housing_units_change_percent"].iloc[0] == 50.0
+    assert gdf["housing_units_change_percent"].iloc[3] == -25.0
+
+
+def test_percent_change_from_zero_or_missing_baseline_is_missing():
+    gdf = calculate_housing_changes(make_frame(), "2010", "2020", "Boston")
+
+    percent = gdf["housing_units_change_percent"]
+    assert np.isnan(percent.iloc[1])
+    assert np.isnan(percent.iloc[2])
+
+
+def test_percent_change_is_rounded():
+    gdf = make_frame()
+    gdf.loc[0, "housing_units_2020"] = 133.0
+    gdf.loc[3, "housing_units_2010"] = 30.0
+
+    gdf = calculate_housing_changes(gdf, "2010", "2020", "Boston")
+
+    assert gdf["housing_units_change_percent"].iloc[0] == 33.0
+    assert gdf["housing_units_change_percent"].iloc[3] == 0.0
+
+
+def test_z_only_highlights_the_city():
+    gdf = calculate_housing_changes(make_frame(), "2010", "2020", "Boston")
+
+    pd.testing.assert_series_equal(
+        gdf["z"], pd.Series([50.0, 25.0, np.nan, np.nan, np.nan], name="z")
+    )
+
+
+def test_block_group_without_a_town_is_not_highlighted():
+    gdf = make_frame()
+    gdf.loc[4, ["housing_units_2010", "housing_units_2020"]] = [10.0, 20.0]
+
+    gdf = calculate_housing_changes(gdf, "2010", "2020", "Boston")
+
+    assert gdf["housing_units_change"].iloc[4] == 10.0
+    assert np.isnan(gdf["z"].iloc[4])
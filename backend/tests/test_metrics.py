@@ -0,0 +1,62 @@
+"""Tests of stage timings and the Server-Timing header."""
+
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from data_processing import metrics
+from data_processing.metrics import start_request_timings, stop_request_timings, timed
+
+
+def housing_request(snapshot) -> dict:
+    year1, year2 = snapshot.valid_years[:2]
+    return {"year1": year1, "year2": year2, "city": snapshot.validator.valid_cities[0]}
+
+
+def test_server_timing_is_opt_in_per_request(client, snapshot):
+    response = client.post("/api/housing", json=housing_request(snapshot))
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+
+
+def test_requests_can_ask_for_server_timing(client, snapshot):
+    response = client.post(
+        "/api/housing",
+        json=housing_request(snapshot),
+        headers={"X-Server-Timing": "1"},
+    )
+
+    assert response.status_code == 200
+    assert "total;dur=" in response.headers["Server-Timing"]
+
+
+def test_stages_timed_on_several_threads_are_all_recorded(monkeypatch):
+    # Every stage takes exactly one second on a per-thread clock
+    clock = threading.local()
+
+    def perf_counter() -> float:
+        clock.now = getattr(clock, "now", 0.0) + 1.0
+        return clock.now
+
+    monkeypatch.setattr(metrics.time, "perf_counter", perf_counter)
+
+    def run_stages() -> None:
+        for _ in range(1000):
+            with timed("merge"):
+                pass
+
+    timings = start_request_timings()
+    try:
+        # Merge threads run in copies of the request's context, like merge_geojson's
+        with ThreadPoolExecutor(8) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, run_stages)
+                for _ in range(8)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        stop_request_timings()
+
+    assert timings == {"merge": 8000.0}
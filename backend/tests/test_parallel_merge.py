@@ -0,0 +1,57 @@
+"""Tests that building map payloads per county gives the same bytes as building them serially."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from data_processing import merge_geojson
+
+
+@pytest.fixture(scope="module")
+def executor():
+    with ThreadPoolExecutor(4) as executor:
+        yield executor
+
+
+@pytest.mark.parametrize(
+    "scope, bbox",
+    [
+        ("state", None),
+        ("neighbors", None),
+        ("city", None),
+        ("state", [-70.7, 41.3, -70.5, 41.5]),
+    ],
+)
+def test_county_tasks_match_serial_merge(snapshot, executor, scope, bbox):
+    year1, year2 = snapshot.valid_years[:2]
+    city = snapshot.validator.valid_cities[0]
+    args = (
+        snapshot.df,
+        year1,
+        year2,
+        city,
+        snapshot.geometry_store,
+        "full",
+        scope,
+        bbox,
+    )
+
+    serial = merge_geojson(*args, snapshot.town_index, snapshot.geoid_index)
+    parallel = merge_geojson(*args, snapshot.town_index, snapshot.geoid_index, executor)
+
+    assert parallel == serial
+
+
+def test_county_tasks_match_serial_merge_with_unmatched_block_groups(
+    snapshot, executor
+):
+    # Unmatched block groups in one county change the dtypes of every county's columns
+    df = snapshot.df.drop(snapshot.df.index[[3]])
+    year1, year2 = snapshot.valid_years[:2]
+    city = snapshot.validator.valid_cities[-1]
+
+    serial = merge_geojson(df, year1, year2, city, snapshot.geometry_store)
+    parallel = merge_geojson(
+        df, year1, year2, city, snapshot.geometry_store, executor=executor
+    )
+
+    assert parallel == serial
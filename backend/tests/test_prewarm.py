@@ -0,0 +1,21 @@
+"""Tests of prewarming the map payload cache."""
+
+from itertools import combinations
+
+
+def test_failed_pairs_are_skipped(app_module, snapshot, monkeypatch):
+    city = snapshot.validator.valid_cities[0]
+    pairs = list(combinations(snapshot.valid_years, 2))
+    build = app_module.build_housing_payload
+
+    def build_or_fail(snapshot, year1, year2, city, *args):
+        if (year1, year2) == pairs[0]:
+            raise TimeoutError()
+        return build(snapshot, year1, year2, city, *args)
+
+    monkeypatch.setattr(app_module, "build_housing_payload", build_or_fail)
+    monkeypatch.setattr(app_module, "housing_cache", app_module.ResponseCache(1 << 30))
+    app_module.prewarm_housing_cache(snapshot, ["Nowhere", city])
+
+    cached = {key[1:3] for key in app_module.housing_cache._entries}
+    assert cached == set(pairs[1:])
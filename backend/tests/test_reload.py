@@ -0,0 +1,71 @@
+"""Tests of swapping in reloaded dataset versions."""
+
+import os
+from types import SimpleNamespace
+
+from cache import ResponseCache, TileCache
+from registry import DatasetRegistry
+
+
+def make_registry(versions, on_swap):
+    return DatasetRegistry(
+        loader=lambda version: SimpleNamespace(version=version),
+        version_fn=lambda: versions[0],
+        on_swap=on_swap,
+    )
+
+
+def test_on_swap_runs_only_after_a_reload():
+    versions = ["v1"]
+    swaps = []
+    registry = make_registry(versions, lambda *snapshots: swaps.append(snapshots))
+
+    assert swaps == []
+
+    versions[0] = "v2"
+    assert registry.reload()
+    assert [(previous.version, current.version) for previous, current in swaps] == [
+        ("v1", "v2")
+    ]
+
+
+def test_swap_drops_cached_data_of_the_replaced_version(
+    app_module, tmp_path, monkeypatch
+):
+    housing_cache = ResponseCache(1 << 20)
+    compressed_cache = ResponseCache(1 << 20)
+    tile_cache = TileCache(str(tmp_path), 1 << 20)
+    monkeypatch.setattr(app_module, "housing_cache", housing_cache)
+    monkeypatch.setattr(app_module, "compressed_cache", compressed_cache)
+    monkeypatch.setattr(app_module, "tile_cache", tile_cache)
+
+    housing_cache.put(("v1", "2010", "2020", "Boston"), b"old")
+    housing_cache.put(("v2", "2010", "2020", "Boston"), b"new")
+    compressed_cache.put("etag-gzip", b"old")
+    for version in ("v0", "v1", "v2"):
+        tile_cache.get_or_create((version, "tile"), lambda: b"tile")
+
+    app_module.retire_snapshot(
+        SimpleNamespace(version="v1"), SimpleNamespace(version="v2")
+    )
+
+    assert ("v1", "2010", "2020", "Boston") not in housing_cache
+    assert ("v2", "2010", "2020", "Boston") in housing_cache
+    assert housing_cache.current_bytes == 3
+    assert len(compressed_cache) == 0
+    # Other processes may still serve older versions, so only the replaced one goes
+    assert sorted(os.listdir(tmp_path)) == ["v0", "v2"]
+
+
+def test_forced_reload_of_the_same_version_keeps_its_data(
+    app_module, tmp_path, monkeypatch
+):
+    tile_cache = TileCache(str(tmp_path), 1 << 20)
+    monkeypatch.setattr(app_module, "tile_cache", tile_cache)
+    tile_cache.get_or_create(("v1", "tile"), lambda: b"tile")
+
+    app_module.retire_snapshot(
+        SimpleNamespace(version="v1"), SimpleNamespace(version="v1")
+    )
+
+    assert os.listdir(tmp_path) == ["v1"]
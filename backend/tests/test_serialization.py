@@ -0,0 +1,48 @@
+"""Tests that the single-pass GeoJSON serialization matches GeoDataFrame.to_json."""
+
+import json
+
+import pytest
+from data_processing import get_county_fips_codes, merge_geojson
+from data_processing.geospatial import calculate_housing_changes
+
+
+def reference_geojson(df, year1, year2, city, geometry_store) -> dict:
+    """
+    The map GeoJSON built the original way: a left merge on GEOID strings, then to_json.
+    """
+    df = df.copy()
+    df["GEOID"] = (
+        df["STATEA"].astype(str).str.zfill(2)
+        + df["COUNTYA"].astype(str).str.zfill(3)
+        + df["TRACTA"].astype(str).str.zfill(6)
+        + df["BLCK_GRPA"].astype(str)
+    )
+    gdf = geometry_store.get(get_county_fips_codes(df)).merge(
+        df, left_on="GEOID20", right_on="GEOID", how="left"
+    )
+    gdf = calculate_housing_changes(gdf, year1, year2, city)
+    return json.loads(gdf.to_json())
+
+
+@pytest.mark.parametrize("dropped_rows", [[], [1, 5, 20]])
+def test_merge_geojson_matches_to_json(snapshot, dropped_rows):
+    # Dropping dataset rows leaves block groups without data, whose properties are all null
+    df = snapshot.df.drop(snapshot.df.index[dropped_rows])
+    year1, year2 = snapshot.valid_years[:2]
+    city = snapshot.validator.valid_cities[0]
+
+    body = merge_geojson(df, year1, year2, city, snapshot.geometry_store)
+    expected = reference_geojson(df, year1, year2, city, snapshot.geometry_store)
+
+    assert json.loads(body) == expected
+    features = expected["features"]
+    assert len(features) == len(snapshot.geometry_store.get(snapshot.fips_codes))
+    # Missing baselines give null percent changes
+    assert any(
+        f["properties"]["housing_units_change_percent"] is None for f in features
+    )
+    if dropped_rows:
+        assert sum(f["properties"]["TOWN"] is None for f in features) == len(
+            dropped_rows
+        )
@@ -0,0 +1,106 @@
+"""Tests of the vector tile endpoint and its on-disk cache."""
+
+import os
+
+from cache import TileCache
+
+
+def tile_url(snapshot, z, x, y):
+    year1, year2 = snapshot.valid_years[:2]
+    city = snapshot.validator.valid_cities[0]
+    return f"/api/housing/tiles/{z}/{x}/{y}?year1={year1}&year2={year2}&city={city}"
+
+
+def count_files(directory):
+    return sum(len(files) for _, _, files in os.walk(directory))
+
+
+def test_tiles_outside_the_data_are_empty_and_not_stored(app_module, client, snapshot):
+    before = count_files(app_module.tile_cache.directory)
+    # The top-left tile at zoom 10 is in the Arctic Ocean
+    response = client.get(tile_url(snapshot, 10, 0, 0))
+
+    assert response.status_code == 200
+    assert response.data == b""
+    assert count_files(app_module.tile_cache.directory) == before
+
+
+def test_tiles_with_block_groups_are_stored(app_module, client, snapshot):
+    # The zoom 0 tile covers the whole world
+    response = client.get(tile_url(snapshot, 0, 0, 0))
+
+    assert response.status_code == 200
+    assert response.data
+    assert os.listdir(app_module.tile_cache.directory) == [snapshot.version]
+
+
+def test_tile_cache_stops_storing_at_its_cap(tmp_path):
+    tile_cache = TileCache(str(tmp_path), max_bytes=10)
+
+    tile_cache.get_or_create(("v1", "a"), lambda: b"12345678")
+    tile_cache.get_or_create(("v1", "b"), lambda: b"12345678")
+    tile_cache.get_or_create(("v1", "c"), lambda: b"")
+
+    assert os.path.exists(tile_cache.path(("v1", "a")))
+    assert not os.path.exists(tile_cache.path(("v1", "b")))
+    assert not os.path.exists(tile_cache.path(("v1", "c")))
+    assert tile_cache.current_bytes == 8
+
+
+def test_tile_cache_counts_the_stored_directory(tmp_path):
+    # Tiles already written, e.g. by another worker process, count toward the cap
+    TileCache(str(tmp_path), max_bytes=10).get_or_create(
+        ("v1", "a"), lambda: b"12345678"
+    )
+    tile_cache = TileCache(str(tmp_path), max_bytes=10)
+
+    tile_cache.get_or_create(("v1", "b"), lambda: b"12345678")
+
+    assert tile_cache.current_bytes == 8
+    assert not os.path.exists(tile_cache.path(("v1", "b")))
+
+
+def test_tile_cache_rescans_writes_of_other_processes(tmp_path):
+    first = TileCache(str(tmp_path), max_bytes=10, rescan_interval=0)
+    second = TileCache(str(tmp_path), max_bytes=10, rescan_interval=0)
+
+    first.get_or_create(("v1", "a"), lambda: b"12345678")
+    second.get_or_create(("v1", "b"), lambda: b"12345678")
+
+    assert not os.path.exists(second.path(("v1", "b")))
+
+
+def test_remove_deletes_only_one_version(tmp_path):
+    tile_cache = TileCache(str(tmp_path), max_bytes=1 << 20)
+    tile_cache.get_or_create(("old", "a"), lambda: b"tile")
+    tile_cache.get_or_create(("new", "a"), lambda: b"tile")
+    tile_cache.get_or_create(("newer", "a"), lambda: b"tile")
+
+    tile_cache.remove("old")
+
+    assert sorted(os.listdir(tmp_path)) == ["new", "newer"]
+    assert tile_cache.current_bytes == 8
+
+
+def test_block_group_layer_is_shared_by_every_city(app_module, client, snapshot):
+    year1, year2 = snapshot.valid_years[:2]
+    cities = snapshot.validator.valid_cities[:2]
+
+    bodies = [
+        client.get(
+            f"/api/housing/tiles/0/0/0?year1={year1}&year2={year2}&city={city}"
+        ).data
+        for city in cities
+    ]
+
+    block_groups_path = app_module.tile_cache.path(
+        (snapshot.version, f"{year1}-{year2}", "block_groups", "0", "0", "0")
+    )
+    with open(block_groups_path, "rb") as f:
+        block_groups = f.read()
+    assert b"\x0a\x0cblock_groups" in block_groups
+    for body in bodies:
+        # The city layer follows the shared block group layer
+        assert body.startswith(block_groups)
+        assert b"\x0a\x04city" in body[len(block_groups) :]
+    assert bodies[0] != bodies[1]
@@ -0,0 +1,40 @@
+"""Tests of request validation through the API endpoints."""
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "url", ["/api/population", "/api/housing", "/api/city-report", "/api/time-series"]
+)
+@pytest.mark.parametrize("city", [["Boston"], {"name": "Boston"}])
+def test_non_string_city_is_rejected(client, snapshot, url, city):
+    year1, year2 = snapshot.valid_years[:2]
+    response = client.post(url, json={"year1": year1, "year2": year2, "city": city})
+
+    assert response.status_code == 400
+    assert "City must be a string" in response.get_json()["error"]
+
+
+def test_unknown_city_is_rejected(client, snapshot):
+    year1, year2 = snapshot.valid_years[:2]
+    response = client.post(
+        "/api/population", json={"year1": year1, "year2": year2, "city": "Nowhere"}
+    )
+
+    assert response.status_code == 400
+    assert "City not found" in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("value", ["NaN", "Infinity", "-Infinity"])
+def test_non_finite_bbox_is_rejected(client, snapshot, value):
+    year1, year2 = snapshot.valid_years[:2]
+    city = snapshot.validator.valid_cities[0]
+    # Written out by hand, since NaN and Infinity are not standard JSON
+    body = (
+        f'{{"year1": "{year1}", "year2": "{year2}", "city": "{city}", '
+        f'"bbox": [-71.2, 42.2, {value}, 42.4]}}'
+    )
+    response = client.post("/api/housing", data=body, content_type="application/json")
+
+    assert response.status_code == 400
+    assert "finite numbers" in response.get_json()["error"]
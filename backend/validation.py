@@ -1,8 +1,46 @@
 """Request validation for API endpoints."""
 
-from typing import Optional
+import math
+import re
+from collections import Counter
+from typing import Iterable, Optional, Union
 
 import pandas as pd
+from data_processing import MAX_TILE_ZOOM, AgeBins, TownIndex, parse_age_bins
+
+# Data columns end in a four-digit census year, e.g. "housing_units_2010"
+YEAR_SUFFIX_PATTERN = re.compile(r"_(\d{4})$")
+
+
+def get_available_years(columns: Iterable[str]) -> list[str]:
+    """
+    Returns the sorted years that appear as column suffixes in the dataset.
+
+    Args:
+        columns: Column names of the dataset
+
+    Returns:
+        List of years, e.g. ["1990", "2000", "2010", "2020"]
+    """
+    return sorted(get_year_column_counts(columns))
+
+
+def get_year_column_counts(columns: Iterable[str]) -> Counter:
+    """
+    Counts the dataset columns for each year suffix.
+
+    Args:
+        columns: Column names of the dataset
+
+    Returns:
+        Counter mapping years to their number of columns
+    """
+    years = Counter()
+    for col in columns:
+        match = YEAR_SUFFIX_PATTERN.search(str(col))
+        if match:
+            years[match.group(1)] += 1
+    return years
 
 
 class ValidationError(Exception):
@@ -14,18 +52,33 @@ class ValidationError(Exception):
 class RequestValidator:
     """Validates API request parameters against dataset."""
 
-    def __init__(self, df: pd.DataFrame, valid_years: list[str]):
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        valid_years: Optional[list[str]] = None,
+        town_index: Optional[TownIndex] = None,
+    ):
         """
         Initialize validator with dataset.
 
+        Lookup indexes are built once here so each validation is a constant-time check.
+
         Args:
             df: DataFrame containing the demographic data
-            valid_years: List of valid years in the dataset
+            valid_years: List of valid years in the dataset (derived from the
+                column suffixes if not given)
+            town_index: Town index built from df (built here if not given)
         """
         self.df = df
-        self.valid_years = valid_years
-        # Filter out NaN values before sorting
-        self.valid_cities = sorted(self.df["TOWN"].dropna().unique().tolist())
+        # Number of columns available for each year suffix
+        self.year_column_counts = get_year_column_counts(self.df.columns)
+        self.valid_years = (
+            valid_years if valid_years is not None else sorted(self.year_column_counts)
+        )
+        # Missing towns are never indexed, so no NaN values reach the sort
+        self.town_index = town_index if town_index is not None else TownIndex(df)
+        self.valid_cities = sorted(self.town_index.towns)
+        self.city_set = frozenset(self.valid_cities)
 
     def validate_year(self, year: str, param_name: str = "year") -> None:
         """
@@ -47,8 +100,7 @@ class RequestValidator:
             )
 
         # Check if data exists for this year
-        year_columns = [col for col in self.df.columns if col.endswith(f"_{year}")]
-        if not year_columns:
+        if not self.year_column_counts.get(year):
             raise ValidationError(f"No data available for {param_name}: {year}")
 
     def validate_city(self, city: str) -> None:
@@ -64,33 +116,168 @@ class RequestValidator:
         if not city:
             raise ValidationError("city is required")
 
-        if city not in self.valid_cities:
+        # Checked before the set lookup, which fails on unhashable JSON values
+        if not isinstance(city, str):
+            raise ValidationError(f"Invalid city: {city!r}. City must be a string")
+
+        if city not in self.city_set:
             raise ValidationError(f"Invalid city: '{city}'. City not found in dataset")
 
         # Verify there's actual data for this city
-        city_data = self.df[self.df["TOWN"] == city]
-        if city_data.empty:
+        if not self.town_index.row_count(city):
             raise ValidationError(f"No data found for city: {city}")
 
-    def validate_request(
-        self, year1: Optional[str], year2: Optional[str], city: Optional[str]
+    def validate_option(
+        self, value: Optional[str], options: Iterable[str], param_name: str
     ) -> None:
         """
-        Validate all request parameters.
+        Validate that an optional parameter is one of the allowed values.
+
+        Args:
+            value: Parameter value to validate
+            options: Allowed values
+            param_name: Name of the parameter (for error messages)
+
+        Raises:
+            ValidationError: If the value is not allowed
+        """
+        options = list(options)
+        if value not in options:
+            raise ValidationError(
+                f"Invalid {param_name}: '{value}'. Must be one of {options}"
+            )
+
+    def validate_bbox(self, bbox: Optional[list]) -> None:
+        """
+        Validate an optional [min_lon, min_lat, max_lon, max_lat] bounding box.
+
+        Args:
+            bbox: Bounding box to validate (None is allowed)
+
+        Raises:
+            ValidationError: If the bounding box is malformed
+        """
+        if bbox is None:
+            return
+
+        if (
+            not isinstance(bbox, list)
+            or len(bbox) != 4
+            or not all(
+                isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and math.isfinite(value)
+                for value in bbox
+            )
+        ):
+            raise ValidationError(
+                "bbox must be a list of four finite numbers: "
+                "[min_lon, min_lat, max_lon, max_lat]"
+            )
+
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if min_lon > max_lon or min_lat > max_lat:
+            raise ValidationError(
+                f"Invalid bbox: {bbox}. Minimums must not exceed maximums"
+            )
+
+    def validate_tile(self, z: int, x: int, y: int) -> None:
+        """
+        Validate web mercator tile coordinates.
+
+        Args:
+            z: Zoom level
+            x: Tile column
+            y: Tile row
+
+        Raises:
+            ValidationError: If the zoom is out of range or the tile does not exist at that zoom
+        """
+        if not 0 <= z <= MAX_TILE_ZOOM:
+            raise ValidationError(
+                f"Invalid zoom: {z}. Must be between 0 and {MAX_TILE_ZOOM}"
+            )
+
+        tiles_per_side = 2**z
+        if not (0 <= x < tiles_per_side and 0 <= y < tiles_per_side):
+            raise ValidationError(f"Invalid tile: {z}/{x}/{y}")
+
+    def validate_years(self, year1: Optional[str], year2: Optional[str]) -> None:
+        """
+        Validate a pair of years to compare.
 
         Args:
             year1: First year parameter
             year2: Second year parameter
-            city: City parameter
 
         Raises:
-            ValidationError: If any parameter is invalid
+            ValidationError: If either year is invalid or they are out of order
         """
         self.validate_year(year1, "year1")
         self.validate_year(year2, "year2")
-        self.validate_city(city)
 
         # Additional validation: ensure years are in logical order
         # Prevents invalid comparisons (e.g., 2020 to 2010)
         if int(year1) >= int(year2):
             raise ValidationError(f"year1 ({year1}) must be before year2 ({year2})")
+
+    def validate_cities(self, cities: Union[str, list[str], None]) -> list[str]:
+        """
+        Validate a list of cities, or "all" for every city in the dataset.
+
+        Args:
+            cities: List of city names, or "all"
+
+        Returns:
+            City names to compare, without duplicates
+
+        Raises:
+            ValidationError: If the list is missing or empty, or any city is invalid
+        """
+        if cities == "all":
+            return list(self.valid_cities)
+
+        if not isinstance(cities, list) or not cities:
+            raise ValidationError('cities must be a non-empty list of cities or "all"')
+
+        for city in cities:
+            if not isinstance(city, str):
+                raise ValidationError(f"Invalid city: {city!r}. Cities must be strings")
+            self.validate_city(city)
+
+        return list(dict.fromkeys(cities))
+
+    def validate_age_bins(self, age_bins: Union[str, list, None]) -> AgeBins:
+        """
+        Validate an age binning: a preset name or the youngest age of each bin.
+
+        Args:
+            age_bins: age_bins parameter (None for the default 5-year groups)
+
+        Returns:
+            The binning as a tuple of bin starts
+
+        Raises:
+            ValidationError: If the preset is unknown or the bin starts are invalid
+        """
+        try:
+            return parse_age_bins(age_bins)
+        except ValueError as e:
+            raise ValidationError(str(e)) from e
+
+    def validate_request(
+        self, year1: Optional[str], year2: Optional[str], city: Optional[str]
+    ) -> None:
+        """
+        Validate all request parameters.
+
+        Args:
+            year1: First year parameter
+            year2: Second year parameter
+            city: City parameter
+
+        Raises:
+            ValidationError: If any parameter is invalid
+        """
+        self.validate_years(year1, year2)
+        self.validate_city(city)
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import PopulationPyramid from './components/PopulationPyramid';
-import { fetchPopulationData } from './utils/api';
+import { fetchCityReport } from './utils/api';
 import HousingMap from './components/HousingMap';
 import ControlPanel from './components/ControlPanel';
 import './App.css';
@@ -14,19 +14,27 @@ function App() {
   const [year2, setYear2] = useState(DEFAULT_YEAR2);
   const [city, setCity] = useState(DEFAULT_CITY);
   const [pyramidData, setPyramidData] = useState(null);
+  const [housingReport, setHousingReport] = useState(null);
+  const [datasetVersion, setDatasetVersion] = useState(null);
   const [activeTab, setActiveTab] = useState('population');
   const [error, setError] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
 
-  // Fetch population data whenever filters change
+  // The percent change is null when the city had no population in the first year,
+  // and the report then has no housing insights
+  const hasPercentChange = pyramidData?.total_city_change?.percent != null;
+
+  // Fetch population and housing data in one request whenever filters change
   useEffect(() => {
     const loadData = async () => {
       setIsLoading(true);
       setError(null);
       
       try {
-        const data = await fetchPopulationData(year1, year2, city);
-        setPyramidData(data);
+        const data = await fetchCityReport(year1, year2, city);
+        setPyramidData(data.population);
+        setHousingReport(data.housing);
+        setDatasetVersion(data.datasetVersion);
       } catch (err) {
         console.error('Error loading population data:', err);
         setError(err.message || 'Failed to load data');
@@ -108,6 +116,12 @@ function App() {
 
         {!isLoading && !error && (
           <>
+            {pyramidData && !hasPercentChange && (
+              <p className="data-notice">
+                {city} had no recorded population in {year1}, so there is no percent change
+                or housing insight for {year1}–{year2}.
+              </p>
+            )}
             <div className={`tab-content ${activeTab === 'population' ? '' : 'hidden'}`}>
               <PopulationPyramid data={pyramidData} year1={year1} year2={year2} city={city} />
             </div>
@@ -116,8 +130,9 @@ function App() {
                 year1={year1}
                 year2={year2}
                 city={city}
-                city_change_absolute={pyramidData?.total_city_change?.change}
-                city_change_percent={pyramidData?.total_city_change?.percent} 
+                attributes={housingReport?.attributes}
+                sentences={housingReport?.sentences}
+                datasetVersion={datasetVersion}
               />
             </div>
           </>
@@ -1,32 +1,30 @@
 import React, { useEffect, useState } from "react";
 import Plot from "react-plotly.js";
-import { fetchHousingData } from "../utils/api";
+import { fetchGeometry } from "../utils/api";
 
-const HousingMap = ({ year1, year2, city, city_change_absolute, city_change_percent }) => {
-  const [housingData, setHousingData] = useState(null);
-  const [housingSentences, setHousingSentences] = useState(null);
+const HousingMap = ({ year1, year2, city, attributes, sentences, datasetVersion }) => {
+  const [geometry, setGeometry] = useState(null);
   const [error, setError] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
 
+  // Shapes load once per dataset version; attributes for each selection come from the city report
   useEffect(() => {
-    const loadData = async () => {
+    const loadGeometry = async () => {
       setIsLoading(true);
       setError(null);
       
       try {
-        const data = await fetchHousingData(year1, year2, city, city_change_absolute, city_change_percent);
-        setHousingData(data.geojson);
-        setHousingSentences(data.sentences);
+        setGeometry(await fetchGeometry(datasetVersion));
       } catch (err) {
-        console.error('Error loading housing data:', err);
+        console.error('Error loading map geometry:', err);
         setError(err.message || 'Failed to load housing data');
       } finally {
         setIsLoading(false);
       }
     };
 
-    loadData();
-  }, [year1, year2, city, city_change_absolute, city_change_percent]);
+    loadGeometry();
+  }, [datasetVersion]);
 
   if (isLoading) {
     return (
@@ -46,7 +44,7 @@ const HousingMap = ({ year1, year2, city, city_change_absolute, city_change_perc
     );
   }
 
-  if (!housingData || !housingData.features) {
+  if (!geometry || !geometry.features || !attributes) {
     return (
       <div className="empty-state">
         <p>No housing data available for this selection.</p>
@@ -56,7 +54,10 @@ const HousingMap = ({ year1, year2, city, city_change_absolute, city_change_perc
 
   // Calculate geographic center of city for map centering
   // Uses centroid of all block group polygons in the city
-  const cityFeatures = housingData.features.filter(f => f.properties.TOWN === city);
+  const cityGeoids = new Set(
+    attributes.GEOID20.filter((geoid, i) => attributes.TOWN[i] === city)
+  );
+  const cityFeatures = geometry.features.filter(f => cityGeoids.has(f.properties.GEOID20));
   
   // Default center: Eastern Massachusetts (fallback if no features found)
   let centerLon = -71.1;
@@ -107,15 +108,15 @@ const HousingMap = ({ year1, year2, city, city_change_absolute, city_change_perc
           data={[
             {
             type: "choropleth",
-            geojson: housingData,
-            locations: housingData.features.map(f => f.properties.GEOID20),
+            geojson: geometry,
+            locations: attributes.GEOID20,
             // z-values: only chosen city has data, others use sentinel value for transparency
-            z: housingData.features.map(f => f.properties.z ?? -500000000),
+            z: attributes.z.map(z => z ?? -500000000),
             featureidkey: "properties.GEOID20",
-            text: housingData.features.map(
-              (f) => f.properties.z !== null 
-                ? `${f.properties.TOWN}: ${f.properties.housing_units_change} units`
-                : `${f.properties.TOWN}`
+            text: attributes.TOWN.map(
+              (town, i) => attributes.z[i] !== null 
+                ? `${town}: ${attributes.housing_units_change[i]} units`
+                : `${town}`
             ),
             // Colorscale: transparent for non-city data, blue gradient for city changes
             // 0-0.0001 range makes sentinel values (non-city data) transparent
@@ -152,8 +153,8 @@ const HousingMap = ({ year1, year2, city, city_change_absolute, city_change_perc
           <h3 className="insight-title">
             Key Insights
           </h3>
-          {housingSentences && housingSentences.length > 0 ? (
-            housingSentences.map((sentence, index) => (
+          {sentences && sentences.length > 0 ? (
+            sentences.map((sentence, index) => (
               <p key={index}>{sentence}</p>
             ))
           ) : (
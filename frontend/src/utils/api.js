@@ -76,3 +76,72 @@ export async function fetchHousingData(year1, year2, city, city_change_absolute,
     throw new APIError('Network error: Could not connect to server', 0);
   }
 }
+
+/**
+ * Fetch population data, housing map attributes and housing insights in one request
+ */
+export async function fetchCityReport(year1, year2, city) {
+  try {
+    const res = await fetch('/api/city-report', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        year1,
+        year2,
+        city
+      })
+    });
+    
+    const data = await res.json();
+    
+    if (!res.ok) {
+      throw new APIError(data.error || 'Failed to fetch city report', res.status);
+    }
+    
+    // Version of the data the report was computed from, for fetching matching shapes
+    data.datasetVersion = res.headers.get('X-Dataset-Version');
+    return data;
+  } catch (error) {
+    if (error instanceof APIError) {
+      throw error;
+    }
+    throw new APIError('Network error: Could not connect to server', 0);
+  }
+}
+
+// Block group shapes only change with the dataset version, so they are fetched once per version
+let geometryRequest = null;
+let geometryVersion = null;
+
+/**
+ * Fetch block group shapes (GeoJSON keyed by GEOID20) of a dataset version
+ */
+export function fetchGeometry(version) {
+  if (!geometryRequest || geometryVersion !== version) {
+    geometryVersion = version;
+    geometryRequest = (async () => {
+      try {
+        // The versioned URL lets the browser cache the shapes until the data is reloaded
+        const query = version ? `?v=${encodeURIComponent(version)}` : '';
+        const res = await fetch(`/api/geometry${query}`);
+        const data = await res.json();
+        
+        if (!res.ok) {
+          throw new APIError(data.error || 'Failed to fetch map geometry', res.status);
+        }
+        
+        return data;
+      } catch (error) {
+        // Allow a later call to retry
+        geometryRequest = null;
+        if (error instanceof APIError) {
+          throw error;
+        }
+        throw new APIError('Network error: Could not connect to server', 0);
+      }
+    })();
+  }
+  return geometryRequest;
+}